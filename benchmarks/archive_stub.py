@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Local Archive.org stand-in server for offline benchmarks and tests.
+
+Serves advancedsearch, scrape, metadata, HEAD and ranged downloads with configurable
+latency, error rate and item size. Responses are synthetic unless a recorded
+response exists in --record-dir (search.json, metadata/<identifier>.json). With
+--tagged, each file starts with FLAC metadata blocks (STREAMINFO, artwork and
+Vorbis comments naming "Track N" as track N) like a real rip.
+
+Usage: python benchmarks/archive_stub.py [--port 8080] [--latency-ms 50] [--error-rate 0.01]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import struct
+import sys
+from typing import Dict, Optional
+
+from aiohttp import web
+
+FLAC_MAGIC = b'fLaC'
+# Prime-length fill pattern, so no two nearby file offsets share content
+FILL_PATTERN = bytes(range(251))
+
+# Size of the artwork block placed before the Vorbis comments of tagged files
+TAGGED_PICTURE_SIZE = 32 * 1024
+
+# title:"..." clauses, optionally followed by a creator:"..." clause, in a search query
+TITLE_CLAUSE = re.compile(r'title:"([^"]*)"(?:\s+AND\s+creator:"([^"]*)")?')
+
+
+class ArchiveStub:
+    """Synthetic Archive.org endpoints backed by deterministic per-item data."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 min_files: int = 1, max_files: int = 20, file_size: int = 1024 * 1024,
+                 rows: int = 10, record_dir: Optional[str] = None, seed: int = 0,
+                 bandwidth_kbps: float = 0.0, tagged: bool = False):
+        """Configure latency, error injection, per-connection bandwidth (0 = unlimited) and item shape."""
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.min_files = min_files
+        self.max_files = max_files
+        self.file_size = file_size
+        self.rows = rows
+        self.record_dir = record_dir
+        self.bandwidth_kbps = bandwidth_kbps
+        self.tagged = tagged
+        self.random = random.Random(seed)
+        self._checksums: Dict[Optional[str], Dict[str, str]] = {}
+        self.requests: Dict[str, int] = {'search': 0, 'metadata': 0, 'head': 0, 'download': 0, 'errors': 0}
+
+    @property
+    def total_requests(self) -> int:
+        """Requests served across all endpoints (excluding the error counter)."""
+        return sum(count for name, count in self.requests.items() if name != 'errors')
+
+    def file_count(self, identifier: str) -> int:
+        """Deterministic number of FLAC files for an item."""
+        digest = int(hashlib.md5(identifier.encode('utf-8')).hexdigest(), 16)
+        return self.min_files + digest % (self.max_files - self.min_files + 1)
+
+    @staticmethod
+    def track_seconds(number: int) -> int:
+        """Deterministic duration of track number in tagged files."""
+        return 150 + number * 17 % 200
+
+    def flac_header(self, name: str) -> bytes:
+        """fLaC marker and metadata blocks of a tagged file; track N is titled "Track N"."""
+        number = int(name.split(' ', 1)[0])
+        # 44.1 kHz, 2 channels, 16 bits per sample, then the 36-bit total sample count
+        packed = (44100 << 44) | (1 << 41) | (15 << 36) | (44100 * self.track_seconds(number))
+        streaminfo = bytes(10) + packed.to_bytes(8, 'big') + bytes(16)
+        comments = [f"TITLE=Track {number}".encode(), f"TRACKNUMBER={number}".encode(), b"ARTIST=Stub Artist"]
+        vorbis = struct.pack('<I', 4) + b'stub' + struct.pack('<I', len(comments))
+        vorbis += b''.join(struct.pack('<I', len(comment)) + comment for comment in comments)
+
+        def block(block_type: int, data: bytes, last: bool = False) -> bytes:
+            return bytes([block_type | (0x80 if last else 0)]) + len(data).to_bytes(3, 'big') + data
+
+        return FLAC_MAGIC + block(0, streaminfo) + block(6, bytes(TAGGED_PICTURE_SIZE)) + block(4, vorbis, True)
+
+    def file_bytes(self, start: int, end: int, name: Optional[str] = None) -> bytes:
+        """Bytes [start, end] of a synthetic FLAC file: the fLaC marker (or, when tagged,
+        the metadata blocks of file name), then a position-dependent pattern so
+        misordered ranges change the checksum."""
+        length = end - start + 1
+        shift = start % len(FILL_PATTERN)
+        data = bytearray((FILL_PATTERN * (length // len(FILL_PATTERN) + 2))[shift:shift + length])
+        header = self.flac_header(name) if self.tagged and name else FLAC_MAGIC
+        if start < len(header):
+            marker = header[start:end + 1]
+            data[:len(marker)] = marker
+        return bytes(data)
+
+    def checksums(self, name: Optional[str] = None) -> Dict[str, str]:
+        """md5 and sha1 of a synthetic file, as listed in the item metadata."""
+        key = name if self.tagged else None
+        if key not in self._checksums:
+            md5, sha1 = hashlib.md5(), hashlib.sha1()
+            chunk = 1024 * 1024
+            for offset in range(0, self.file_size, chunk):
+                data = self.file_bytes(offset, min(self.file_size, offset + chunk) - 1, key)
+                md5.update(data)
+                sha1.update(data)
+            self._checksums[key] = {'md5': md5.hexdigest(), 'sha1': sha1.hexdigest()}
+        return self._checksums[key]
+
+    async def _delay_or_fail(self, endpoint: str) -> Optional[web.Response]:
+        """Count the request, sleep for the configured latency, maybe inject a 503."""
+        self.requests[endpoint] += 1
+        delay = self.latency_ms + (self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.requests['errors'] += 1
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        return None
+
+    def _recorded(self, *parts: str) -> Optional[dict]:
+        if not self.record_dir:
+            return None
+        path = os.path.join(self.record_dir, *parts)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    async def search(self, request: web.Request) -> web.Response:
+        failure = await self._delay_or_fail('search')
+        if failure:
+            return failure
+        recorded = self._recorded('search.json')
+        if recorded is not None:
+            return web.json_response(recorded)
+        docs = self.search_docs(request.query.get('q', ''))
+        rows = int(request.query.get('rows', self.rows))
+        return web.json_response({'response': {'numFound': len(docs), 'docs': docs[:rows]}})
+
+    async def scrape(self, request: web.Request) -> web.Response:
+        """Scrape API: cursor-paginated docs projected to the requested fields."""
+        failure = await self._delay_or_fail('search')
+        if failure:
+            return failure
+        docs = self.search_docs(request.query.get('q', ''))
+        count = int(request.query.get('count', 100))
+        if count < 100:
+            return web.json_response({'error': 'count must be at least 100'}, status=400)
+        fields = [field for field in request.query.get('fields', '').split(',') if field]
+        offset = int(request.query.get('cursor', 0))
+        page = [{key: doc[key] for key in fields if key in doc} if fields else doc
+                for doc in docs[offset:offset + count]]
+        body = {'items': page, 'count': len(page), 'total': len(docs)}
+        if offset + count < len(docs):
+            body['cursor'] = str(offset + count)
+        return web.json_response(body)
+
+    def search_docs(self, query: str) -> list:
+        """All docs matching a query, by downloads.
+
+        Each title clause (OR-combined in batched queries) matches self.rows items;
+        a query without one (e.g. a discography) matches self.rows items too.
+        """
+        clauses = TITLE_CLAUSE.findall(query) or [('', '')]
+        docs = []
+        for title, creator in clauses:
+            key = hashlib.md5(f"{title}|{creator}".encode('utf-8')).hexdigest()[:10]
+            docs.extend({
+                'identifier': f"stub-{key}-{i}",
+                'title': title or f"Stub Album {key} {i}",
+                'creator': creator or 'Stub Artist',
+                'year': str(1970 + i),
+                'downloads': 1000 - i,
+                'item_size': self.file_count(f"stub-{key}-{i}") * self.file_size,
+            } for i in range(self.rows))
+        docs.sort(key=lambda doc: -doc['downloads'])
+        return docs
+
+    async def metadata(self, request: web.Request) -> web.Response:
+        failure = await self._delay_or_fail('metadata')
+        if failure:
+            return failure
+        identifier = request.match_info['identifier']
+        recorded = self._recorded('metadata', f"{identifier}.json")
+        if recorded is not None:
+            return web.json_response(recorded)
+        names = [f"{i + 1:04d} Track {i + 1}.flac" for i in range(self.file_count(identifier))]
+        files = [{
+            'name': name,
+            'format': 'Flac',
+            'size': str(self.file_size),
+            **self.checksums(name),
+        } for name in names]
+        files.append({'name': f"{identifier}_archive.torrent", 'format': 'Archive BitTorrent'})
+        return web.json_response({'metadata': {'identifier': identifier}, 'files': files})
+
+    async def download(self, request: web.Request) -> web.StreamResponse:
+        endpoint = 'head' if request.method == 'HEAD' else 'download'
+        failure = await self._delay_or_fail(endpoint)
+        if failure:
+            return failure
+        headers = {'Content-Type': 'audio/flac', 'Accept-Ranges': 'bytes'}
+        if request.method == 'HEAD':
+            headers['Content-Length'] = str(self.file_size)
+            return web.Response(headers=headers)
+
+        start, end, status = 0, self.file_size - 1, 200
+        range_header = request.headers.get('Range', '')
+        if range_header.startswith('bytes='):
+            first, _, last = range_header[len('bytes='):].partition('-')
+            start = int(first) if first else 0
+            end = min(int(last), self.file_size - 1) if last else self.file_size - 1
+            if start > end:
+                return web.Response(status=416, headers={'Content-Range': f"bytes */{self.file_size}"})
+            status = 206
+            headers['Content-Range'] = f"bytes {start}-{end}/{self.file_size}"
+
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_length = end - start + 1
+        await response.prepare(request)
+        chunk = 64 * 1024
+        for offset in range(start, end + 1, chunk):
+            data = self.file_bytes(offset, min(end, offset + chunk - 1), request.match_info['name'])
+            await response.write(data)
+            if self.bandwidth_kbps:
+                await asyncio.sleep(len(data) / (self.bandwidth_kbps * 1024))
+        await response.write_eof()
+        return response
+
+    def make_app(self) -> web.Application:
+        """Build the aiohttp application with Archive.org-shaped routes."""
+        app = web.Application()
+        app.router.add_get('/advancedsearch.php', self.search)
+        app.router.add_get('/services/search/v1/scrape', self.scrape)
+        app.router.add_get('/metadata/{identifier}', self.metadata)
+        app.router.add_route('GET', '/download/{identifier}/{name:.+}', self.download)
+        app.router.add_route('HEAD', '/download/{identifier}/{name:.+}', self.download)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> web.AppRunner:
+        """Start serving; the bound URL is available as self.base_url."""
+        runner = web.AppRunner(self.make_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound_port = runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return runner
+
+    def configure(self, scraper) -> None:
+        """Point an ArchiveScraper at this stub."""
+        scraper.base_search_url = f"{self.base_url}/advancedsearch.php"
+        scraper.base_scrape_url = f"{self.base_url}/services/search/v1/scrape"
+        scraper.base_metadata_url = f"{self.base_url}/metadata/"
+        scraper.base_download_url = f"{self.base_url}/download/"
+
+
+def main():
+    """Run the stub server until interrupted."""
+    parser = argparse.ArgumentParser(description="Local Archive.org stand-in server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--min-files', type=int, default=1)
+    parser.add_argument('--max-files', type=int, default=20)
+    parser.add_argument('--file-size', type=int, default=1024 * 1024)
+    parser.add_argument('--record-dir', default=None)
+    parser.add_argument('--bandwidth-kbps', type=float, default=0.0, help="Per-connection download limit")
+    parser.add_argument('--tagged', action='store_true', help="Serve files with FLAC metadata blocks")
+    args = parser.parse_args()
+
+    stub = ArchiveStub(args.latency_ms, args.jitter_ms, args.error_rate, args.min_files,
+                       args.max_files, args.file_size, record_dir=args.record_dir,
+                       bandwidth_kbps=args.bandwidth_kbps, tagged=args.tagged)
+    print(f"🧪 Archive.org stub listening on http://{args.host}:{args.port}")
+    web.run_app(stub.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Batched vs individual album searches against the local Archive.org stub.
+
+Searches a synthetic playlist of --albums (album, artist) pairs once with one
+advancedsearch request per album and once with ArchiveScraper.search_many, and
+prints the request counts and wall-clock time of both.
+
+Usage: python benchmarks/bench_batch_search.py [--albums 500] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from archive_stub import ArchiveStub
+from src.archive.scheduler import RequestScheduler
+from src.archive.scraper import ArchiveScraper
+
+
+async def run(args) -> None:
+    stub = ArchiveStub(latency_ms=args.latency_ms, rows=args.rows)
+    runner = await stub.start()
+    scheduler = RequestScheduler(rate=args.rate, max_rate=args.rate, burst=int(args.rate))
+    scraper = ArchiveScraper(cache=None, scheduler=scheduler)
+    scraper.cache = None
+    scraper.index = None
+    stub.configure(scraper)
+    pairs = [(f"Benchmark Album {i}", f"Benchmark Artist {i % 97}") for i in range(args.albums)]
+
+    async def individual():
+        async with scraper.session_context() as session:
+            await asyncio.gather(*(scraper.search_album_return_links(session, album, artist)
+                                   for album, artist in pairs))
+
+    try:
+        async with scraper:
+            counts = {}
+            for name, search in [('individual', individual), ('batched', lambda: scraper.search_many(pairs))]:
+                before = stub.requests['search']
+                start = time.perf_counter()
+                await search()
+                elapsed = time.perf_counter() - start
+                counts[name] = stub.requests['search'] - before
+                print(f"{name:12s} {counts[name]:6d} search requests  {elapsed:7.2f}s")
+            print(f"reduction    {counts['individual'] / max(1, counts['batched']):.1f}x  {scraper.batch_stats}")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched vs individual search benchmark")
+    parser.add_argument('--albums', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=10, help="Stub results per album")
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--rate', type=float, default=10.0, help="Scheduler requests/second")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold vs warm response-cache latency for search_albums and advanced_search.
+
+Runs offline against the local Archive.org stub, whose --latency-ms stands in for
+the round trips a cache hit saves.
+
+Usage: python benchmarks/bench_cache.py ["Album Name"] ["Artist Name"] [--runs N] [--latency-ms 80]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from archive_stub import ArchiveStub
+from src.archive.cache import SQLiteResponseCache
+from src.archive.scraper import ArchiveScraper
+
+
+async def time_call(coro_factory, runs: int):
+    """Run coro_factory() runs times and return per-run latencies in ms."""
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await coro_factory()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def run_benchmark(album: str, artist, runs: int, latency_ms: float) -> None:
+    """Measure cold and warm latency using the stub and a throwaway cache database."""
+    stub = ArchiveStub(latency_ms=latency_ms, min_files=8, max_files=8)
+    runner = await stub.start()
+    try:
+        await measure(stub, album, artist, runs)
+    finally:
+        await runner.cleanup()
+
+
+async def measure(stub: ArchiveStub, album: str, artist, runs: int) -> None:
+    """Time each call cold and warm, printing the stub requests the warm runs still made."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteResponseCache(path=os.path.join(tmp, 'bench.sqlite'))
+        scraper = ArchiveScraper(cache=cache)
+        # The local index would answer before the cache; benchmark the cache alone
+        scraper.index = None
+        stub.configure(scraper)
+
+        for name, factory in [
+            ('search_albums', lambda: scraper.search_albums(album, artist)),
+            ('advanced_search', lambda: scraper.advanced_search(album, artist)),
+        ]:
+            cache.clear()
+            cold = await time_call(factory, 1)
+            before = stub.total_requests
+            warm = await time_call(factory, runs)
+            print(f"{name:16s} cold {cold[0]:9.1f} ms | warm avg {sum(warm) / len(warm):7.2f} ms "
+                  f"min {min(warm):7.2f} ms ({runs} runs, {stub.total_requests - before} stub requests)")
+
+        print(f"cache stats: {cache.stats()}")
+        cache.close()
+
+
+def main():
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('album', nargs='?', default="Kind of Blue")
+    parser.add_argument('artist', nargs='?', default="Miles Davis")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=80.0, help="Stub response latency")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.album, args.artist, args.runs, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
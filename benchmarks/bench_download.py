@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Download throughput benchmark against the local Archive.org stub.
+
+Downloads one item with a single connection (one file at a time, no segments)
+and with the parallel segmented downloader, and prints aggregate throughput.
+Use --bandwidth-kbps to cap each stub connection the way a remote mirror would.
+
+Usage: python benchmarks/bench_download.py [--files 8] [--file-size 8388608] [--bandwidth-kbps 4096]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from archive_stub import ArchiveStub
+from src.archive.downloader import FlacDownloader
+from src.archive.scheduler import RequestScheduler
+from src.archive.scraper import ArchiveScraper
+
+
+async def run(args) -> None:
+    stub = ArchiveStub(latency_ms=args.latency_ms, min_files=args.files, max_files=args.files,
+                       file_size=args.file_size, bandwidth_kbps=args.bandwidth_kbps)
+    runner = await stub.start()
+    # Rate limiting is benchmarked separately; here it would only measure the limit
+    scheduler = RequestScheduler(rate=1000, max_rate=1000, burst=1000, max_concurrency=64)
+    scraper = ArchiveScraper(cache=None, scheduler=scheduler)
+    scraper.cache = None
+    scraper.index = None
+    stub.configure(scraper)
+
+    configurations = [
+        ('single connection', dict(concurrency=1, connections=1, segment_size=args.file_size + 1)),
+        ('parallel segmented', dict(concurrency=args.concurrency, connections=args.connections,
+                                    segment_size=args.segment_size)),
+    ]
+    try:
+        async with scraper:
+            for name, options in configurations:
+                with tempfile.TemporaryDirectory() as tmp:
+                    downloader = FlacDownloader(scraper, tmp, **options)
+                    report = await downloader.download_item('bench-item')
+                    failed = sum(1 for file in report['files'] if file['status'] != 'downloaded')
+                    print(f"{name:20s} {report['bytes'] / (1024 * 1024):8.1f} MiB in {report['seconds']:7.2f}s  "
+                          f"{report['throughput_mb_s']:8.2f} MiB/s  failed {failed}")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FLAC download throughput benchmark")
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--file-size', type=int, default=8 * 1024 * 1024)
+    parser.add_argument('--segment-size', type=int, default=2 * 1024 * 1024)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--bandwidth-kbps', type=float, default=4096.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark full vs streaming parsing of a large item metadata document.
+
+Builds a synthetic /metadata/<identifier> response (default 5,000 files, most of
+them non-FLAC derivatives, followed by a large metadata block) and compares
+peak memory and parse time of json.loads + filter against iter_json_array.
+
+Usage: python benchmarks/bench_metadata_parse.py [--files 5000] [--runs 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.archive.scraper import ArchiveScraper
+from src.archive.streaming import iter_json_array
+
+CHUNK_SIZE = 64 * 1024
+
+
+def build_document(files: int) -> bytes:
+    """A metadata response shaped like a large concert or label-dump item."""
+    formats = ['Flac', 'VBR MP3', 'Ogg Vorbis', 'PNG', 'Spectrogram', 'Text']
+    entries = []
+    for i in range(files):
+        fmt = formats[i % len(formats)]
+        entries.append({
+            'name': f"disc{i // 100:02d}/track{i:05d}.{fmt.split()[-1].lower()}",
+            'source': 'original' if fmt == 'Flac' else 'derivative',
+            'format': fmt,
+            'size': str(20_000_000 if fmt == 'Flac' else 3_000_000),
+            'md5': f"{i:032x}",
+            'sha1': f"{i:040x}",
+            'crc32': f"{i:08x}",
+            'mtime': '1600000000',
+            'length': '245.31',
+            'title': f"Track {i}",
+            'creator': 'Some Artist',
+            'album': 'Some Live Recording',
+        })
+    entries.append({'name': 'item_archive.torrent', 'format': 'Archive BitTorrent'})
+    document = {
+        'created': 1700000000,
+        'd1': 'ia800000.us.archive.org',
+        'dir': '/0/items/item',
+        'files': entries,
+        'files_count': len(entries),
+        'metadata': {'description': 'x' * 2_000_000, 'notes': ['y' * 1000] * 500},
+        'reviews': [{'body': 'z' * 2000}] * 200,
+    }
+    return json.dumps(document).encode('utf-8')
+
+
+async def chunked(body: bytes):
+    for offset in range(0, len(body), CHUNK_SIZE):
+        yield body[offset:offset + CHUNK_SIZE]
+
+
+async def parse_full(body_chunks, wanted):
+    """Current path: materialise the whole body, json.loads, then filter."""
+    body = b''.join([chunk async for chunk in body_chunks])
+    data = json.loads(body)
+    return [file for file in data['files'] if wanted(file)]
+
+
+async def parse_streaming(body_chunks, wanted):
+    return [file async for file in iter_json_array(body_chunks, 'files', wanted)]
+
+
+async def measure(parser, body: bytes, wanted, runs: int):
+    """Return (best time in ms, peak traced memory in KiB, result count)."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await parser(chunked(body), wanted)
+        times.append((time.perf_counter() - start) * 1000)
+
+    # Separate run for memory: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    result = await parser(chunked(body), wanted)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak // 1024, len(result)
+
+
+async def run(files: int, runs: int) -> None:
+    body = build_document(files)
+    wanted = ArchiveScraper(cache=None).is_wanted_file
+    print(f"document: {len(body) / 1024 / 1024:.1f} MiB, {files} files")
+    for name, parser in [('full json.loads', parse_full), ('streaming', parse_streaming)]:
+        best, peak, count = await measure(parser, body, wanted, runs)
+        print(f"{name:16s} {best:9.1f} ms  peak {peak:9d} KiB  kept {count} entries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full vs streaming metadata parse benchmark")
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.files, args.runs))
+
+
+if __name__ == "__main__":
+    main()
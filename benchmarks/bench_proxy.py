@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Streaming proxy benchmark against the local Archive.org stub.
+
+Starts the stub (with WAN-like latency and per-connection bandwidth) and a
+StreamProxy with a temporary chunk cache, then measures time to first byte of
+cold and cached seeks, a full cold play and a cached replay, and how many
+upstream chunk fetches --listeners concurrent players of one file cause.
+Every response is checked byte for byte against the stub's file content.
+
+Usage: python benchmarks/bench_proxy.py [--file-size 16777216] [--latency-ms 80] [--bandwidth-kbps 8192]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from archive_stub import ArchiveStub
+from src.archive.proxy import ChunkCache, StreamProxy
+from src.archive.scheduler import RequestScheduler
+from src.archive.scraper import ArchiveScraper
+
+
+async def timed_get(session: aiohttp.ClientSession, url: str, stub: ArchiveStub,
+                    start: int = 0, end: int = None):
+    """GET a range; return (seconds to first byte, total seconds), checking the bytes."""
+    end = stub.file_size - 1 if end is None else end
+    began = time.perf_counter()
+    first_byte = None
+    position = start
+    async with session.get(url, headers={'Range': f"bytes={start}-{end}"}) as response:
+        if response.status != 206:
+            raise RuntimeError(f"expected 206, got {response.status}")
+        async for data in response.content.iter_chunked(256 * 1024):
+            if first_byte is None:
+                first_byte = time.perf_counter() - began
+            if data != stub.file_bytes(position, position + len(data) - 1):
+                raise RuntimeError(f"content mismatch at byte {position}")
+            position += len(data)
+    if position != end + 1:
+        raise RuntimeError(f"expected {end + 1 - start} bytes, got {position - start}")
+    return first_byte, time.perf_counter() - began
+
+
+async def run(args) -> None:
+    stub = ArchiveStub(latency_ms=args.latency_ms, min_files=3, max_files=3,
+                       file_size=args.file_size, bandwidth_kbps=args.bandwidth_kbps)
+    stub_runner = await stub.start()
+    # Rate limiting is benchmarked separately; here it would only measure the limit
+    scheduler = RequestScheduler(rate=1000, max_rate=1000, burst=1000, max_concurrency=64)
+    scraper = ArchiveScraper(cache=None, scheduler=scheduler)
+    scraper.cache = None
+    scraper.index = None
+    stub.configure(scraper)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ChunkCache(tmp, chunk_size=args.chunk_size)
+        proxy = StreamProxy(scraper, cache, prefetch=args.prefetch, host='127.0.0.1', port=0)
+        try:
+            async with proxy, aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{proxy.port}/item/bench-item") as response:
+                    tracks = [track['url'] for track in (await response.json())['tracks']]
+
+                seek = args.file_size // 2
+                cold, _ = await timed_get(session, tracks[0], stub, seek)
+                warm, _ = await timed_get(session, tracks[0], stub, seek)
+                print(f"seek to 50%        cold TTFB {cold * 1000:8.1f} ms   cached TTFB {warm * 1000:8.1f} ms")
+
+                _, cold_play = await timed_get(session, tracks[1], stub)
+                _, replay = await timed_get(session, tracks[1], stub)
+                mib = args.file_size / (1024 * 1024)
+                print(f"full play          cold {cold_play:7.2f}s ({mib / cold_play:6.1f} MiB/s)   "
+                      f"replay {replay:7.2f}s ({mib / replay:6.1f} MiB/s)")
+
+                before = proxy.stats()['upstream_chunks']
+                await asyncio.gather(*(timed_get(session, tracks[2], stub) for _ in range(args.listeners)))
+                fetched = proxy.stats()['upstream_chunks'] - before
+                chunks = -(-args.file_size // args.chunk_size)
+                print(f"{args.listeners} listeners        {fetched} upstream chunk fetches "
+                      f"(file has {chunks} chunks; {args.listeners * chunks} without sharing)")
+                stats = proxy.stats()
+                print(f"cache              {stats['cache']['hits']} hits, {stats['cache']['misses']} misses, "
+                      f"{stats['coalesced_chunks']} coalesced fetches")
+        finally:
+            await stub_runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming proxy benchmark")
+    parser.add_argument('--file-size', type=int, default=16 * 1024 * 1024)
+    parser.add_argument('--chunk-size', type=int, default=1024 * 1024)
+    parser.add_argument('--prefetch', type=int, default=4)
+    parser.add_argument('--listeners', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--bandwidth-kbps', type=float, default=8192.0, help="Per-connection stub limit")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
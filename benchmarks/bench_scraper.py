@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Offline scraper benchmark against the local Archive.org stub.
+
+Drives search_albums, advanced_search and get_verified_flac_files at several
+concurrency levels and writes p50/p95/p99 latency, throughput and peak RSS as JSON.
+
+Usage: python benchmarks/bench_scraper.py [--concurrency 1 8 32] [--output results.json]
+       python benchmarks/bench_scraper.py --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from archive_stub import ArchiveStub
+from src.archive.scheduler import RequestScheduler
+from src.archive.scraper import ArchiveScraper
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+OPERATIONS = ('search_albums', 'advanced_search', 'get_verified_flac_files')
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB (0 if unavailable)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def git_commit() -> str:
+    """Current git commit, so results can be compared across commits."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+
+async def run_operation(scraper: ArchiveScraper, stub: ArchiveStub, operation: str,
+                        concurrency: int, iterations: int) -> Dict:
+    """Run one operation iterations times with the given concurrency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    requests_before = stub.total_requests
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            if operation == 'search_albums':
+                result = await scraper.search_albums(f"Album {i}", "Artist")
+                ok = bool(result)
+            elif operation == 'advanced_search':
+                result = await scraper.advanced_search(f"Album {i}", "Artist")
+                ok = 'verified_album' in result
+            else:
+                async with scraper.session_context() as session:
+                    _, flacs = await scraper.get_verified_flac_files(session, f"bench-item-{i}")
+                ok = bool(flacs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    elapsed = time.perf_counter() - start
+    upstream = stub.total_requests - requests_before
+
+    return {
+        'operation': operation,
+        'concurrency': concurrency,
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'ops_per_second': round(iterations / elapsed, 2),
+        'requests_per_second': round(upstream / elapsed, 2),
+        'upstream_requests': upstream,
+    }
+
+
+async def run_benchmark(args) -> Dict:
+    """Start the stub, run every operation/concurrency pair and collect results."""
+    stub = ArchiveStub(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                       min_files=args.min_files, max_files=args.max_files, file_size=args.file_size)
+    runner = await stub.start()
+
+    # Rate limiting is benchmarked separately; here it would only measure the limit
+    scheduler = RequestScheduler(rate=args.rate, max_rate=args.rate, burst=int(args.rate),
+                                 max_concurrency=max(args.concurrency) * 4)
+    scraper = ArchiveScraper(scheduler=scheduler)
+    scraper.cache = None
+    stub.configure(scraper)
+
+    results = []
+    try:
+        async with scraper:
+            for operation in args.operations:
+                for concurrency in args.concurrency:
+                    result = await run_operation(scraper, stub, operation, concurrency, args.iterations)
+                    results.append(result)
+                    print(f"{operation:24s} c={concurrency:<4d} p50 {result['p50_ms']:8.2f} ms  "
+                          f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                          f"{result['ops_per_second']:8.2f} ops/s  {result['requests_per_second']:9.2f} req/s",
+                          file=sys.stderr)
+    finally:
+        await runner.cleanup()
+
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'config': {
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'error_rate': args.error_rate,
+            'min_files': args.min_files,
+            'max_files': args.max_files,
+            'file_size': args.file_size,
+            'iterations': args.iterations,
+        },
+        'results': results,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Print the latency/throughput change between two result files."""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = {(r['operation'], r['concurrency']): r for r in json.load(f)['results']}
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)['results']
+
+    def change(before: float, after: float) -> str:
+        return f"{(after - before) / before * 100:+7.1f}%" if before else '    n/a'
+
+    for result in new:
+        baseline = old.get((result['operation'], result['concurrency']))
+        if not baseline:
+            continue
+        print(f"{result['operation']:24s} c={result['concurrency']:<4d} "
+              f"p50 {change(baseline['p50_ms'], result['p50_ms'])}  "
+              f"p95 {change(baseline['p95_ms'], result['p95_ms'])}  "
+              f"ops/s {change(baseline['ops_per_second'], result['ops_per_second'])}")
+
+
+def main():
+    """Parse arguments and run or compare benchmarks."""
+    parser = argparse.ArgumentParser(description="Offline Archive.org scraper benchmark")
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--min-files', type=int, default=1)
+    parser.add_argument('--max-files', type=int, default=50)
+    parser.add_argument('--file-size', type=int, default=1024 * 1024)
+    parser.add_argument('--rate', type=float, default=100000.0, help="scheduler requests/second")
+    parser.add_argument('--output', help="write JSON results here (default: stdout)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = asyncio.run(run_benchmark(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Startup time of each stremtify subcommand, checked against a regression budget.
+
+Runs `python stremtify.py <command> ...` in fresh interpreters with
+STREMTIFY_STARTUP_ONLY set, so each command parses its arguments and imports
+its dependencies, then exits. Reports the median of --runs and fails (exit 1)
+when a command exceeds its budget; scale the budgets on slow machines.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--budget-scale 1.0] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_ROOT)
+from src.cli import STARTUP_ONLY_ENV
+
+# Command line and startup budget (milliseconds) per subcommand
+COMMANDS = {
+    'help': (['--help'], 150),
+    'ui': (['ui'], 150),
+    'search': (['search', 'Kind of Blue'], 700),
+    'verify': (['verify', 'identifier'], 700),
+    'playlist': (['playlist', 'https://open.spotify.com/playlist/x'], 700),
+    'resolve': (['resolve', 'https://open.spotify.com/playlist/x'], 1000),
+    'proxy': (['proxy'], 700),
+}
+
+
+def time_command(args, runs: int) -> float:
+    """Median wall-clock milliseconds to start and exit `stremtify.py args`."""
+    env = dict(os.environ, **{STARTUP_ONLY_ENV: '1'})
+    command = [sys.executable, os.path.join(PROJECT_ROOT, 'stremtify.py'), *args]
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stremtify startup time benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-scale', type=float, default=1.0, help="Multiply every budget")
+    parser.add_argument('--output', default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    # Warm the filesystem and bytecode caches
+    time_command(['--help'], 1)
+    results = {}
+    over = []
+    for name, (command, budget_ms) in COMMANDS.items():
+        median_ms = time_command(command, args.runs)
+        budget_ms *= args.budget_scale
+        results[name] = {'median_ms': round(median_ms, 1), 'budget_ms': budget_ms}
+        status = 'ok' if median_ms <= budget_ms else 'OVER BUDGET'
+        if median_ms > budget_ms:
+            over.append(name)
+        print(f"{name:10s} {median_ms:8.1f} ms  (budget {budget_ms:6.0f} ms)  {status}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if over:
+        print(f"❌ Over budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
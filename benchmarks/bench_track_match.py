@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Track-level matching benchmark against the local Archive.org stub.
+
+Serves tagged files (STREAMINFO, artwork and Vorbis comments) and matches
+--tracks Spotify-style tracks (remaster suffixes, durations a little off, plus
+one track the item does not have) against one item by reading only the FLAC
+metadata blocks. Prints the matches, the bytes read per matched track and what
+downloading the whole album would have cost.
+
+Usage: python benchmarks/bench_track_match.py [--files 12] [--tracks 3] [--file-size 33554432]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+from archive_stub import ArchiveStub
+from src.archive.scheduler import RequestScheduler
+from src.archive.scraper import ArchiveScraper
+
+
+async def run(args) -> None:
+    stub = ArchiveStub(latency_ms=args.latency_ms, min_files=args.files, max_files=args.files,
+                       file_size=args.file_size, tagged=True)
+    runner = await stub.start()
+    # Rate limiting is benchmarked separately; here it would only measure the limit
+    scheduler = RequestScheduler(rate=1000, max_rate=1000, burst=1000, max_concurrency=64)
+    scraper = ArchiveScraper(cache=None, scheduler=scheduler)
+    scraper.cache = None
+    scraper.index = None
+    stub.configure(scraper)
+
+    numbers = [1 + i * args.files // args.tracks for i in range(args.tracks)]
+    tracks = [{'title': f"Track {number} - 2011 Remaster", 'track_number': number,
+               'duration_ms': stub.track_seconds(number) * 1000 + 700} for number in numbers]
+    tracks.append({'title': "Not On This Album", 'track_number': 99, 'duration_ms': 200000})
+    try:
+        async with scraper:
+            async with scraper.session_context() as session:
+                requests_before = stub.total_requests
+                start = time.perf_counter()
+                matched = await scraper.match_tracks(session, 'bench-item', tracks)
+                elapsed = time.perf_counter() - start
+        for found in matched['matches']:
+            print(f"🎯 {found['track']['title']:28s} -> {found['url'].rsplit('/', 1)[-1]:22s} {found['score']}")
+        for track in matched['unmatched']:
+            print(f"❌ {track['title']}")
+        matches = len(matched['matches'])
+        album_mib = matched['album_bytes'] / (1024 * 1024)
+        print(f"matched {matches}/{len(tracks)} in {elapsed:.2f}s with {stub.total_requests - requests_before} "
+              f"requests, {matched['bytes'] / 1024:.1f} KiB read "
+              f"({matched['bytes_per_match'] / 1024 if matches else 0:.1f} KiB per matched track)")
+        print(f"whole album: {album_mib:.1f} MiB; matched files: {matches * args.file_size / (1024 * 1024):.1f} MiB")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track-level matching benchmark")
+    parser.add_argument('--files', type=int, default=12)
+    parser.add_argument('--tracks', type=int, default=3)
+    parser.add_argument('--file-size', type=int, default=32 * 1024 * 1024)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
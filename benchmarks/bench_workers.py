@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Job-queue throughput with 1..N worker processes against the local Archive.org stub.
+
+Runs the stub in a subprocess, queues --albums synthetic albums in a temporary
+job queue for each process count and prints albums/second, so scaling with
+core count is visible (throughput levels off once processes exceed cores).
+
+Usage: python benchmarks/bench_workers.py [--albums 400] [--processes 1,2,4]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from src.archive.scheduler import RequestScheduler
+from src.archive.scraper import ArchiveScraper
+from src.pipeline.coordinator import Coordinator
+
+# Rate limit high enough that the stub, not the scheduler, is the bottleneck
+BENCH_RATE = 10000.0
+
+
+def stub_scraper(processes: int) -> ArchiveScraper:
+    """Scraper pointed at the stub named by BENCH_STUB_URL (inherited by worker processes)."""
+    base_url = os.environ['BENCH_STUB_URL']
+    scheduler = RequestScheduler(rate=BENCH_RATE, max_rate=BENCH_RATE, burst=int(BENCH_RATE))
+    scraper = ArchiveScraper(scheduler=scheduler)
+    scraper.cache = None
+    scraper.index = None
+    scraper.base_search_url = f"{base_url}/advancedsearch.php"
+    scraper.base_scrape_url = f"{base_url}/services/search/v1/scrape"
+    scraper.base_metadata_url = f"{base_url}/metadata/"
+    scraper.base_download_url = f"{base_url}/download/"
+    return scraper
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Archive.org stub did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process job queue benchmark")
+    parser.add_argument('--albums', type=int, default=400)
+    parser.add_argument('--processes', default=','.join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})))
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), 'archive_stub.py'),
+                             '--port', str(port), '--latency-ms', str(args.latency_ms), '--max-files', '5'])
+    os.environ['BENCH_STUB_URL'] = f"http://127.0.0.1:{port}"
+    pairs = [(f"Benchmark Album {i}", f"Benchmark Artist {i % 97}") for i in range(args.albums)]
+    try:
+        wait_for_port(port)
+        baseline = None
+        for processes in [int(n) for n in args.processes.split(',')]:
+            with tempfile.TemporaryDirectory() as tmp:
+                coordinator = Coordinator(os.path.join(tmp, 'jobs.sqlite'), processes, scraper_factory=stub_scraper)
+                coordinator.queue.enqueue(pairs)
+                start = time.perf_counter()
+                summary = coordinator.run(show_progress=False)
+                elapsed = time.perf_counter() - start
+                coordinator.queue.close()
+            rate = args.albums / elapsed
+            baseline = baseline or rate
+            print(f"processes={processes:<3d} {elapsed:7.2f}s  {rate:8.1f} albums/s  "
+                  f"{rate / baseline:4.1f}x  verified={summary['verified']}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,14 +13,142 @@ class Config:
     SPOTIFY_CLIENT_SECRET: Optional[str] = os.getenv('SPOTIFY_CLIENT_SECRET')
     SPOTIFY_REDIRECT_URI: str = os.getenv('SPOTIFY_REDIRECT_URI', 'http://127.0.0.1:8888/callback')
     SPOTIFY_SCOPE: str = "playlist-read-private playlist-read-collaborative"
+    SPOTIFY_PAGE_WORKERS: int = int(os.getenv('SPOTIFY_PAGE_WORKERS', '8'))
+    SPOTIFY_RATE_LIMIT_RETRIES: int = int(os.getenv('SPOTIFY_RATE_LIMIT_RETRIES', '5'))
+    SPOTIFY_PLAYLIST_STORE_PATH: str = os.getenv(
+        'SPOTIFY_PLAYLIST_STORE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'stremtify', 'playlists.sqlite')
+    )
     
     # Archive.org Configuration
     ARCHIVE_BASE_SEARCH_URL: str = "https://archive.org/advancedsearch.php"
+    ARCHIVE_BASE_SCRAPE_URL: str = "https://archive.org/services/search/v1/scrape"
     ARCHIVE_BASE_METADATA_URL: str = "https://archive.org/metadata/"
     ARCHIVE_BASE_DOWNLOAD_URL: str = "https://archive.org/download/"
     ARCHIVE_MAX_RESULTS: int = int(os.getenv('ARCHIVE_MAX_RESULTS', '10'))
+    # Docs per scrape API page (the API requires at least 100)
+    ARCHIVE_SCRAPE_PAGE_SIZE: int = int(os.getenv('ARCHIVE_SCRAPE_PAGE_SIZE', '100'))
     ARCHIVE_TIMEOUT: int = int(os.getenv('ARCHIVE_TIMEOUT', '10'))
     
+    # Pooled HTTP session (connection limits, DNS cache TTL and keep-alive in seconds)
+    ARCHIVE_POOL_LIMIT: int = int(os.getenv('ARCHIVE_POOL_LIMIT', '100'))
+    ARCHIVE_POOL_LIMIT_PER_HOST: int = int(os.getenv('ARCHIVE_POOL_LIMIT_PER_HOST', '10'))
+    ARCHIVE_DNS_CACHE_TTL: int = int(os.getenv('ARCHIVE_DNS_CACHE_TTL', '300'))
+    ARCHIVE_KEEPALIVE_TIMEOUT: int = int(os.getenv('ARCHIVE_KEEPALIVE_TIMEOUT', '30'))
+    
+    # Adaptive request scheduler (requests/second, retries, backoff seconds)
+    ARCHIVE_RATE_LIMIT: float = float(os.getenv('ARCHIVE_RATE_LIMIT', '10'))
+    ARCHIVE_RATE_LIMIT_MAX: float = float(os.getenv('ARCHIVE_RATE_LIMIT_MAX', '50'))
+    ARCHIVE_RATE_BURST: int = int(os.getenv('ARCHIVE_RATE_BURST', '10'))
+    ARCHIVE_MAX_RETRIES: int = int(os.getenv('ARCHIVE_MAX_RETRIES', '3'))
+    ARCHIVE_BACKOFF_BASE: float = float(os.getenv('ARCHIVE_BACKOFF_BASE', '0.5'))
+    ARCHIVE_BACKOFF_MAX: float = float(os.getenv('ARCHIVE_BACKOFF_MAX', '30'))
+    # Longest pause a server's Retry-After header may impose (seconds)
+    ARCHIVE_MAX_RETRY_AFTER: float = float(os.getenv('ARCHIVE_MAX_RETRY_AFTER', '120'))
+    
+    # Per-host circuit breaker: opens when at least ARCHIVE_BREAKER_MIN_REQUESTS requests in the
+    # last ARCHIVE_BREAKER_WINDOW seconds failed at ARCHIVE_BREAKER_ERROR_RATE (0 disables),
+    # then probes again after ARCHIVE_BREAKER_COOLDOWN seconds
+    ARCHIVE_BREAKER_ERROR_RATE: float = float(os.getenv('ARCHIVE_BREAKER_ERROR_RATE', '0.5'))
+    ARCHIVE_BREAKER_MIN_REQUESTS: int = int(os.getenv('ARCHIVE_BREAKER_MIN_REQUESTS', '10'))
+    ARCHIVE_BREAKER_WINDOW: float = float(os.getenv('ARCHIVE_BREAKER_WINDOW', '30'))
+    ARCHIVE_BREAKER_COOLDOWN: float = float(os.getenv('ARCHIVE_BREAKER_COOLDOWN', '30'))
+    
+    # Advanced search candidate verification
+    # Modes: 'sequential' (one candidate at a time), 'first' (concurrent, first
+    # verified candidate wins), 'best' (verify all, pick best by ARCHIVE_RANK_BY)
+    ARCHIVE_VERIFY_MODE: str = os.getenv('ARCHIVE_VERIFY_MODE', 'first')
+    ARCHIVE_VERIFY_TOP_N: int = int(os.getenv('ARCHIVE_VERIFY_TOP_N', os.getenv('ARCHIVE_MAX_RESULTS', '10')))
+    ARCHIVE_VERIFY_CONCURRENCY: int = int(os.getenv('ARCHIVE_VERIFY_CONCURRENCY', '3'))
+    ARCHIVE_RANK_BY: str = os.getenv('ARCHIVE_RANK_BY', 'downloads')
+    
+    # Local candidate scoring; candidates scoring below the threshold are never verified
+    ARCHIVE_MATCH_ENABLED: bool = os.getenv('ARCHIVE_MATCH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    ARCHIVE_MATCH_THRESHOLD: float = float(os.getenv('ARCHIVE_MATCH_THRESHOLD', '0.55'))
+    
+    # Track-level matching from FLAC tags read with range requests: minimum score and
+    # how far (seconds) a file's duration may be from the Spotify track's
+    ARCHIVE_TRACK_MATCH_THRESHOLD: float = float(os.getenv('ARCHIVE_TRACK_MATCH_THRESHOLD', '0.7'))
+    ARCHIVE_TRACK_DURATION_TOLERANCE: float = float(os.getenv('ARCHIVE_TRACK_DURATION_TOLERANCE', '3'))
+    
+    # Race looser queries (edition suffix stripped, no creator, unquoted title, artist/year)
+    # when the strict search verifies nothing, before falling back to a Google link
+    ARCHIVE_RELAXED_SEARCH: bool = os.getenv('ARCHIVE_RELAXED_SEARCH', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Per-file FLAC verification: 'none' (trust metadata), 'sample' (HEAD a random
+    # sample), 'header' (range GET for the fLaC marker) or 'full' (HEAD every file)
+    ARCHIVE_VERIFY_STRATEGY: str = os.getenv('ARCHIVE_VERIFY_STRATEGY', 'full')
+    ARCHIVE_VERIFY_SAMPLE_SIZE: int = int(os.getenv('ARCHIVE_VERIFY_SAMPLE_SIZE', '3'))
+    ARCHIVE_VERIFY_REQUEST_LIMIT: int = int(os.getenv('ARCHIVE_VERIFY_REQUEST_LIMIT', '20'))
+    
+    # Parse item metadata incrementally, keeping only torrent/FLAC entries
+    ARCHIVE_STREAM_METADATA: bool = os.getenv('ARCHIVE_STREAM_METADATA', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Share one in-flight request between concurrent identical metadata/search/HEAD requests
+    ARCHIVE_SINGLE_FLIGHT: bool = os.getenv('ARCHIVE_SINGLE_FLIGHT', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Batched searches: albums OR-combined per advancedsearch request, URL length and row limits
+    ARCHIVE_BATCH_SEARCH: bool = os.getenv('ARCHIVE_BATCH_SEARCH', 'true').lower() in ('1', 'true', 'yes')
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv('ARCHIVE_BATCH_SIZE', '40'))
+    ARCHIVE_BATCH_MAX_URL: int = int(os.getenv('ARCHIVE_BATCH_MAX_URL', '6000'))
+    ARCHIVE_BATCH_MAX_ROWS: int = int(os.getenv('ARCHIVE_BATCH_MAX_ROWS', '1000'))
+    
+    # Batch playlist resolution
+    BATCH_CONCURRENCY: int = int(os.getenv('BATCH_CONCURRENCY', '8'))
+    # Narrow verified albums to the files matching the playlist's tracks
+    BATCH_TRACK_MODE: bool = os.getenv('BATCH_TRACK_MODE', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Multi-process job queue: worker processes (0 = one per core), lease length and
+    # attempts per job, jobs leased at once and queue poll interval (seconds)
+    JOB_QUEUE_PATH: str = os.getenv(
+        'JOB_QUEUE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'stremtify', 'jobs.sqlite')
+    )
+    JOB_WORKERS: int = int(os.getenv('JOB_WORKERS', '0'))
+    JOB_LEASE_SECONDS: int = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    JOB_LEASE_BATCH: int = int(os.getenv('JOB_LEASE_BATCH', '40'))
+    JOB_POLL_INTERVAL: float = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+    # Seconds a SQLite connection waits for another process's lock (job queue, response cache, item index)
+    SQLITE_BUSY_TIMEOUT: float = float(os.getenv('SQLITE_BUSY_TIMEOUT', '30'))
+    
+    # Archive.org response cache ('sqlite' or 'none'); TTLs are in seconds
+    ARCHIVE_CACHE_BACKEND: str = os.getenv('ARCHIVE_CACHE_BACKEND', 'sqlite')
+    ARCHIVE_CACHE_PATH: str = os.getenv(
+        'ARCHIVE_CACHE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'stremtify', 'archive_cache.sqlite')
+    )
+    ARCHIVE_CACHE_MAX_BYTES: int = int(os.getenv('ARCHIVE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    ARCHIVE_CACHE_TTL_SEARCH: int = int(os.getenv('ARCHIVE_CACHE_TTL_SEARCH', '3600'))
+    ARCHIVE_CACHE_TTL_METADATA: int = int(os.getenv('ARCHIVE_CACHE_TTL_METADATA', '86400'))
+    ARCHIVE_CACHE_TTL_HEAD: int = int(os.getenv('ARCHIVE_CACHE_TTL_HEAD', '86400'))
+    # "No results" searches and items without valid FLACs
+    ARCHIVE_CACHE_TTL_NEGATIVE: int = int(os.getenv('ARCHIVE_CACHE_TTL_NEGATIVE', '86400'))
+    
+    # Local full-text index of seen items ('off', 'record' or 'prefer'); max age in seconds
+    ARCHIVE_INDEX_MODE: str = os.getenv('ARCHIVE_INDEX_MODE', 'record')
+    ARCHIVE_INDEX_PATH: str = os.getenv(
+        'ARCHIVE_INDEX_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'stremtify', 'archive_index.sqlite')
+    )
+    ARCHIVE_INDEX_MAX_AGE: int = int(os.getenv('ARCHIVE_INDEX_MAX_AGE', str(7 * 24 * 3600)))
+    
+    # FLAC downloads: files in parallel, range segment size (bytes) and connections per file
+    DOWNLOAD_DIR: str = os.getenv('DOWNLOAD_DIR', 'downloads')
+    DOWNLOAD_CONCURRENCY: int = int(os.getenv('DOWNLOAD_CONCURRENCY', '4'))
+    DOWNLOAD_SEGMENT_SIZE: int = int(os.getenv('DOWNLOAD_SEGMENT_SIZE', str(8 * 1024 * 1024)))
+    DOWNLOAD_SEGMENT_CONNECTIONS: int = int(os.getenv('DOWNLOAD_SEGMENT_CONNECTIONS', '4'))
+    DOWNLOAD_TIMEOUT: int = int(os.getenv('DOWNLOAD_TIMEOUT', '300'))
+    
+    # Local streaming proxy: listen address, on-disk chunk cache (bytes) and chunks read ahead
+    PROXY_HOST: str = os.getenv('PROXY_HOST', '127.0.0.1')
+    PROXY_PORT: int = int(os.getenv('PROXY_PORT', '8765'))
+    PROXY_CACHE_DIR: str = os.getenv(
+        'PROXY_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'stremtify', 'chunks')
+    )
+    PROXY_CACHE_MAX_BYTES: int = int(os.getenv('PROXY_CACHE_MAX_BYTES', str(2 * 1024 * 1024 * 1024)))
+    PROXY_CHUNK_SIZE: int = int(os.getenv('PROXY_CHUNK_SIZE', str(1024 * 1024)))
+    PROXY_PREFETCH_CHUNKS: int = int(os.getenv('PROXY_PREFETCH_CHUNKS', '4'))
+    
+    # Streamlit UI: how long finished searches are shared across sessions (seconds)
+    UI_SEARCH_CACHE_TTL: int = int(os.getenv('UI_SEARCH_CACHE_TTL', '600'))
+    
     # File size limits
     MIN_FLAC_SIZE: int = 102400  # 100KB minimum for valid FLAC files
     
@@ -63,7 +63,8 @@ def main():
         print("\n📋 Next steps:")
         print("1. Edit .env file with your Spotify API credentials")
         print("2. Run the app: streamlit run app.py")
-        print("3. Or use individual modules:")
+        print("3. Or use the command line: python stremtify.py --help")
+        print("4. Or use individual modules:")
         print("   - python src/spotify/playlist_parser.py")
         print("   - python src/archive/scraper.py")
     else:
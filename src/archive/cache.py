@@ -0,0 +1,255 @@
+"""
+Response cache for Archive.org requests.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+import sys
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+
+
+def is_lock_error(error: sqlite3.OperationalError) -> bool:
+    """Whether an OperationalError means another connection kept the database locked."""
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class ResponseCache:
+    """Base class for response cache backends.
+
+    Subclasses implement _get/_set/_clear; hit, miss and bytes-saved
+    statistics are tracked here so every backend reports them the same way.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, int]] = None):
+        """Initialize cache statistics and per-endpoint TTLs (seconds)."""
+        self.ttls = ttls or {
+            'search': Config.ARCHIVE_CACHE_TTL_SEARCH,
+            'metadata': Config.ARCHIVE_CACHE_TTL_METADATA,
+            'head': Config.ARCHIVE_CACHE_TTL_HEAD,
+            'negative': Config.ARCHIVE_CACHE_TTL_NEGATIVE,
+        }
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached body for key, or None on a miss or expired entry."""
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_saved += len(value)
+        return value
+
+    def set(self, key: str, value: str, endpoint: str) -> None:
+        """Store a body under key using the TTL configured for endpoint."""
+        ttl = self.ttls.get(endpoint, self.ttls.get('search', 0))
+        if ttl <= 0:
+            return
+        self._set(key, value, time.time() + ttl)
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        self._clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/bytes-saved counters."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes_saved': self.bytes_saved,
+        }
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+
+class SQLiteResponseCache(ResponseCache):
+    """SQLite-backed response cache with size-bounded LRU eviction.
+
+    The stored size is tracked in memory, so a write only scans the table when
+    it pushes the cache over max_bytes. Expired rows are purged every
+    PURGE_INTERVAL seconds, and the access times of hits are buffered and
+    written in batches instead of one write transaction per read. Worker
+    processes share the database: a lookup or write that still finds it
+    locked after SQLITE_BUSY_TIMEOUT counts as a miss or is skipped, since
+    the cache is only an optimization.
+    """
+
+    # Seconds between purges of expired entries (which also resync the size total)
+    PURGE_INTERVAL = 60
+    # Buffered access times are written once this many hits are pending
+    TOUCH_BATCH_SIZE = 256
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None,
+                 ttls: Optional[Dict[str, int]] = None):
+        """Open (or create) the cache database at path."""
+        super().__init__(ttls)
+        self.path = path or Config.ARCHIVE_CACHE_PATH
+        self.max_bytes = max_bytes if max_bytes is not None else Config.ARCHIVE_CACHE_MAX_BYTES
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Streamlit reruns and worker threads may share one scraper
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)')
+        self._conn.commit()
+        # key -> time of its last hit, not yet written to accessed_at
+        self._touched: Dict[str, float] = {}
+        self._total = 0
+        self._next_purge = 0.0
+        with self._lock:
+            try:
+                self._purge(time.time())
+            except sqlite3.OperationalError as e:
+                # The first write retries the purge (and sizes the cache)
+                self._skip_locked(e)
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        """Bytes an entry counts against max_bytes; HEAD and negative entries are mostly key."""
+        return len(key) + len(value)
+
+    def _skip_locked(self, error: sqlite3.OperationalError) -> None:
+        """Roll back after a lock error (the caller holds the lock); re-raise other errors."""
+        if not is_lock_error(error):
+            raise error
+        self._conn.rollback()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            try:
+                return self._get_locked(key, time.time())
+            except sqlite3.OperationalError as e:
+                self._skip_locked(e)
+                return None
+
+    def _get_locked(self, key: str, now: float) -> Optional[str]:
+        """Look up a key (the caller holds the lock)."""
+        row = self._conn.execute(
+            'SELECT value, size, expires_at FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, size, expires_at = row
+        if expires_at <= now:
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._conn.commit()
+            self._touched.pop(key, None)
+            self._total -= size
+            return None
+        self._touched[key] = now
+        if len(self._touched) >= self.TOUCH_BATCH_SIZE:
+            self._flush_touched()
+            self._conn.commit()
+        return value
+
+    def _set(self, key: str, value: str, expires_at: float) -> None:
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            total = self._total
+            try:
+                row = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, value, size, expires_at, now)
+                )
+                self._touched.pop(key, None)
+                self._total += size - (row[0] if row else 0)
+                if now >= self._next_purge:
+                    self._purge(now)
+                if self._total > self.max_bytes:
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.OperationalError as e:
+                self._skip_locked(e)
+                self._total = total
+
+    def _flush_touched(self) -> None:
+        """Write buffered access times (the caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany('UPDATE responses SET accessed_at = ? WHERE key = ?',
+                                   [(at, key) for key, at in self._touched.items()])
+            self._touched.clear()
+
+    def _purge(self, now: float) -> None:
+        """Drop expired entries and resync the size total, since other processes may share the file."""
+        self._conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+        self._conn.commit()
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        self._next_purge = now + self.PURGE_INTERVAL
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until under max_bytes."""
+        self._flush_touched()
+        excess = self._total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', stale_keys)
+        self._total -= freed
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+            self._touched.clear()
+            self._total = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters plus stored entry count and size."""
+        stats = super().stats()
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            stats.update({'entries': entries, 'bytes_stored': self._total})
+        return stats
+
+    def close(self) -> None:
+        """Write pending access times and close the underlying database connection."""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+def create_cache(backend: Optional[str] = None) -> Optional[ResponseCache]:
+    """Create the configured cache backend, or None when caching is disabled."""
+    backend = (backend or Config.ARCHIVE_CACHE_BACKEND).lower()
+    if backend in ('', 'none', 'off'):
+        return None
+    if backend == 'sqlite':
+        return SQLiteResponseCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,363 @@
+"""
+Parallel, resumable FLAC downloader for verified Archive.org items.
+"""
+import aiohttp
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import sys
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+from src.archive.scheduler import FetchError
+from src.archive.scraper import ArchiveScraper
+
+CHUNK_SIZE = 64 * 1024
+
+# Checksums from the item metadata that are verified while downloading
+CHECKSUM_FIELDS = ('md5', 'sha1')
+
+
+class _SegmentFailed(Exception):
+    """Raised inside a segment task to abort the rest of the file."""
+
+    def __init__(self, error: FetchError):
+        super().__init__(error.reason)
+        self.error = error
+
+
+class OrderedDigest:
+    """Hashes byte ranges that arrive out of order, in file order.
+
+    Data at the current offset is hashed immediately; data further ahead is held
+    until the gap before it is filled, and wait_for_window() keeps segments from
+    starting more than ``window`` bytes ahead, which bounds that buffer. Ranges
+    that were already hashed (e.g. re-sent by a retried request) are skipped.
+    """
+
+    def __init__(self, algorithms: Iterable[str], window: int):
+        self.hashes = {name: hashlib.new(name) for name in algorithms}
+        self.window = window
+        self.offset = 0
+        # Min-heap of (offset, sequence, data) waiting for the gap before them
+        self.pending: List[Tuple[int, int, bytes]] = []
+        self._sequence = itertools.count()
+        self._moved = asyncio.Event()
+
+    def feed(self, offset: int, data: bytes) -> None:
+        """Add data found at offset in the file."""
+        if not self.hashes:
+            return
+        if offset > self.offset:
+            heapq.heappush(self.pending, (offset, next(self._sequence), data))
+            return
+        self._consume(offset, data)
+        while self.pending and self.pending[0][0] <= self.offset:
+            start, _, pending = heapq.heappop(self.pending)
+            self._consume(start, pending)
+        moved, self._moved = self._moved, asyncio.Event()
+        moved.set()
+
+    def _consume(self, offset: int, data: bytes) -> None:
+        skip = self.offset - offset
+        if skip >= len(data):
+            return
+        view = memoryview(data)[skip:]
+        for digest in self.hashes.values():
+            digest.update(view)
+        self.offset += len(view)
+
+    async def wait_for_window(self, start: int) -> None:
+        """Wait until start is within window bytes of the hashed offset."""
+        while self.hashes and start >= self.offset + self.window:
+            await self._moved.wait()
+
+    def hexdigests(self) -> Dict[str, str]:
+        return {name: digest.hexdigest() for name, digest in self.hashes.items()}
+
+
+class FlacDownloader:
+    """Downloads the verified FLAC files of Archive.org items.
+
+    Files are fetched DOWNLOAD_CONCURRENCY at a time; files larger than
+    DOWNLOAD_SEGMENT_SIZE are split into range requests with up to
+    DOWNLOAD_SEGMENT_CONNECTIONS per file. Each file is written to a
+    preallocated ``.part`` file whose finished segments are listed in a
+    ``.part.json`` sidecar, so an interrupted download resumes where it
+    stopped. The md5/sha1 from the item metadata is computed as the bytes
+    arrive and checked before the file is moved into place.
+    """
+
+    def __init__(self, scraper: Optional[ArchiveScraper] = None, dest_dir: Optional[str] = None,
+                 concurrency: Optional[int] = None, segment_size: Optional[int] = None,
+                 connections: Optional[int] = None):
+        """Initialize limits from arguments or Config; requests go through the scraper's scheduler."""
+        self.scraper = scraper or ArchiveScraper()
+        self.dest_dir = dest_dir or Config.DOWNLOAD_DIR
+        self.concurrency = concurrency or Config.DOWNLOAD_CONCURRENCY
+        self.segment_size = segment_size or Config.DOWNLOAD_SEGMENT_SIZE
+        self.connections = connections or Config.DOWNLOAD_SEGMENT_CONNECTIONS
+        self.timeout = Config.DOWNLOAD_TIMEOUT
+        self._stats = {'files': 0, 'skipped': 0, 'failed': 0, 'bytes': 0, 'resumed_bytes': 0, 'seconds': 0.0}
+
+    # Part files
+
+    @staticmethod
+    def _load_state(state_path: str, size: int, segment_size: int) -> Optional[List[int]]:
+        """Finished segment indices of a previous attempt, if it used the same layout."""
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('size') != size or state.get('segment_size') != segment_size:
+            return None
+        return state.get('done', [])
+
+    @staticmethod
+    def _save_state(state_path: str, size: int, segment_size: int, done: List[int]) -> None:
+        temp_path = state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'size': size, 'segment_size': segment_size, 'done': sorted(done)}, f)
+        os.replace(temp_path, state_path)
+
+    @staticmethod
+    def _preallocate(part_path: str, size: Optional[int]) -> None:
+        with open(part_path, 'wb') as f:
+            if not size:
+                return
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(f.fileno(), 0, size)
+            else:
+                f.truncate(size)
+
+    @staticmethod
+    def _segments(size: Optional[int], segment_size: int) -> List[Tuple[int, Optional[int]]]:
+        """Inclusive (start, end) byte ranges; a single open range if the size is unknown."""
+        if not size:
+            return [(0, None)]
+        return [(start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+
+    # Transfers
+
+    async def _fetch_segment(self, session: aiohttp.ClientSession, url: str, part_path: str,
+                             start: int, end: Optional[int], ranged: bool, digest: OrderedDigest,
+                             result: Dict) -> Optional[FetchError]:
+        """Download one segment into the part file, feeding the digest as chunks arrive.
+        
+        Once the segment is complete, the bytes of the attempt that completed it
+        are added to result['bytes'] and the aggregate stats; attempts that were
+        retried (and rewritten) are not counted.
+        """
+        headers = {'Range': f"bytes={start}-{end}"} if ranged else {}
+        received = 0
+
+        async def read(response: aiohttp.ClientResponse) -> bool:
+            nonlocal received
+            received = 0
+            if ranged and response.status != 206:
+                raise ValueError("server ignored the Range header")
+            position = start
+            with open(part_path, 'r+b') as f:
+                f.seek(start)
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.feed(position, chunk)
+                    position += len(chunk)
+                    received += len(chunk)
+            if end is not None and position != end + 1:
+                raise ValueError(f"expected {end + 1 - start} bytes, got {position - start}")
+            return True
+
+        response = await self.scraper.request(session, 'GET', url, read, timeout=self.timeout,
+                                              headers=headers)
+        if isinstance(response, FetchError):
+            return response
+        result['bytes'] += received
+        self._stats['bytes'] += received
+        return None
+
+    async def _replay_segment(self, part_path: str, start: int, end: int, digest: OrderedDigest) -> None:
+        """Hash a segment finished by an earlier run from the part file."""
+        with open(part_path, 'rb') as f:
+            f.seek(start)
+            position = start
+            while position <= end:
+                chunk = f.read(min(CHUNK_SIZE, end + 1 - position))
+                if not chunk:
+                    break
+                digest.feed(position, chunk)
+                position += len(chunk)
+                self._stats['resumed_bytes'] += len(chunk)
+                await asyncio.sleep(0)
+
+    async def download_file(self, session: aiohttp.ClientSession, url: str, path: str,
+                            size: Optional[int] = None, checksums: Optional[Dict[str, str]] = None) -> Dict:
+        """Download url to path, resuming and verifying checksums when size and checksums are known.
+
+        Returns a dict with the final 'status' ('downloaded', 'exists', 'failed' or
+        'checksum_mismatch') and the bytes transferred.
+        """
+        result = {'url': url, 'path': path, 'size': size, 'status': 'failed', 'bytes': 0}
+        checksums = {name: value.lower() for name, value in (checksums or {}).items() if value}
+        if size and os.path.exists(path) and os.path.getsize(path) == size:
+            result['status'] = 'exists'
+            return result
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        part_path = path + '.part'
+        state_path = part_path + '.json'
+        segments = self._segments(size, self.segment_size)
+        ranged = len(segments) > 1
+
+        done = self._load_state(state_path, size, self.segment_size) if size and os.path.exists(part_path) else None
+        if done is None:
+            done = []
+            self._preallocate(part_path, size)
+        resumed = set(done)
+
+        digest = OrderedDigest(checksums, self.connections * self.segment_size)
+        semaphore = asyncio.Semaphore(max(1, self.connections))
+
+        async def run(index: int, start: int, end: Optional[int]) -> None:
+            await digest.wait_for_window(start)
+            async with semaphore:
+                if index in resumed:
+                    await self._replay_segment(part_path, start, end, digest)
+                    return
+                error = await self._fetch_segment(session, url, part_path, start, end, ranged, digest, result)
+                if error is not None:
+                    raise _SegmentFailed(error)
+                if size:
+                    done.append(index)
+                    self._save_state(state_path, size, self.segment_size, done)
+
+        tasks = [asyncio.create_task(run(index, start, end)) for index, (start, end) in enumerate(segments)]
+        try:
+            await asyncio.gather(*tasks)
+        except _SegmentFailed as e:
+            result['error'] = e.error.to_dict()
+            return result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        actual = digest.hexdigests()
+        mismatched = [name for name, expected in checksums.items() if actual[name] != expected]
+        if mismatched:
+            # Start over next time rather than resuming corrupt data
+            for stale in (part_path, state_path):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            self._stats['bytes'] -= result['bytes']
+            result['discarded_bytes'], result['bytes'] = result['bytes'], 0
+            result['status'] = 'checksum_mismatch'
+            result['error'] = {'reason': f"{', '.join(mismatched)} mismatch", 'status': None, 'transient': True}
+            return result
+
+        os.replace(part_path, path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        result['status'] = 'downloaded'
+        result['verified'] = sorted(checksums)
+        return result
+
+    async def download(self, session: aiohttp.ClientSession, identifier: str, flac_urls: List[str],
+                       dest_dir: Optional[str] = None) -> Dict:
+        """Download the given FLAC URLs of an item (as returned by get_verified_flac_files).
+
+        Sizes and checksums are looked up in the item's metadata file entries.
+        Files go to <dest_dir>/<identifier>/<file name>.
+        """
+        item_dir = os.path.abspath(os.path.join(dest_dir or self.dest_dir, identifier))
+        prefix = f"{self.scraper.base_download_url}{identifier}/"
+        entries = await self.scraper.fetch_file_entries(session, identifier)
+        by_url = {prefix + entry.get('name', ''): entry for entry in entries or []}
+
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def fetch(url: str) -> Dict:
+            name = url[len(prefix):] if url.startswith(prefix) else url.rsplit('/', 1)[-1]
+            path = os.path.normpath(os.path.join(item_dir, name))
+            if not path.startswith(item_dir + os.sep):
+                return {'url': url, 'path': None, 'status': 'failed', 'bytes': 0,
+                        'error': {'reason': 'Unsafe file name', 'status': None, 'transient': False}}
+            entry = by_url.get(url, {})
+            size = ArchiveScraper._file_size(entry) or None
+            checksums = {field: entry.get(field) for field in CHECKSUM_FIELDS}
+            async with semaphore:
+                return await self.download_file(session, url, path, size, checksums)
+
+        start = time.perf_counter()
+        files = await asyncio.gather(*(fetch(url) for url in flac_urls))
+        seconds = time.perf_counter() - start
+
+        transferred = sum(file['bytes'] for file in files)
+        self._stats['seconds'] += seconds
+        for file in files:
+            if file['status'] == 'downloaded':
+                self._stats['files'] += 1
+            elif file['status'] == 'exists':
+                self._stats['skipped'] += 1
+            else:
+                self._stats['failed'] += 1
+        return {
+            'identifier': identifier,
+            'directory': item_dir,
+            'files': files,
+            'bytes': transferred,
+            'seconds': round(seconds, 3),
+            'throughput_mb_s': round(transferred / seconds / (1024 * 1024), 2) if seconds else 0.0,
+        }
+
+    async def download_item(self, identifier: str, dest_dir: Optional[str] = None,
+                            strategy: Optional[str] = None) -> Dict:
+        """Verify an item's FLAC files and download them."""
+        async with self.scraper.session_context() as session:
+            _, flacs = await self.scraper.get_verified_flac_files(session, identifier, strategy)
+            return await self.download(session, identifier, flacs, dest_dir)
+
+    def stats(self) -> Dict[str, float]:
+        """Aggregate file counts, bytes and throughput over all downloads so far."""
+        stats = dict(self._stats)
+        seconds = stats['seconds']
+        stats['seconds'] = round(seconds, 3)
+        stats['throughput_mb_s'] = round(stats['bytes'] / seconds / (1024 * 1024), 2) if seconds else 0.0
+        return stats
+
+
+def print_report(report: Dict) -> None:
+    """Print a per-item download summary."""
+    for file in report['files']:
+        icon = {'downloaded': '✅', 'exists': '⏭️'}.get(file['status'], '❌')
+        detail = file.get('error', {}).get('reason', '')
+        print(f"{icon} {os.path.basename(file['path'] or file['url'])} {file['status']} {detail}".rstrip())
+    print(f"📦 {report['bytes'] / (1024 * 1024):.1f} MiB in {report['seconds']}s "
+          f"({report['throughput_mb_s']} MiB/s) -> {report['directory']}")
+
+
+def main():
+    """Main function for command-line usage."""
+    identifier = input("🗂️ Archive.org identifier: ").strip()
+    dest_dir = input(f"💾 Download directory [{Config.DOWNLOAD_DIR}]: ").strip() or None
+
+    if not identifier:
+        print("❌ Identifier is required")
+        return
+
+    async def run():
+        async with ArchiveScraper() as scraper:
+            return await FlacDownloader(scraper, dest_dir).download_item(identifier)
+
+    print_report(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+FLAC container helpers for header-level verification and metadata reads.
+"""
+import struct
+from typing import Awaitable, Callable, Dict, Optional
+
+FLAC_MAGIC = b'fLaC'
+ID3_MAGIC = b'ID3'
+ID3_HEADER_SIZE = 10
+
+# Metadata block header: last-block flag, 7-bit type, 24-bit length
+METADATA_HEADER_SIZE = 4
+STREAMINFO = 0
+VORBIS_COMMENT = 4
+STREAMINFO_SIZE = 34
+
+# First read of a file; usually holds STREAMINFO and the Vorbis comments unless
+# embedded artwork comes first (it is then skipped with a further read)
+METADATA_PROBE_SIZE = 16 * 1024
+
+
+def id3v2_size(header: bytes) -> int:
+    """Return the total length of a leading ID3v2 tag, or 0 if there is none.
+
+    Some FLAC rips carry an ID3v2 tag before the fLaC marker; its size is a
+    28-bit syncsafe integer in bytes 6-9, plus an optional 10-byte footer.
+    """
+    if len(header) < ID3_HEADER_SIZE or not header.startswith(ID3_MAGIC):
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    has_footer = bool(header[5] & 0x10)
+    return ID3_HEADER_SIZE + size + (ID3_HEADER_SIZE if has_footer else 0)
+
+
+def is_flac_header(header: bytes) -> bool:
+    """Whether bytes read at the stream start begin with the fLaC marker."""
+    return header[:len(FLAC_MAGIC)] == FLAC_MAGIC
+
+
+def parse_streaminfo(block: bytes) -> Dict:
+    """Sample rate, channels, bits per sample, total samples and duration (seconds) of a STREAMINFO block.
+
+    Duration is None when the encoder did not record the total sample count.
+    """
+    if len(block) < STREAMINFO_SIZE:
+        raise ValueError("Truncated STREAMINFO block")
+    # Bytes 10-17: 20-bit sample rate, 3-bit channels - 1, 5-bit bits per sample - 1, 36-bit total samples
+    packed = int.from_bytes(block[10:18], 'big')
+    sample_rate = packed >> 44
+    total_samples = packed & 0xFFFFFFFFF
+    return {
+        'sample_rate': sample_rate,
+        'channels': ((packed >> 41) & 0x7) + 1,
+        'bits_per_sample': ((packed >> 36) & 0x1F) + 1,
+        'total_samples': total_samples,
+        'duration': total_samples / sample_rate if sample_rate and total_samples else None,
+    }
+
+
+def parse_vorbis_comment(block: bytes) -> Dict[str, str]:
+    """Tags of a VORBIS_COMMENT block, keyed by upper-case field name (first value wins)."""
+    try:
+        vendor_length, = struct.unpack_from('<I', block, 0)
+        offset = 4 + vendor_length
+        count, = struct.unpack_from('<I', block, offset)
+        offset += 4
+        tags: Dict[str, str] = {}
+        for _ in range(count):
+            length, = struct.unpack_from('<I', block, offset)
+            offset += 4
+            comment = block[offset:offset + length].decode('utf-8', errors='replace')
+            offset += length
+            key, separator, value = comment.partition('=')
+            if separator:
+                tags.setdefault(key.upper(), value)
+    except struct.error:
+        raise ValueError("Truncated VORBIS_COMMENT block")
+    return tags
+
+
+async def read_flac_metadata(read: Callable[[int, int], Awaitable[bytes]],
+                             probe_size: int = METADATA_PROBE_SIZE) -> Dict:
+    """Read STREAMINFO and Vorbis comments with as few small reads as possible.
+
+    read(start, length) returns up to length bytes at offset start (e.g. an
+    HTTP Range request). The metadata blocks are walked from one buffered read;
+    blocks outside the buffer (behind large artwork) trigger a read at their
+    offset, and the audio frames are never touched. Returns
+    {"streaminfo": {...} or None, "tags": {...}}; raises ValueError if the
+    data is not a FLAC stream.
+    """
+    buffer_start, buffer = 0, await read(0, probe_size)
+
+    async def window(start: int, length: int) -> bytes:
+        nonlocal buffer_start, buffer
+        end = start + length
+        if start < buffer_start or end > buffer_start + len(buffer):
+            buffer_start, buffer = start, await read(start, max(length, probe_size))
+        return buffer[start - buffer_start:end - buffer_start]
+
+    position = id3v2_size(buffer[:ID3_HEADER_SIZE])
+    if not is_flac_header(await window(position, len(FLAC_MAGIC))):
+        raise ValueError("Not a FLAC stream")
+    position += len(FLAC_MAGIC)
+
+    metadata: Dict[str, Optional[Dict]] = {'streaminfo': None, 'tags': {}}
+    wanted = {STREAMINFO, VORBIS_COMMENT}
+    while wanted:
+        header = await window(position, METADATA_HEADER_SIZE)
+        if len(header) < METADATA_HEADER_SIZE:
+            raise ValueError("Truncated metadata block header")
+        is_last = bool(header[0] & 0x80)
+        block_type = header[0] & 0x7F
+        length = int.from_bytes(header[1:4], 'big')
+        position += METADATA_HEADER_SIZE
+        if block_type in wanted:
+            block = await window(position, length)
+            if block_type == STREAMINFO:
+                metadata['streaminfo'] = parse_streaminfo(block)
+            else:
+                metadata['tags'] = parse_vorbis_comment(block)
+            wanted.discard(block_type)
+        position += length
+        if is_last:
+            break
+    return metadata
@@ -0,0 +1,365 @@
+"""
+Local full-text index of Archive.org items seen in earlier searches.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+import sys
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+from src.archive.cache import is_lock_error
+from src.archive.matching import field_text, normalize_title, tokens
+
+INDEX_MODES = ('off', 'record', 'prefer')
+
+# Rows written per transaction during bulk imports
+IMPORT_BATCH_SIZE = 1000
+# Bytes read at a time when streaming a JSON dump
+DUMP_CHUNK_SIZE = 1024 * 1024
+# A first line longer than this is taken for a single-line JSON document, not JSON Lines
+DUMP_LINE_LIMIT = 1024 * 1024
+
+
+class ItemIndex:
+    """SQLite FTS5 index of item metadata and verified FLAC lists.
+
+    Titles and creators are indexed in normalized form (see matching.normalize_title),
+    so a lookup matches the same tokens the match scorer compares. Entries older
+    than max_age seconds count as stale and are ignored by lookups. Like the
+    response cache, a lookup that finds the database locked by another process
+    counts as a miss and a locked write is skipped.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: Optional[int] = None):
+        """Open (or create) the index database at path."""
+        self.path = path or Config.ARCHIVE_INDEX_PATH
+        self.max_age = max_age if max_age is not None else Config.ARCHIVE_INDEX_MAX_AGE
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            ' identifier TEXT PRIMARY KEY,'
+            ' title TEXT NOT NULL,'
+            ' creator TEXT NOT NULL,'
+            ' year TEXT,'
+            ' downloads INTEGER NOT NULL DEFAULT 0,'
+            ' size INTEGER NOT NULL DEFAULT 0,'
+            ' seen_at REAL NOT NULL,'
+            ' torrent TEXT,'
+            ' flacs TEXT,'
+            ' verified_at REAL)'
+        )
+        # Shares rowids with items; holds the normalized text only
+        self._conn.execute('CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(title, creator)')
+        self._conn.commit()
+
+    def _skip_locked(self, error: sqlite3.OperationalError) -> None:
+        """Roll back after a lock error (the caller holds the lock); re-raise other errors."""
+        if not is_lock_error(error):
+            raise error
+        self._conn.rollback()
+
+    # Writes
+
+    def _upsert(self, album: Dict, seen_at: float) -> None:
+        title = field_text(album.get('title'))
+        creator = field_text(album.get('artist'))
+        self._conn.execute(
+            'INSERT INTO items (identifier, title, creator, year, downloads, size, seen_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (identifier) DO UPDATE SET title = excluded.title, creator = excluded.creator, '
+            ' year = excluded.year, downloads = excluded.downloads, size = excluded.size, '
+            ' seen_at = excluded.seen_at',
+            (album['identifier'], title, creator, field_text(album.get('year')),
+             album.get('downloads') or 0, album.get('size') or 0, seen_at)
+        )
+        rowid = self._conn.execute(
+            'SELECT rowid FROM items WHERE identifier = ?', (album['identifier'],)
+        ).fetchone()[0]
+        self._conn.execute('DELETE FROM items_fts WHERE rowid = ?', (rowid,))
+        self._conn.execute(
+            'INSERT INTO items_fts (rowid, title, creator) VALUES (?, ?, ?)',
+            (rowid, normalize_title(title), normalize_title(creator))
+        )
+
+    def add_albums(self, albums: Iterable[Dict]) -> int:
+        """Insert or refresh album dicts (as returned by parse_search_results).
+
+        Returns how many were written, 0 if the database stayed locked.
+        """
+        now = time.time()
+        count = 0
+        with self._lock:
+            try:
+                for album in albums:
+                    self._upsert(album, now)
+                    count += 1
+                self._conn.commit()
+            except sqlite3.OperationalError as e:
+                self._skip_locked(e)
+                return 0
+        return count
+
+    def add_verified(self, identifier: str, torrent: Optional[str], flacs: List[str]) -> None:
+        """Record the verified torrent link and FLAC URLs of an item."""
+        with self._lock:
+            try:
+                self._conn.execute(
+                    'UPDATE items SET torrent = ?, flacs = ?, verified_at = ? WHERE identifier = ?',
+                    (torrent, json.dumps(flacs), time.time(), identifier)
+                )
+                self._conn.commit()
+            except sqlite3.OperationalError as e:
+                self._skip_locked(e)
+
+    # Lookups
+
+    def search(self, album_name: str, artist_name: Optional[str] = None,
+               limit: Optional[int] = None) -> List[Dict]:
+        """Fresh items whose title (and creator) contain every query token, by downloads.
+
+        An empty list means a miss: nothing indexed matches, or only stale entries do.
+        """
+        title_tokens = tokens(album_name)
+        if not title_tokens:
+            return []
+        terms = [f'title : "{token}"' for token in sorted(title_tokens)]
+        if artist_name:
+            terms += [f'creator : "{token}"' for token in sorted(tokens(artist_name))]
+
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    'SELECT items.identifier, items.title, items.creator, items.year, items.downloads, items.size '
+                    'FROM items_fts JOIN items ON items.rowid = items_fts.rowid '
+                    'WHERE items_fts MATCH ? AND items.seen_at > ? '
+                    'ORDER BY items.downloads DESC LIMIT ?',
+                    (' AND '.join(terms), time.time() - self.max_age, limit or Config.ARCHIVE_MAX_RESULTS)
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                self._skip_locked(e)
+                rows = []
+
+        if not rows:
+            self.misses += 1
+            return []
+        self.hits += 1
+        return [{
+            'identifier': identifier,
+            'title': title,
+            'artist': creator,
+            'year': year,
+            'downloads': downloads,
+            'size': size,
+            'url': f"https://archive.org/details/{identifier}"
+        } for identifier, title, creator, year, downloads, size in rows]
+
+    def get_verified(self, identifier: str) -> Optional[Tuple[Optional[str], List[str]]]:
+        """Return (torrent, flacs) if the item was verified recently, else None."""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT torrent, flacs FROM items WHERE identifier = ? AND verified_at > ?',
+                    (identifier, time.time() - self.max_age)
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                self._skip_locked(e)
+                row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0], json.loads(row[1])
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters plus indexed and verified item counts."""
+        with self._lock:
+            items, verified = self._conn.execute(
+                'SELECT COUNT(*), COUNT(verified_at) FROM items'
+            ).fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'items': items, 'verified': verified}
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    # Bulk import
+
+    def import_dump(self, path: str) -> Dict[str, int]:
+        """Import a dump of search results and return counts of items and verified items.
+
+        Accepts an advancedsearch response, a scrape API response ({"items": [...]}),
+        a JSON list of docs, or JSON Lines holding any of those per line, including
+        records written by the batch resolver (whose verified FLACs are kept too).
+        """
+        counts = {'items': 0, 'verified': 0}
+        batch: List[Dict] = []
+        verified: List[Tuple[str, Optional[str], List[str]]] = []
+
+        def flush() -> None:
+            counts['items'] += self.add_albums(batch)
+            for identifier, torrent, flacs in verified:
+                self.add_verified(identifier, torrent, flacs)
+            counts['verified'] += len(verified)
+            batch.clear()
+            verified.clear()
+
+        for entry in _read_dump(path):
+            if 'verified_album' in entry:
+                album = entry['verified_album']
+                batch.append(album)
+                verified.append((album['identifier'], entry.get('torrent'), entry.get('flacs') or []))
+            else:
+                batch.extend(_albums_from(entry))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+        flush()
+        return counts
+
+
+def _read_dump(path: str) -> Iterator[Dict]:
+    """Yield the entries of a JSON document or JSON Lines file, streamed in bounded memory.
+
+    JSON Lines files are read line by line. Of a JSON document, the items of a
+    top-level list, a scrape response's "items" or a search response's
+    "response.docs" are streamed one at a time; only other documents (a
+    single doc) are loaded whole.
+    """
+    with open(path, encoding='utf-8') as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        first_line = (head + f.readline(DUMP_LINE_LIMIT)).strip()
+        f.seek(0)
+        start = f.read(DUMP_CHUNK_SIZE)
+    if not head:
+        return
+    if head == '[':
+        yield from _stream_array(path, None)
+        return
+    if _is_json(first_line):
+        yield from _read_lines(path)
+        return
+    # Each try scans the whole document when its key is missing, so start with the likely one
+    keys = ('items', 'response.docs')
+    if '"response"' in start and '"items"' not in start:
+        keys = keys[::-1]
+    for key in keys:
+        found = False
+        for item in _stream_array(path, key):
+            found = True
+            yield item
+        if found:
+            return
+    with open(path, encoding='utf-8') as f:
+        yield json.load(f)
+
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _read_lines(path: str) -> Iterator[Dict]:
+    """Yield one JSON value per non-blank line."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _stream_array(path: str, key: Optional[str]) -> Iterator[Dict]:
+    """Items of the array at key in a JSON file (see streaming.iter_json_array), one at a time.
+
+    The parser is asynchronous; a private event loop drives it from this
+    synchronous generator, so it must not be called from a running loop.
+    """
+    from src.archive.streaming import iter_json_array
+
+    async def chunks() -> AsyncIterator[bytes]:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(DUMP_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    items = iter_json_array(chunks(), key)
+
+    async def take() -> List[Dict]:
+        # Items are handed over in batches; a loop run per item would dominate the parse
+        batch: List[Dict] = []
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                break
+        return batch
+
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            batch = loop.run_until_complete(take())
+            yield from batch
+            if len(batch) < IMPORT_BATCH_SIZE:
+                return
+    finally:
+        loop.run_until_complete(items.aclose())
+        loop.close()
+
+
+def _albums_from(entry: Dict) -> List[Dict]:
+    """Album dicts from a search response, scrape response or single doc."""
+    from src.archive.scraper import ArchiveScraper
+
+    if 'response' in entry:
+        return ArchiveScraper.parse_search_results(entry)
+    docs = entry['items'] if 'items' in entry else [entry]
+    return ArchiveScraper.parse_search_results({'response': {'docs': docs}})
+
+
+def create_index(mode: Optional[str] = None) -> Optional[ItemIndex]:
+    """Create the item index for the configured mode, or None when it is off."""
+    mode = (mode or Config.ARCHIVE_INDEX_MODE).lower()
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown index mode: {mode}")
+    if mode == 'off':
+        return None
+    return ItemIndex()
+
+
+def main():
+    """Bulk-import search result dumps: python src/archive/index.py dump.json [...]"""
+    paths = sys.argv[1:] or [input("📂 Path to search result dump: ").strip()]
+    index = ItemIndex()
+    for path in paths:
+        try:
+            counts = index.import_dump(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Failed to import {path}: {e}")
+            continue
+        print(f"✅ Imported {counts['items']} items ({counts['verified']} verified) from {path}")
+    stats = index.stats()
+    print(f"📚 Index now holds {stats['items']} items, {stats['verified']} verified")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Local match scoring for Archive.org search candidates.
+"""
+import functools
+import re
+import unicodedata
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import sys
+import os
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+
+# Bracketed or dash-separated edition suffixes: "(Deluxe Edition)", "[2011 Remaster]", "- Remastered"
+_EDITION_WORDS = r'(?:deluxe|expanded|remaster(?:ed)?|anniversary|edition|special|bonus|version|mono|stereo|reissue)'
+_EDITION_SUFFIX = re.compile(
+    r'\s*(?:[\(\[][^\)\]]*' + _EDITION_WORDS + r'[^\)\]]*[\)\]]|\s-\s.*' + _EDITION_WORDS + r'.*)$',
+    re.IGNORECASE
+)
+_NON_WORD = re.compile(r'[^\w]+', re.UNICODE)
+
+# Title words that usually mean a bootleg, live set or compilation rather than the album
+UNWANTED_WORDS = frozenset({
+    'live', 'bootleg', 'concert', 'greatest', 'hits', 'best', 'compilation', 'collection',
+    'anthology', 'discography', 'demos', 'rarities', 'karaoke', 'tribute', 'covers',
+})
+
+# Plausible total item size for a FLAC album (bytes)
+MIN_PLAUSIBLE_SIZE = 20 * 1024 * 1024
+MAX_PLAUSIBLE_SIZE = 5 * 1024 * 1024 * 1024
+
+
+def strip_edition(title: str) -> str:
+    """Remove trailing edition markers like "(Deluxe)" or "- 2011 Remaster"."""
+    previous = None
+    while previous != title:
+        previous = title
+        title = _EDITION_SUFFIX.sub('', title).strip()
+    return title
+
+
+@functools.lru_cache(maxsize=65536)
+def normalize_title(title: str) -> str:
+    """Lowercase, strip accents, edition suffixes and punctuation."""
+    title = unicodedata.normalize('NFKD', strip_edition(title))
+    title = ''.join(char for char in title if not unicodedata.combining(char))
+    return _NON_WORD.sub(' ', title.lower().replace('&', ' and ')).strip()
+
+
+@functools.lru_cache(maxsize=65536)
+def tokens(text: str) -> FrozenSet[str]:
+    """Token set of a normalized string."""
+    return frozenset(normalize_title(text).split())
+
+
+def token_set_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Similarity in [0, 1] of two token sets, lenient to extra tokens on one side."""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    containment = shared / min(len(a), len(b))
+    dice = 2 * shared / (len(a) + len(b))
+    return (containment + dice) / 2
+
+
+def coverage(query: FrozenSet[str], candidate: FrozenSet[str]) -> float:
+    """Fraction of the query tokens found in the candidate."""
+    if not query:
+        return 0.0
+    return len(query & candidate) / len(query)
+
+
+def field_text(value) -> str:
+    """Archive.org fields may be strings or lists of strings."""
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(item) for item in value)
+    return str(value or '')
+
+
+def _year(value) -> Optional[int]:
+    match = re.search(r'\d{4}', field_text(value))
+    return int(match.group()) if match else None
+
+
+# Leading track number of a file name: "01 - Title.flac", "1-03 Title.flac", "d1t03 Title.flac"
+_FILE_TRACK_NUMBER = re.compile(r'^(?:d\d+t|\d+-)?(\d{1,3})(?!\d)[\s._-]*', re.IGNORECASE)
+
+
+def _track_number(value) -> Optional[int]:
+    """Track number from a TRACKNUMBER tag like "3" or "3/12"."""
+    match = re.match(r'\s*(\d+)', field_text(value))
+    return int(match.group(1)) if match else None
+
+
+def file_track_info(name: str, tags: Optional[Dict[str, str]] = None) -> Tuple[str, Optional[int]]:
+    """(title, track number) of a FLAC file from its Vorbis comments, falling back to its file name."""
+    tags = tags or {}
+    stem = os.path.splitext(os.path.basename(name))[0]
+    match = _FILE_TRACK_NUMBER.match(stem)
+    title = tags.get('TITLE') or (stem[match.end():] if match else stem)
+    number = _track_number(tags.get('TRACKNUMBER')) or (int(match.group(1)) if match else None)
+    return title, number
+
+
+class TrackMatcher:
+    """Scores FLAC files against a Spotify track by title, track number and duration.
+
+    Only the signals known on both sides count. A duration far outside the
+    tolerance rejects the file outright, since it is a different recording
+    (live take, radio edit) even if the title matches.
+    """
+
+    def __init__(self, title: str, track_number: Optional[int] = None, duration_ms: Optional[int] = None,
+                 tolerance: Optional[float] = None):
+        """Prepare the normalized track."""
+        self.title_tokens = tokens(title)
+        self.track_number = track_number or None
+        self.duration = duration_ms / 1000 if duration_ms else None
+        self.tolerance = Config.ARCHIVE_TRACK_DURATION_TOLERANCE if tolerance is None else tolerance
+
+    def score(self, title: str, track_number: Optional[int] = None, duration: Optional[float] = None) -> float:
+        """Score in [0, 1] for a file's title, track number and duration (seconds)."""
+        total, weights = 0.6 * token_set_similarity(self.title_tokens, tokens(title)), 0.6
+        if self.track_number and track_number:
+            total += 0.15 * (self.track_number == track_number)
+            weights += 0.15
+        if self.duration and duration:
+            off = abs(self.duration - duration)
+            if off > 4 * self.tolerance:
+                return 0.0
+            total += 0.25 * (1.0 if off <= self.tolerance else 1.0 - (off - self.tolerance) / (3 * self.tolerance))
+            weights += 0.25
+        return total / weights
+
+
+def assign_tracks(scores: List[List[float]], threshold: float) -> List[Optional[int]]:
+    """Match each track (row) to at most one file (column), best pairs first.
+
+    Returns the file index for every track, or None where no unclaimed file
+    reaches threshold.
+    """
+    pairs = sorted(((score, track, file) for track, row in enumerate(scores) for file, score in enumerate(row)
+                    if score >= threshold), reverse=True)
+    assigned: List[Optional[int]] = [None] * len(scores)
+    taken = set()
+    for _, track, file in pairs:
+        if assigned[track] is None and file not in taken:
+            assigned[track] = file
+            taken.add(file)
+    return assigned
+
+
+class MatchScorer:
+    """Scores search results against a requested album, artist and year.
+
+    The request side is normalized once, so scoring a candidate is a handful
+    of set operations - cheap enough for thousands of docs per batch.
+    """
+
+    def __init__(self, album_name: str, artist_name: Optional[str] = None, year: Optional[int] = None,
+                 threshold: Optional[float] = None):
+        """Prepare the normalized request."""
+        self.album_tokens = tokens(album_name)
+        self.artist_tokens = tokens(artist_name) if artist_name else frozenset()
+        self.year = year
+        self.threshold = Config.ARCHIVE_MATCH_THRESHOLD if threshold is None else threshold
+        self.unwanted = UNWANTED_WORDS - self.album_tokens
+
+    def score(self, album: Dict) -> float:
+        """Score in [0, 1] for an album dict from parse_search_results."""
+        title = token_set_similarity(self.album_tokens, tokens(field_text(album.get('title'))))
+        similarity = title
+        if self.artist_tokens:
+            artist = token_set_similarity(self.artist_tokens, tokens(field_text(album.get('artist'))))
+            similarity = 0.65 * title + 0.35 * artist
+
+        year = 0.5
+        candidate_year = _year(album.get('year'))
+        if self.year and candidate_year:
+            year = max(0.0, 1.0 - abs(self.year - candidate_year) / 10)
+
+        size = album.get('size') or 0
+        plausible = 0.5 if not size else (1.0 if MIN_PLAUSIBLE_SIZE <= size <= MAX_PLAUSIBLE_SIZE else 0.0)
+
+        score = 0.8 * similarity + 0.1 * year + 0.1 * plausible
+        if self.unwanted & tokens(field_text(album.get('title'))):
+            score -= 0.2
+        return max(0.0, min(1.0, score))
+
+    def rank(self, albums: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Split albums into (accepted sorted by score, rejected below threshold).
+
+        Returns copies carrying a 'match_score', leaving the given dicts alone:
+        batched searches may hand the same album to several requests, each
+        scoring it differently. Ties keep the incoming (downloads) order.
+        """
+        accepted, rejected = [], []
+        for album in albums:
+            album = dict(album, match_score=round(self.score(album), 3))
+            (accepted if album['match_score'] >= self.threshold else rejected).append(album)
+        accepted.sort(key=lambda album: -album['match_score'])
+        return accepted, rejected
@@ -0,0 +1,250 @@
+"""
+Request-level instrumentation for the Archive.org scraper.
+"""
+import aiohttp
+import contextlib
+import contextvars
+import functools
+import json
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Span of the public scraper call the current task is running in
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus style)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.sum += seconds
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+            'sum': round(self.sum, 6),
+            'count': self.count,
+        }
+
+
+class Span:
+    """Timing of one public scraper call, with its requests and nested calls."""
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self.duration = 0.0
+        self.children: List['Span'] = []
+        self.requests: Dict[str, Dict[str, float]] = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'bytes': 0})
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Per-endpoint request count, time and bytes for this span and its children."""
+        totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'bytes': 0})
+        for span in self.walk():
+            for endpoint, stats in span.requests.items():
+                for key, value in stats.items():
+                    totals[endpoint][key] += value
+        return dict(totals)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'attributes': self.attributes,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 2),
+            'requests': {endpoint: dict(stats) for endpoint, stats in self.requests.items()},
+            'children': [child.to_dict() for child in self.children],
+        }
+
+
+class ScraperMetrics:
+    """Collects DNS/connect/TTFB timings, per-endpoint latency and call spans.
+
+    Connection-level timings come from an aiohttp TraceConfig; full request
+    latency per attempt is reported by the RequestScheduler via observe_attempt().
+    """
+
+    def __init__(self, classify: Callable[[str, str], str], max_spans: int = 50):
+        """classify(url, method) maps a request to an endpoint name."""
+        self.classify = classify
+        self.latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.ttfb: Dict[str, Histogram] = defaultdict(Histogram)
+        self.dns = Histogram()
+        self.connect = Histogram()
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.bytes: Dict[str, int] = defaultdict(int)
+        self.retries: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.span_latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.spans = deque(maxlen=max_spans)
+
+    # Spans
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Record a span; spans opened inside it (same task or subtasks) nest under it."""
+        span = Span(name, attributes)
+        parent = _current_span.get()
+        if parent is not None:
+            parent.children.append(span)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self.span_latency[name].observe(span.duration)
+            if parent is None:
+                self.spans.append(span)
+
+    @property
+    def last_span(self) -> Optional[Span]:
+        """The most recently finished top-level call."""
+        return self.spans[-1] if self.spans else None
+
+    # Request observations
+
+    def observe_attempt(self, method: str, url: str, status: Optional[int], seconds: float,
+                        attempt: int, error: bool) -> None:
+        """Record one request attempt (called by the scheduler)."""
+        endpoint = self.classify(url, method)
+        self.requests[endpoint] += 1
+        self.latency[endpoint].observe(seconds)
+        if attempt:
+            self.retries[endpoint] += 1
+        if error:
+            self.errors[endpoint] += 1
+        span = _current_span.get()
+        if span is not None:
+            span.requests[endpoint]['count'] += 1
+            span.requests[endpoint]['seconds'] += seconds
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig recording DNS, connect, time-to-first-byte and response bytes."""
+        trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace())
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+            ctx.endpoint = self.classify(str(params.url), params.method)
+
+        async def on_dns_resolvehost_start(session, ctx, params):
+            ctx.dns_start = time.perf_counter()
+
+        async def on_dns_resolvehost_end(session, ctx, params):
+            self.dns.observe(time.perf_counter() - ctx.dns_start)
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            self.connect.observe(time.perf_counter() - ctx.connect_start)
+
+        async def on_request_end(session, ctx, params):
+            # Fires once response headers arrive
+            self.ttfb[ctx.endpoint].observe(time.perf_counter() - ctx.start)
+
+        async def on_response_chunk_received(session, ctx, params):
+            size = len(params.chunk)
+            self.bytes[ctx.endpoint] += size
+            span = _current_span.get()
+            if span is not None:
+                span.requests[ctx.endpoint]['bytes'] += size
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        trace.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_request_end.append(on_request_end)
+        trace.on_response_chunk_received.append(on_response_chunk_received)
+        return trace
+
+    # Export
+
+    def to_dict(self) -> Dict:
+        """All metrics as a JSON-serializable dict."""
+        endpoints = sorted(set(self.requests) | set(self.bytes) | set(self.ttfb))
+        return {
+            'endpoints': {
+                endpoint: {
+                    'requests': self.requests[endpoint],
+                    'retries': self.retries[endpoint],
+                    'errors': self.errors[endpoint],
+                    'bytes': self.bytes[endpoint],
+                    'latency_seconds': self.latency[endpoint].to_dict(),
+                    'ttfb_seconds': self.ttfb[endpoint].to_dict(),
+                } for endpoint in endpoints
+            },
+            'dns_seconds': self.dns.to_dict(),
+            'connect_seconds': self.connect.to_dict(),
+            'calls': {name: histogram.to_dict() for name, histogram in self.span_latency.items()},
+            'last_call': self.last_span.to_dict() if self.last_span else None,
+        }
+
+    def to_json(self) -> str:
+        """Metrics as a JSON document."""
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, prefix: str = 'stremtify_archive') -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, series: Dict[str, Histogram], label: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for key, hist in sorted(series.items()):
+                labels = f'{label}="{key}",' if label else ''
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{prefix}_{name}_bucket{{{labels}le="{bound}"}} {count}')
+                lines.append(f'{prefix}_{name}_bucket{{{labels}le="+Inf"}} {hist.count}')
+                suffix = f'{{{labels.rstrip(",")}}}' if labels else ''
+                lines.append(f"{prefix}_{name}_sum{suffix} {hist.sum:.6f}")
+                lines.append(f"{prefix}_{name}_count{suffix} {hist.count}")
+
+        def counter(name: str, help_text: str, series: Dict[str, int]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for endpoint, value in sorted(series.items()):
+                lines.append(f'{prefix}_{name}{{endpoint="{endpoint}"}} {value}')
+
+        histogram('request_duration_seconds', 'Request latency per attempt.', self.latency, 'endpoint')
+        histogram('ttfb_seconds', 'Time to first byte (response headers).', self.ttfb, 'endpoint')
+        histogram('dns_seconds', 'DNS resolution time.', {'': self.dns}, '')
+        histogram('connect_seconds', 'New connection setup time.', {'': self.connect}, '')
+        histogram('call_duration_seconds', 'Duration of public ArchiveScraper calls.', self.span_latency, 'method')
+        counter('requests_total', 'Request attempts.', self.requests)
+        counter('retries_total', 'Retried request attempts.', self.retries)
+        counter('errors_total', 'Failed request attempts.', self.errors)
+        counter('response_bytes_total', 'Response body bytes received.', self.bytes)
+        return '\n'.join(lines) + '\n'
+
+
+def traced(method):
+    """Decorator recording a span for an async ArchiveScraper method."""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        with self.metrics.span(method.__name__):
+            return await method(self, *args, **kwargs)
+    return wrapper
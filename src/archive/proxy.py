@@ -0,0 +1,412 @@
+"""
+Local FLAC streaming proxy - serves verified Archive.org files with Range support from a chunk cache.
+"""
+import aiohttp
+import asyncio
+import hashlib
+import os
+import urllib.parse
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+import sys
+
+from aiohttp import web
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+from src.archive.scheduler import FetchError
+from src.archive.scraper import ArchiveScraper
+from src.archive.singleflight import SingleFlight
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) requested by a single-range "bytes=" header.
+
+    Returns None when the whole file should be served (no header, several
+    ranges or a malformed one, which a server may ignore) and raises
+    ValueError for a range that starts past the end of the file.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    if not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError("Range not satisfiable")
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+class ChunkCache:
+    """Fixed-size chunks of upstream files on disk, evicted least recently used first.
+
+    Each chunk is one file under the cache directory, named after its URL, the
+    chunk size and its index. The LRU order lives in memory; it is rebuilt from
+    file modification times (touched on every hit) when the cache is opened.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None,
+                 chunk_size: Optional[int] = None):
+        """Open (or create) the cache directory and index the chunks already in it."""
+        self.directory = directory or Config.PROXY_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.PROXY_CACHE_MAX_BYTES
+        self.chunk_size = chunk_size or Config.PROXY_CHUNK_SIZE
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        # Chunk path -> size, least recently used first
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._bytes = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if not name.endswith('.chunk'):
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._bytes += size
+        self._evict()
+
+    def path(self, url: str, index: int) -> str:
+        """File holding chunk index of url."""
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}-{self.chunk_size}-{index}.chunk")
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        return self.path(*key) in self._entries
+
+    def get(self, url: str, index: int) -> Optional[bytes]:
+        """Return a cached chunk, or None on a miss."""
+        path = self.path(url, index)
+        if path not in self._entries:
+            self.misses += 1
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            # Removed behind our back
+            self._bytes -= self._entries.pop(path)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(path)
+        self.hits += 1
+        self.bytes_saved += len(data)
+        return data
+
+    def set(self, url: str, index: int, data: bytes) -> None:
+        """Store a chunk, then evict least recently used ones until under max_bytes."""
+        if len(data) > self.max_bytes:
+            return
+        path = self.path(url, index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._bytes += len(data) - self._entries.pop(path, 0)
+        self._entries[path] = len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Remove every cached chunk."""
+        for path in self._entries:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/bytes-saved counters plus stored chunk count and size."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes_saved': self.bytes_saved,
+            'entries': len(self._entries),
+            'bytes_stored': self._bytes,
+        }
+
+
+class StreamProxy:
+    """Local HTTP server streaming registered upstream FLAC URLs with full Range support.
+
+    Files are fetched from upstream in fixed-size chunks through the scraper's
+    request scheduler and kept in a ChunkCache, so seeks and replays are served
+    from disk. Listeners sharing a file share its upstream chunk fetches, and
+    PROXY_PREFETCH_CHUNKS chunks ahead of each read position are fetched in the
+    background. Only URLs registered with register() (or through an /item
+    playlist) are served.
+
+    Routes: /item/<identifier> (JSON) and /item/<identifier>.m3u verify an
+    item and list its local stream URLs, /stream/<token>/<name> streams a file
+    and /stats reports cache and upstream counters.
+    """
+
+    def __init__(self, scraper: Optional[ArchiveScraper] = None, cache: Optional[ChunkCache] = None,
+                 prefetch: Optional[int] = None, host: Optional[str] = None, port: Optional[int] = None):
+        """Initialize from arguments or Config; upstream requests go through the scraper's scheduler."""
+        self.scraper = scraper or ArchiveScraper()
+        self.cache = cache or ChunkCache()
+        self.prefetch = Config.PROXY_PREFETCH_CHUNKS if prefetch is None else prefetch
+        self.host = host or Config.PROXY_HOST
+        self.port = Config.PROXY_PORT if port is None else port
+        self.timeout = Config.DOWNLOAD_TIMEOUT
+        self.flights = SingleFlight()
+        # Token -> upstream URL of every file that may be streamed
+        self.tracks: Dict[str, str] = {}
+        self.sizes: Dict[str, int] = {}
+        self._prefetching: Set[Tuple[str, int]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self._owns_scraper = False
+        self._stats = {'requests': 0, 'served_bytes': 0, 'upstream_chunks': 0, 'upstream_bytes': 0,
+                       'prefetched': 0, 'upstream_errors': 0}
+
+    # Registration
+
+    def register(self, url: str) -> str:
+        """Allow url to be streamed and return its local path."""
+        token = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        self.tracks[token] = url
+        name = urllib.parse.unquote(url.rsplit('/', 1)[-1]) or 'track.flac'
+        return f"/stream/{token}/{urllib.parse.quote(name)}"
+
+    def local_url(self, url: str) -> str:
+        """Full local URL streaming url (registering it)."""
+        return f"http://{self.host}:{self.port}{self.register(url)}"
+
+    # Upstream
+
+    async def file_size(self, session: aiohttp.ClientSession, url: str) -> Union[int, FetchError]:
+        """Size of an upstream file from a HEAD request (once per file)."""
+        if url in self.sizes:
+            return self.sizes[url]
+
+        async def read(response: aiohttp.ClientResponse) -> int:
+            if response.content_length is None:
+                raise ValueError("no Content-Length")
+            return response.content_length
+
+        async def request() -> Union[int, FetchError]:
+            size = await self.scraper.request(session, 'HEAD', url, read, timeout=self.timeout,
+                                              allow_redirects=True)
+            if not isinstance(size, FetchError):
+                self.sizes[url] = size
+            return size
+
+        return await self.flights.do('size', url, request)
+
+    async def chunk(self, session: aiohttp.ClientSession, url: str, index: int,
+                    size: int) -> Union[bytes, FetchError]:
+        """Chunk index of an upstream file, from the cache or a (shared) range request."""
+        data = self.cache.get(url, index)
+        if data is not None:
+            return data
+        start = index * self.cache.chunk_size
+        end = min(size, start + self.cache.chunk_size) - 1
+
+        async def read(response: aiohttp.ClientResponse) -> bytes:
+            if response.status != 206:
+                raise ValueError("server ignored the Range header")
+            body = await response.read()
+            if len(body) != end + 1 - start:
+                raise ValueError(f"expected {end + 1 - start} bytes, got {len(body)}")
+            return body
+
+        async def request() -> Union[bytes, FetchError]:
+            body = await self.scraper.request(session, 'GET', url, read, timeout=self.timeout,
+                                              headers={'Range': f"bytes={start}-{end}"},
+                                              allow_redirects=True)
+            if isinstance(body, FetchError):
+                self._stats['upstream_errors'] += 1
+                return body
+            self._stats['upstream_chunks'] += 1
+            self._stats['upstream_bytes'] += len(body)
+            self.cache.set(url, index, body)
+            return body
+
+        return await self.flights.do('chunk', (url, index), request)
+
+    def _prefetch_after(self, session: aiohttp.ClientSession, url: str, index: int, size: int) -> None:
+        """Start fetching the chunks after index in the background, unless cached or already running."""
+        last = (size - 1) // self.cache.chunk_size
+        for ahead in range(index + 1, min(index + self.prefetch, last) + 1):
+            key = (url, ahead)
+            if key in self.cache or key in self._prefetching:
+                continue
+            self._prefetching.add(key)
+            self._stats['prefetched'] += 1
+            task = asyncio.create_task(self.chunk(session, url, ahead, size))
+            self._tasks.add(task)
+            task.add_done_callback(lambda done, key=key: (self._tasks.discard(done), self._prefetching.discard(key)))
+
+    # Handlers
+
+    async def handle_stream(self, request: web.Request) -> web.StreamResponse:
+        url = self.tracks.get(request.match_info['token'])
+        if url is None:
+            raise web.HTTPNotFound(text="Unknown track")
+        self._stats['requests'] += 1
+        async with self.scraper.session_context() as session:
+            size = await self.file_size(session, url)
+            if isinstance(size, FetchError):
+                raise web.HTTPBadGateway(text=size.reason)
+            try:
+                requested = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                raise web.HTTPRequestRangeNotSatisfiable(headers={'Content-Range': f"bytes */{size}"})
+            start, end = requested or (0, size - 1)
+
+            headers = {'Content-Type': 'audio/flac', 'Accept-Ranges': 'bytes'}
+            if requested:
+                headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+            status = 206 if requested else 200
+            if request.method == 'HEAD':
+                headers['Content-Length'] = str(end + 1 - start)
+                return web.Response(status=status, headers=headers)
+
+            chunk_size = self.cache.chunk_size
+            first = start // chunk_size
+            # Fetched before the headers go out, so a failing upstream is still a 502
+            data = await self.chunk(session, url, first, size)
+            if isinstance(data, FetchError):
+                raise web.HTTPBadGateway(text=data.reason)
+
+            response = web.StreamResponse(status=status, headers=headers)
+            response.content_length = end + 1 - start
+            await response.prepare(request)
+            for index in range(first, end // chunk_size + 1):
+                if index != first:
+                    data = await self.chunk(session, url, index, size)
+                    if isinstance(data, FetchError):
+                        # Too late for an error status; a short body makes the player retry
+                        print(f"⚠️ Upstream failed mid-stream for {url}: {data.reason}")
+                        return response
+                self._prefetch_after(session, url, index, size)
+                offset = index * chunk_size
+                piece = data[max(start - offset, 0):end + 1 - offset]
+                await response.write(piece)
+                self._stats['served_bytes'] += len(piece)
+            await response.write_eof()
+            return response
+
+    async def handle_item(self, request: web.Request) -> web.Response:
+        identifier = request.match_info['identifier']
+        playlist = identifier.endswith('.m3u')
+        if playlist:
+            identifier = identifier[:-len('.m3u')]
+        async with self.scraper.session_context() as session:
+            _, flacs = await self.scraper.get_verified_flac_files(session, identifier)
+        if not flacs:
+            raise web.HTTPNotFound(text="No verified FLAC files")
+
+        base = f"{request.scheme}://{request.host}"
+        tracks = [(urllib.parse.unquote(url.rsplit('/', 1)[-1]), base + self.register(url)) for url in flacs]
+        if not playlist:
+            return web.json_response({'identifier': identifier,
+                                      'tracks': [{'name': name, 'url': url} for name, url in tracks]})
+        lines = ['#EXTM3U']
+        for name, url in tracks:
+            lines.extend([f"#EXTINF:-1,{name}", url])
+        return web.Response(text='\n'.join(lines) + '\n', content_type='audio/x-mpegurl')
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    # Lifecycle
+
+    def make_app(self) -> web.Application:
+        """Build the aiohttp application (GET routes also answer HEAD)."""
+        app = web.Application()
+        app.router.add_get('/item/{identifier}', self.handle_item)
+        app.router.add_get('/stream/{token}/{name}', self.handle_stream)
+        app.router.add_get('/stats', self.handle_stats)
+        return app
+
+    async def start(self) -> web.AppRunner:
+        """Open the scraper if needed and start serving; port 0 picks a free port."""
+        if not self.scraper.is_open:
+            await self.scraper.open()
+            self._owns_scraper = True
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self._runner
+
+    async def close(self) -> None:
+        """Stop serving, cancel prefetches and close the scraper if start() opened it."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._owns_scraper:
+            await self.scraper.close()
+            self._owns_scraper = False
+
+    async def __aenter__(self) -> "StreamProxy":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def serve_forever(self, identifiers: Iterable[str] = ()) -> None:
+        """Serve until cancelled (e.g. by Ctrl+C), printing playlist URLs for identifiers."""
+        async with self:
+            print(f"🎧 Streaming proxy on http://{self.host}:{self.port}")
+            print(f"   ▶️ Open http://{self.host}:{self.port}/item/<identifier>.m3u in any player")
+            for identifier in identifiers:
+                print(f"   🗂️ {identifier}: http://{self.host}:{self.port}/item/{identifier}.m3u")
+            while True:
+                await asyncio.sleep(3600)
+
+    def stats(self) -> Dict:
+        """Request, upstream and cache counters."""
+        stats = dict(self._stats)
+        stats['coalesced_chunks'] = self.flights.stats().get('chunk', {}).get('coalesced', 0)
+        stats['cache'] = self.cache.stats()
+        return stats
+
+
+def main():
+    """Main function for command-line usage."""
+    identifier = input("🗂️ Archive.org identifier to stream (or leave blank): ").strip()
+    try:
+        asyncio.run(StreamProxy().serve_forever([identifier] if identifier else []))
+    except KeyboardInterrupt:
+        print("\n👋 Streaming proxy stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Adaptive request scheduler for Archive.org - rate limiting, AIMD concurrency and retries.
+"""
+import aiohttp
+import asyncio
+import collections
+import contextlib
+import email.utils
+import random
+import time
+import urllib.parse
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Any
+import sys
+import os
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+
+# Statuses worth retrying; the throttle subset also shrinks rate and concurrency
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+class FetchError(dict):
+    """Result of a request that failed after all retries.
+
+    It is an empty, falsy dict so existing ``if not data`` checks keep treating
+    it as "no data", while callers that care can tell failures apart:
+    ``transient`` is True for throttling, 5xx and network errors (worth trying
+    again later) and False for permanent ones such as 404 or an unparseable body.
+    """
+
+    def __init__(self, url: str, reason: str, status: Optional[int] = None, transient: bool = False):
+        super().__init__()
+        self.url = url
+        self.reason = reason
+        self.status = status
+        self.transient = transient
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        kind = 'transient' if self.transient else 'permanent'
+        return f"FetchError({kind}, status={self.status}, reason={self.reason!r})"
+
+    def to_dict(self) -> Dict:
+        """Serializable description of the failure."""
+        return {'reason': self.reason, 'status': self.status, 'transient': self.transient}
+
+
+class FetchFailed(Exception):
+    """Raised where a FetchError cannot be returned, e.g. from an async generator."""
+
+    def __init__(self, error: FetchError):
+        super().__init__(error.reason)
+        self.error = error
+
+
+class CircuitBreaker:
+    """Fails requests to a host fast while most of its recent requests fail.
+
+    Outcomes of the last ``window`` seconds are kept; once at least
+    ``min_requests`` were seen and the failed share reaches ``error_rate``, the
+    circuit opens and requests fail immediately. After ``cooldown`` seconds a
+    single probe is let through (half-open): success closes the circuit,
+    failure opens it for another cool-down. An error_rate of 0 disables it.
+    """
+
+    def __init__(self, error_rate: Optional[float] = None, min_requests: Optional[int] = None,
+                 window: Optional[float] = None, cooldown: Optional[float] = None):
+        """Initialize thresholds from arguments or Config."""
+        self.error_rate = error_rate if error_rate is not None else Config.ARCHIVE_BREAKER_ERROR_RATE
+        self.min_requests = min_requests or Config.ARCHIVE_BREAKER_MIN_REQUESTS
+        self.window = window or Config.ARCHIVE_BREAKER_WINDOW
+        self.cooldown = cooldown or Config.ARCHIVE_BREAKER_COOLDOWN
+        self._outcomes: Deque[Tuple[float, bool]] = collections.deque()
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open' (cool-down over, waiting for a probe)."""
+        if self._opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self._opened_at >= self.cooldown else 'open'
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state only the probe may."""
+        if self._opened_at is None or self.error_rate <= 0:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.cooldown:
+            return False
+        # A probe that never reported back (e.g. cancelled) is replaced after a cool-down
+        if self._probe_started is not None and now - self._probe_started < self.cooldown:
+            return False
+        self._probe_started = now
+        return True
+
+    def record(self, failed: bool) -> None:
+        """Record the outcome of a request attempt."""
+        now = time.monotonic()
+        if self._opened_at is not None:
+            if self._probe_started is None:
+                return
+            self._probe_started = None
+            if failed:
+                self._opened_at = now
+            else:
+                self._opened_at = None
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((now, failed))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        failures = sum(1 for _, outcome in self._outcomes if outcome)
+        if (self.error_rate > 0 and len(self._outcomes) >= self.min_requests
+                and failures / len(self._outcomes) >= self.error_rate):
+            self._opened_at = now
+            self.opened += 1
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe may be sent (0 when closed)."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RequestScheduler:
+    """Token bucket plus AIMD-adaptive concurrency limit shared by outbound requests.
+
+    Every success nudges the request rate and concurrency limit up additively;
+    every throttle signal (429/503, timeouts) halves both, at most once per
+    ``decrease_cooldown`` seconds. A Retry-After header pauses all requests,
+    for at most ``max_retry_after`` seconds however long the server asks for.
+    """
+
+    def __init__(self, rate: Optional[float] = None, max_rate: Optional[float] = None,
+                 burst: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 max_retries: Optional[int] = None, backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None, decrease_cooldown: float = 1.0,
+                 max_retry_after: Optional[float] = None):
+        """Initialize limits from arguments or Config."""
+        self.max_rate = max_rate or Config.ARCHIVE_RATE_LIMIT_MAX
+        self.rate = min(rate or Config.ARCHIVE_RATE_LIMIT, self.max_rate)
+        self.burst = burst or Config.ARCHIVE_RATE_BURST
+        self.max_concurrency = max_concurrency or Config.ARCHIVE_POOL_LIMIT_PER_HOST
+        self.max_retries = max_retries if max_retries is not None else Config.ARCHIVE_MAX_RETRIES
+        self.backoff_base = backoff_base or Config.ARCHIVE_BACKOFF_BASE
+        self.backoff_max = backoff_max or Config.ARCHIVE_BACKOFF_MAX
+        self.max_retry_after = max_retry_after if max_retry_after is not None else Config.ARCHIVE_MAX_RETRY_AFTER
+        self.decrease_cooldown = decrease_cooldown
+
+        self.min_rate = 0.5
+        self.concurrency = float(max(1, self.max_concurrency // 2))
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._waiters = []
+        # Callables(method, url, status, seconds, attempt, error) notified after each attempt
+        self.observers: List[Callable[..., None]] = []
+        self._counters = {'requests': 0, 'retries': 0, 'throttled': 0, 'transient_failures': 0,
+                          'permanent_failures': 0, 'short_circuited': 0}
+        # Circuit breaker per host
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    async def _take_token(self) -> None:
+        """Wait for a token from the bucket (and for any Retry-After pause)."""
+        while True:
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def _enter(self) -> None:
+        """Wait until the adaptive concurrency limit has room."""
+        while self._in_flight >= max(1, int(self.concurrency)):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_flight += 1
+
+    def _exit(self) -> None:
+        self._in_flight -= 1
+        # Waiters recheck the limit themselves, so waking all of them is safe
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one rate-limited, concurrency-limited request slot."""
+        await self._take_token()
+        await self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def on_success(self) -> None:
+        """Additive increase after a request the server accepted."""
+        self.rate = min(self.max_rate, self.rate + 1.0 / max(1.0, self.rate))
+        self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / max(1.0, self.concurrency))
+
+    def _cap_retry_after(self, retry_after: Optional[float]) -> Optional[float]:
+        """Retry-After clamped to max_retry_after, so a bogus header cannot stall every request."""
+        return None if retry_after is None else min(retry_after, self.max_retry_after)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease after a throttle signal; honour Retry-After (up to max_retry_after)."""
+        self._counters['throttled'] += 1
+        now = time.monotonic()
+        retry_after = self._cap_retry_after(retry_after)
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        if now - self._last_decrease >= self.decrease_cooldown:
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.concurrency = max(1.0, self.concurrency / 2)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff delay, never shorter than the (capped) Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        return max(delay, self._cap_retry_after(retry_after) or 0.0)
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """The circuit breaker of a URL's host."""
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker()
+        return self.breakers[host]
+
+    async def request(self, session: aiohttp.ClientSession, method: str, url: str,
+                      read: Callable[[aiohttp.ClientResponse], Awaitable[Any]],
+                      timeout: Optional[float] = None, observer: Optional[Callable[..., None]] = None,
+                      **kwargs) -> Any:
+        """Send a request with retries and return read(response), or a FetchError.
+
+        read() is called for any status below 400. Retryable statuses and network
+        errors are retried with jittered exponential backoff; other 4xx statuses
+        and errors raised by read() fail permanently without retrying. While the
+        host's circuit breaker is open, a transient FetchError is returned at once.
+        Each attempt is reported to observer (the caller's metrics) besides
+        the scheduler-wide observers.
+        """
+        client_timeout = aiohttp.ClientTimeout(total=timeout or Config.ARCHIVE_TIMEOUT)
+        breaker = self.breaker(url)
+        error = FetchError(url, 'not attempted', transient=True)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                self._counters['short_circuited'] += 1
+                return FetchError(url, f"Circuit open, host failing (retry in {breaker.retry_in():.0f}s)",
+                                  transient=True)
+            retry_after = None
+            status = None
+            async with self.slot():
+                self._counters['requests'] += 1
+                start = time.perf_counter()
+                try:
+                    async with session.request(method, url, timeout=client_timeout, **kwargs) as response:
+                        status = response.status
+                        # 429 means the host is up but throttling us
+                        breaker.record(response.status >= 500)
+                        if response.status in RETRYABLE_STATUSES:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                            if response.status in THROTTLE_STATUSES:
+                                self.on_throttle(retry_after)
+                            error = FetchError(url, f"HTTP {response.status}", response.status, transient=True)
+                        elif response.status >= 400:
+                            self.on_success()
+                            self._counters['permanent_failures'] += 1
+                            self._notify(observer, method, url, status, start, attempt, True)
+                            return FetchError(url, f"HTTP {response.status}", response.status)
+                        else:
+                            self.on_success()
+                            try:
+                                result = await read(response)
+                            except ValueError as e:
+                                self._counters['permanent_failures'] += 1
+                                self._notify(observer, method, url, status, start, attempt, True)
+                                return FetchError(url, f"Invalid response: {e}", response.status)
+                            self._notify(observer, method, url, status, start, attempt, False)
+                            return result
+                except asyncio.TimeoutError:
+                    self.on_throttle()
+                    breaker.record(True)
+                    error = FetchError(url, 'Timed out', transient=True)
+                except aiohttp.ClientError as e:
+                    breaker.record(True)
+                    error = FetchError(url, str(e) or type(e).__name__, transient=True)
+                self._notify(observer, method, url, status, start, attempt, True)
+            if attempt < self.max_retries:
+                self._counters['retries'] += 1
+                await asyncio.sleep(self.backoff(attempt, retry_after))
+        self._counters['transient_failures'] += 1
+        return error
+
+    def _notify(self, observer: Optional[Callable[..., None]], method: str, url: str,
+                status: Optional[int], start: float, attempt: int, error: bool) -> None:
+        seconds = time.perf_counter() - start
+        for notify in self.observers + ([observer] if observer else []):
+            notify(method, url, status, seconds, attempt, error)
+
+    def stats(self) -> Dict[str, float]:
+        """Current adaptive limits and request counters."""
+        stats = dict(self._counters)
+        stats.update({
+            'rate': round(self.rate, 2),
+            'concurrency': round(self.concurrency, 2),
+            'in_flight': self._in_flight,
+            'circuits': {host: breaker.state for host, breaker in self.breakers.items()},
+        })
+        return stats
+
+
+_shared: Optional[RequestScheduler] = None
+
+
+def shared_scheduler() -> RequestScheduler:
+    """The process-wide scheduler, so every scraper in a process shares one rate limit and backoff.
+
+    ArchiveScraper uses it unless given a scheduler of its own (e.g. a worker
+    process's share of the limit, or a benchmark's unthrottled one).
+    """
+    global _shared
+    if _shared is None:
+        _shared = RequestScheduler()
+    return _shared
@@ -3,182 +3,1216 @@ Archive.org scraper - consolidated from archive_scraper.py and archive_scrapertr
 """
 import aiohttp
 import asyncio
+import contextlib
+import contextvars
+import json
+import random
+import time
 import urllib.parse
-from typing import List, Tuple, Optional, Dict
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Tuple, Optional, Dict, Union
 import sys
 import os
 
 # Add the config directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from config.settings import Config
+from src.archive.cache import ResponseCache, create_cache
+from src.archive.scheduler import FetchError, FetchFailed, RequestScheduler, shared_scheduler
+from src.archive.metrics import ScraperMetrics, traced
+from src.archive.streaming import iter_json_array
+from src.archive.matching import (MatchScorer, TrackMatcher, assign_tracks, coverage, field_text, file_track_info,
+                                  normalize_title, strip_edition, tokens)
+from src.archive.index import ItemIndex, create_index
+from src.archive.singleflight import SingleFlight, create_single_flight
+from src.archive.flac import ID3_HEADER_SIZE, FLAC_MAGIC, id3v2_size, is_flac_header, read_flac_metadata
+
+VERIFY_STRATEGIES = ('none', 'sample', 'header', 'full')
+
+SEARCH_FIELDS = ['identifier', 'title', 'creator', 'year', 'downloads', 'item_size']
+
+# Share of a batched pair's album/artist tokens a result doc must contain to be attributed to it
+BATCH_ATTRIBUTION_COVERAGE = 0.8
+
+# Looser queries raced when the strict search verifies nothing, strictest first
+RELAXED_LEVELS = ('edition', 'no_creator', 'unquoted', 'artist')
+
+# Verification strategy of the get_verified_flac_files call a request belongs to
+_verify_strategy = contextvars.ContextVar('verify_strategy', default=None)
+
+# Transient check failures seen by the get_verified_flac_files call a check belongs to
+_transient_failures = contextvars.ContextVar('transient_failures', default=None)
 
 
 class ArchiveScraper:
-    """Handles Archive.org FLAC album searching and verification."""
+    """Handles Archive.org FLAC album searching and verification.
     
-    def __init__(self):
-        """Initialize the scraper with configuration."""
+    Use as an async context manager to share one pooled session across calls:
+    
+        async with ArchiveScraper() as scraper:
+            await scraper.advanced_search("Album", "Artist")
+    
+    Without it, each public call opens (and closes) its own session.
+    """
+    
+    def __init__(self, cache: Optional[ResponseCache] = None, scheduler: Optional[RequestScheduler] = None,
+                 index: Optional[ItemIndex] = None, flights: Optional[SingleFlight] = None):
+        """Initialize the scraper with configuration.
+        
+        If no cache is given, the backend configured by ARCHIVE_CACHE_BACKEND is used,
+        and likewise the item index for ARCHIVE_INDEX_MODE.
+        All scrapers of a process share one rate limit through the process-wide
+        scheduler (see scheduler.shared_scheduler); pass a scheduler to opt out.
+        Identical in-flight requests are coalesced through the process-wide
+        SingleFlight (ARCHIVE_SINGLE_FLIGHT) unless flights is given.
+        """
         self.base_search_url = Config.ARCHIVE_BASE_SEARCH_URL
+        self.base_scrape_url = Config.ARCHIVE_BASE_SCRAPE_URL
         self.base_metadata_url = Config.ARCHIVE_BASE_METADATA_URL
         self.base_download_url = Config.ARCHIVE_BASE_DOWNLOAD_URL
         self.max_results = Config.ARCHIVE_MAX_RESULTS
+        self.scrape_page_size = Config.ARCHIVE_SCRAPE_PAGE_SIZE
         self.timeout = Config.ARCHIVE_TIMEOUT
         self.min_flac_size = Config.MIN_FLAC_SIZE
         self.google_search_url = Config.GOOGLE_SEARCH_URL
+        self.verify_mode = Config.ARCHIVE_VERIFY_MODE
+        self.verify_top_n = Config.ARCHIVE_VERIFY_TOP_N
+        self.verify_concurrency = Config.ARCHIVE_VERIFY_CONCURRENCY
+        self.rank_by = Config.ARCHIVE_RANK_BY
+        self.verify_strategy = Config.ARCHIVE_VERIFY_STRATEGY
+        self.verify_sample_size = Config.ARCHIVE_VERIFY_SAMPLE_SIZE
+        self.verify_request_limit = Config.ARCHIVE_VERIFY_REQUEST_LIMIT
+        self.stream_metadata = Config.ARCHIVE_STREAM_METADATA
+        self.match_enabled = Config.ARCHIVE_MATCH_ENABLED
+        self.match_stats = {'scored': 0, 'rejected': 0, 'verifications_saved': 0}
+        self.batch_size = Config.ARCHIVE_BATCH_SIZE
+        self.batch_max_url = Config.ARCHIVE_BATCH_MAX_URL
+        self.batch_max_rows = Config.ARCHIVE_BATCH_MAX_ROWS
+        self.batch_stats = {'pairs': 0, 'batches': 0, 'follow_ups': 0, 'unattributed': 0}
+        self.relaxed_search = Config.ARCHIVE_RELAXED_SEARCH
+        self.negative_stats = {'hits': 0, 'stored': 0}
+        self.track_match_threshold = Config.ARCHIVE_TRACK_MATCH_THRESHOLD
+        self.track_match_stats = {'tracks': 0, 'matched': 0, 'files_read': 0, 'bytes': 0}
+        self.query_level_stats = dict.fromkeys(('strict',) + RELAXED_LEVELS + ('google_fallback',), 0)
+        self.cache = cache if cache is not None else create_cache()
+        self.index_mode = Config.ARCHIVE_INDEX_MODE.lower()
+        self.index = index if index is not None else create_index(self.index_mode)
+        self.flights = flights if flights is not None else create_single_flight()
+        self.scheduler = scheduler if scheduler is not None else shared_scheduler()
+        self.metrics = ScraperMetrics(self._endpoint_for)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._verify_semaphore: Optional[asyncio.Semaphore] = None
+        self._verify_stats: Dict[str, Dict[str, float]] = {
+            strategy: {'calls': 0, 'files': 0, 'requests': 0, 'seconds': 0.0}
+            for strategy in VERIFY_STRATEGIES
+        }
+    
+    async def __aenter__(self) -> "ArchiveScraper":
+        await self.open()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Create a session with a tuned, keep-alive connection pool."""
+        connector = aiohttp.TCPConnector(
+            limit=Config.ARCHIVE_POOL_LIMIT,
+            limit_per_host=Config.ARCHIVE_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=Config.ARCHIVE_DNS_CACHE_TTL,
+            keepalive_timeout=Config.ARCHIVE_KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            trace_configs=[self.metrics.trace_config()],
+            headers={'Accept-Encoding': 'gzip, deflate'},
+            auto_decompress=True,
+        )
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether the shared pooled session is open."""
+        return self._session is not None and not self._session.closed
+    
+    async def open(self) -> None:
+        """Open the shared pooled session if it is not already open."""
+        if not self.is_open:
+            self._session = self._create_session()
+    
+    async def close(self) -> None:
+        """Close the shared session and release pooled connections."""
+        if self.is_open:
+            await self._session.close()
+        self._session = None
+    
+    async def request(self, session: aiohttp.ClientSession, method: str, url: str,
+                      read: Callable[[aiohttp.ClientResponse], Awaitable[Any]],
+                      timeout: Optional[float] = None, **kwargs) -> Any:
+        """Send a request through the scheduler, recording its attempts in this scraper's metrics.
+        
+        The scheduler may be shared by many scrapers, so attempts are reported
+        per request rather than through an observer registered on it.
+        """
+        return await self.scheduler.request(session, method, url, read, timeout=timeout or self.timeout,
+                                            observer=self.metrics.observe_attempt, **kwargs)
+    
+    def _endpoint_for(self, url: str, method: str = 'GET') -> str:
+        """Classify a URL for cache TTLs and metrics."""
+        if url.startswith(self.base_search_url) or url.startswith(self.base_scrape_url):
+            return 'search'
+        if url.startswith(self.base_metadata_url):
+            return 'metadata'
+        if url.startswith(self.base_download_url):
+            return 'head' if method == 'HEAD' else 'download'
+        return 'default'
     
     async def fetch(self, session: aiohttp.ClientSession, url: str) -> dict:
-        """Fetch JSON data from URL with error handling."""
-        try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
-                response.raise_for_status()
-                return await response.json()
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            print(f"⚠️ Failed to fetch {url}: {e}")
-            return {}
+        """Fetch JSON data from URL with error handling.
+        
+        On failure a falsy FetchError is returned; its ``transient`` flag tells
+        throttling and network errors apart from permanent ones.
+        """
+        if self.cache:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return json.loads(cached)
+        
+        async def read(response: aiohttp.ClientResponse) -> Tuple[str, dict]:
+            body = await response.text()
+            return body, json.loads(body)
+        
+        async def request() -> dict:
+            result = await self.request(session, 'GET', url, read)
+            if isinstance(result, FetchError):
+                print(f"⚠️ Failed to fetch {url}: {result.reason}")
+                return result
+            body, data = result
+            if self.cache and data:
+                self.cache.set(url, body, self._endpoint_for(url))
+            return data
+        
+        return await self._single_flight(self._endpoint_for(url), url, request)
+    
+    async def _single_flight(self, kind: str, key, call):
+        """Await call(), joining an identical call already in flight when coalescing is on."""
+        if self.flights is None:
+            return await call()
+        return await self.flights.do(kind, key, call)
     
     async def verify_flac_download(self, session: aiohttp.ClientSession, url: str) -> bool:
         """Verify that a FLAC file is accessible and valid."""
-        try:
-            async with session.head(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
-                if response.status == 200:
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    content_length = int(response.headers.get('Content-Length', '0'))
-                    return ('flac' in content_type or url.lower().endswith('.flac')) and content_length > self.min_flac_size
-            return False
-        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        cache_key = f"HEAD {url}"
+        if self.cache and self.cache.get(cache_key) is not None:
+            return True
+        
+        async def read(response: aiohttp.ClientResponse) -> bool:
+            if response.status != 200:
+                return False
+            content_type = response.headers.get('Content-Type', '').lower()
+            content_length = int(response.headers.get('Content-Length', '0'))
+            return ('flac' in content_type or url.lower().endswith('.flac')) and content_length > self.min_flac_size
+        
+        async def request() -> Union[bool, FetchError]:
+            self._count_verify_request()
+            valid = await self.request(session, 'HEAD', url, read, allow_redirects=True)
+            # Only successful verifications are cached; failures may be transient
+            if self.cache and valid is True:
+                self.cache.set(cache_key, '1', 'head')
+            return valid
+        
+        return self._check_result(await self._single_flight('head', (url, self.min_flac_size), request))
+    
+    @staticmethod
+    def _check_result(result: Union[bool, FetchError]) -> bool:
+        """A shared check result as a bool, noting transient failures for the calling verification."""
+        if isinstance(result, FetchError):
+            failures = _transient_failures.get()
+            if failures is not None and result.transient:
+                failures.append(result)
             return False
+        return result
     
-    async def search_album_return_links(self, session: aiohttp.ClientSession, album_name: str, 
-                                      artist_name: Optional[str] = None, max_results: Optional[int] = None) -> List[Dict]:
-        """Search Archive.org for albums and return metadata."""
+    async def _read_range(self, session: aiohttp.ClientSession, url: str, start: int,
+                          length: int) -> Union[bytes, FetchError]:
+        """Read length bytes at offset start with a Range GET, or the FetchError."""
+        self._count_verify_request()
+        
+        async def read_up_to(content: aiohttp.StreamReader) -> bytes:
+            # read(n) returns what is buffered, which may be less than n before EOF
+            data = b''
+            while len(data) < length:
+                received = await content.read(length - len(data))
+                if not received:
+                    break
+                data += received
+            return data
+        
+        async def read(response: aiohttp.ClientResponse) -> bytes:
+            if response.status == 206:
+                return await read_up_to(response.content)
+            if response.status == 200:
+                # Server ignored the range; skip ahead without reading the whole file
+                await response.content.readexactly(start)
+                return await read_up_to(response.content)
+            return b''
+        
+        headers = {'Range': f"bytes={start}-{start + length - 1}"}
+        return await self.request(session, 'GET', url, read, headers=headers, allow_redirects=True)
+    
+    async def verify_flac_header(self, session: aiohttp.ClientSession, url: str) -> bool:
+        """Verify a FLAC file by reading its first bytes and checking the fLaC marker."""
+        cache_key = f"HEADER {url}"
+        if self.cache and self.cache.get(cache_key) is not None:
+            return True
+        
+        async def request() -> Union[bool, FetchError]:
+            try:
+                header = await self._read_range(session, url, 0, ID3_HEADER_SIZE)
+                if isinstance(header, FetchError):
+                    return header
+                tag_size = id3v2_size(header)
+                if tag_size:
+                    header = await self._read_range(session, url, tag_size, len(FLAC_MAGIC))
+                    if isinstance(header, FetchError):
+                        return header
+                valid = is_flac_header(header)
+            except asyncio.IncompleteReadError:
+                return False
+            if self.cache and valid:
+                self.cache.set(cache_key, '1', 'head')
+            return valid
+        
+        return self._check_result(await self._single_flight('header', url, request))
+    
+    def _count_verify_request(self) -> None:
+        """Attribute one network request to the active verification strategy."""
+        strategy = _verify_strategy.get()
+        if strategy is not None:
+            self._verify_stats[strategy]['requests'] += 1
+    
+    @property
+    def verify_semaphore(self) -> asyncio.Semaphore:
+        """Semaphore shared by every verification request this scraper issues."""
+        if self._verify_semaphore is None:
+            self._verify_semaphore = asyncio.Semaphore(max(1, self.verify_request_limit))
+        return self._verify_semaphore
+    
+    async def _check_all(self, check, session: aiohttp.ClientSession, urls: List[str]) -> List[bool]:
+        """Run a per-file check on every URL under the shared semaphore."""
+        async def limited(url: str) -> bool:
+            async with self.verify_semaphore:
+                return await check(session, url)
+        return list(await asyncio.gather(*(limited(url) for url in urls)))
+    
+    @traced
+    async def verify_flac_urls(self, session: aiohttp.ClientSession, urls: List[str],
+                               strategy: Optional[str] = None) -> List[str]:
+        """Return the URLs that pass verification with the given strategy.
+        
+        'none' trusts the metadata, 'sample' HEADs a random sample and extrapolates
+        (falling back to checking every file if the sample is mixed), 'header' reads
+        the first bytes of each file, and 'full' sends a HEAD for every file.
+        """
+        strategy = strategy or self.verify_strategy
+        if strategy not in VERIFY_STRATEGIES:
+            raise ValueError(f"Unknown verify strategy: {strategy}")
+        
+        token = _verify_strategy.set(strategy)
+        start = time.perf_counter()
+        try:
+            if strategy == 'none' or not urls:
+                verified = list(urls)
+            elif strategy == 'header':
+                results = await self._check_all(self.verify_flac_header, session, urls)
+                verified = [url for url, valid in zip(urls, results) if valid]
+            elif strategy == 'sample':
+                sample = random.sample(urls, min(max(1, self.verify_sample_size), len(urls)))
+                results = dict(zip(sample, await self._check_all(self.verify_flac_download, session, sample)))
+                if all(results.values()):
+                    verified = list(urls)
+                elif not any(results.values()):
+                    verified = []
+                else:
+                    rest = [url for url in urls if url not in results]
+                    results.update(zip(rest, await self._check_all(self.verify_flac_download, session, rest)))
+                    verified = [url for url in urls if results[url]]
+            else:
+                results = await self._check_all(self.verify_flac_download, session, urls)
+                verified = [url for url, valid in zip(urls, results) if valid]
+        finally:
+            _verify_strategy.reset(token)
+            stats = self._verify_stats[strategy]
+            stats['calls'] += 1
+            stats['files'] += len(urls)
+            stats['seconds'] += time.perf_counter() - start
+        return verified
+    
+    def verification_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-strategy counts of calls, files, requests issued and wall-clock seconds."""
+        return {strategy: dict(stats) for strategy, stats in self._verify_stats.items() if stats['calls']}
+    
+    def coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-kind counts of requests issued and duplicate requests that joined one in flight.
+        
+        The counters belong to the SingleFlight, so they cover every scraper sharing it.
+        """
+        return self.flights.stats() if self.flights is not None else {}
+    
+    def build_search_url(self, album_name: str, artist_name: Optional[str] = None,
+                         max_results: Optional[int] = None) -> str:
+        """Build the advancedsearch URL for an album (and optional artist)."""
         if max_results is None:
             max_results = self.max_results
-            
-        query_parts = [
-            f'title:"{album_name}"',
-            'format:"Flac"',
-            'mediatype:"audio"'
-        ]
+        return self._search_url(self.build_search_query(album_name, artist_name), max_results)
+    
+    def build_search_query(self, album_name: Optional[str] = None, artist_name: Optional[str] = None) -> str:
+        """Query for FLAC audio items by album title and/or artist."""
+        query_parts = []
+        if album_name:
+            query_parts.append(f'title:{self._phrase(album_name)}')
+        query_parts += ['format:"Flac"', 'mediatype:"audio"']
         if artist_name:
-            query_parts.append(f'creator:"{artist_name}"')
-
+            query_parts.append(f'creator:{self._phrase(artist_name)}')
+        return ' AND '.join(query_parts)
+    
+    def build_relaxed_queries(self, album_name: str, artist_name: Optional[str] = None,
+                              year: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Looser (level, query) pairs for an album, skipping any that equal a stricter one.
+        
+        'edition' strips suffixes like "(Deluxe)" or "- Remastered", 'no_creator'
+        drops the artist, 'unquoted' matches the normalized title words in any
+        order, and 'artist' searches the artist's items (in the release year if known).
+        """
+        flac = 'format:"Flac" AND mediatype:"audio"'
+        title = strip_edition(album_name) or album_name
+        queries = [('edition', self.build_search_query(title, artist_name))]
+        if artist_name:
+            queries.append(('no_creator', self.build_search_query(title)))
+        title_words = normalize_title(album_name).split()
+        if title_words:
+            parts = [f'title:({" AND ".join(title_words)})', flac]
+            artist_words = normalize_title(artist_name).split() if artist_name else []
+            if artist_words:
+                parts.append(f'creator:({" AND ".join(artist_words)})')
+            queries.append(('unquoted', ' AND '.join(parts)))
+        if artist_name:
+            query = f'creator:{self._phrase(artist_name)} AND {flac}'
+            if year:
+                query += f' AND year:{int(year)}'
+            queries.append(('artist', query))
+        
+        seen = {self.build_search_query(album_name, artist_name)}
+        relaxed = []
+        for level, query in queries:
+            if query not in seen:
+                seen.add(query)
+                relaxed.append((level, query))
+        return relaxed
+    
+    @property
+    def scrape_count(self) -> int:
+        """Docs per scrape API page (the API's minimum is 100)."""
+        return max(100, self.scrape_page_size)
+    
+    def build_scrape_url(self, query: str, fields: List[str], cursor: Optional[str] = None) -> str:
+        """Build a scrape API URL for one page of a query."""
         params = {
-            'q': ' AND '.join(query_parts),
-            'fl[]': ['identifier', 'title', 'creator', 'year', 'downloads', 'item_size'],
-            'rows': max_results,
+            'q': query,
+            'fields': ','.join(fields),
+            'count': self.scrape_count,
+            'sorts': 'downloads desc'
+        }
+        if cursor:
+            params['cursor'] = cursor
+        return self.base_scrape_url + '?' + urllib.parse.urlencode(params)
+    
+    def build_batch_search_url(self, pairs: List[Tuple[str, Optional[str]]], rows: int) -> str:
+        """Build one advancedsearch URL OR-combining several (album, artist) pairs."""
+        clauses = []
+        for album_name, artist_name in pairs:
+            clause = f'title:{self._phrase(album_name)}'
+            if artist_name:
+                clause = f'({clause} AND creator:{self._phrase(artist_name)})'
+            clauses.append(clause)
+        query = f'({" OR ".join(clauses)}) AND format:"Flac" AND mediatype:"audio"'
+        return self._search_url(query, rows)
+    
+    @staticmethod
+    def _phrase(value: str) -> str:
+        """Quote a value as a query phrase (embedded quotes would end it early)."""
+        return '"' + value.replace('"', ' ') + '"'
+    
+    def _search_url(self, query: str, rows: int, fields: Optional[List[str]] = None) -> str:
+        params = {
+            'q': query,
+            'fl[]': fields or SEARCH_FIELDS,
+            'rows': rows,
             'output': 'json',
             'sort[]': 'downloads desc'
         }
-
-        search_url = self.base_search_url + '?' + urllib.parse.urlencode(params, doseq=True)
-        data = await self.fetch(session, search_url)
-        
+        return self.base_search_url + '?' + urllib.parse.urlencode(params, doseq=True)
+    
+    @staticmethod
+    def album_from_doc(doc: Dict) -> Optional[Dict]:
+        """Convert a search doc into an album dict (None if it has no identifier)."""
+        identifier = doc.get('identifier', '')
+        if not identifier:
+            return None
+        try:
+            size = int(doc.get('item_size', '0'))
+        except (ValueError, TypeError):
+            size = 0
+        return {
+            'identifier': identifier,
+            'title': doc.get('title', 'Unknown Album'),
+            'artist': doc.get('creator', 'Unknown Artist'),
+            'year': doc.get('year', 'Unknown Year'),
+            'downloads': int(doc.get('downloads', 0)),
+            'size': size,
+            'url': f"https://archive.org/details/{identifier}"
+        }
+    
+    @staticmethod
+    def parse_search_results(data: dict) -> List[Dict]:
+        """Convert an advancedsearch response into album dicts."""
         if not data or 'response' not in data:
             return []
+        albums = (ArchiveScraper.album_from_doc(doc) for doc in data['response']['docs'])
+        return [album for album in albums if album]
+    
+    async def _fetch_scrape_page(self, session: aiohttp.ClientSession, url: str) -> Dict:
+        """Fetch one scrape API page; raises FetchFailed instead of returning a FetchError."""
+        data = await self.fetch(session, url)
+        if isinstance(data, FetchError):
+            raise FetchFailed(data)
+        if 'items' not in data:
+            raise FetchFailed(FetchError(url, f"Invalid response: {data.get('error', 'no items')}"))
+        return data
+    
+    async def _fetch_search_page(self, session: aiohttp.ClientSession, url: str) -> List[Dict]:
+        """Docs of one advancedsearch response; raises FetchFailed like _fetch_scrape_page."""
+        data = await self.fetch(session, url)
+        if isinstance(data, FetchError):
+            raise FetchFailed(data)
+        if 'response' not in data:
+            raise FetchFailed(FetchError(url, f"Invalid response: {data.get('error', 'no response')}"))
+        return data['response'].get('docs', [])
+    
+    async def iter_search(self, album_name: Optional[str] = None, artist_name: Optional[str] = None,
+                          query: Optional[str] = None, fields: Optional[List[str]] = None,
+                          limit: Optional[int] = None,
+                          session: Optional[aiohttp.ClientSession] = None) -> AsyncIterator[Dict]:
+        """Yield search docs one at a time, paging through the cursor-based scrape API.
         
-        results = []
-        for doc in data['response']['docs']:
-            identifier = doc.get('identifier', '')
-            if not identifier:
-                continue
+        Searches by album and/or artist (see build_search_query) or by any raw
+        query, e.g. 'creator:"Artist" AND format:"Flac"' for a whole discography.
+        fields projects the docs (default SEARCH_FIELDS) and limit stops after
+        that many docs. A limit that fits in one scrape page is fetched with a
+        single advancedsearch request for exactly that many rows; otherwise
+        only the current page is held, and the next one is fetched while the
+        caller consumes it; stopping early (limit, or closing the generator)
+        cancels that prefetch. Raises FetchFailed if a page fails.
+        """
+        if query is None:
+            query = self.build_search_query(album_name, artist_name)
+        fields = list(fields or SEARCH_FIELDS)
+        
+        async with contextlib.AsyncExitStack() as stack:
+            if session is None:
+                session = await stack.enter_async_context(self.session_context())
+            if limit is not None and limit <= self.scrape_count:
+                # The common small lookup: no cursor, and no page of docs fetched to use a few
+                for doc in (await self._fetch_search_page(session, self._search_url(query, limit, fields)))[:limit]:
+                    yield doc
+                return
+            pending = asyncio.ensure_future(self._fetch_scrape_page(session, self.build_scrape_url(query, fields)))
+            yielded = 0
             try:
-                size = int(doc.get('item_size', '0'))
-            except (ValueError, TypeError):
-                size = 0
-            results.append({
-                'identifier': identifier,
-                'title': doc.get('title', 'Unknown Album'),
-                'artist': doc.get('creator', 'Unknown Artist'),
-                'year': doc.get('year', 'Unknown Year'),
-                'downloads': int(doc.get('downloads', 0)),
-                'size': size,
-                'url': f"https://archive.org/details/{identifier}"
-            })
+                while pending is not None:
+                    data = await pending
+                    pending = None
+                    items = data['items']
+                    cursor = data.get('cursor')
+                    if cursor and items and (limit is None or yielded + len(items) < limit):
+                        pending = asyncio.ensure_future(
+                            self._fetch_scrape_page(session, self.build_scrape_url(query, fields, cursor)))
+                    for doc in items:
+                        if limit is not None and yielded >= limit:
+                            return
+                        yield doc
+                        yielded += 1
+            finally:
+                if pending is not None:
+                    pending.cancel()
+                    await asyncio.gather(pending, return_exceptions=True)
+    
+    async def _search(self, session: aiohttp.ClientSession, album_name: str,
+                      artist_name: Optional[str] = None,
+                      max_results: Optional[int] = None) -> Union[List[Dict], FetchError]:
+        """Album dicts for a search, or the FetchError if the search request failed.
+        
+        In 'prefer' index mode, fresh matches from the local index are returned
+        without a request; every network result is added to the index.
+        """
+        if self.index and self.index_mode == 'prefer':
+            albums = self.index.search(album_name, artist_name, max_results)
+            if albums:
+                return albums
+        
+        if max_results is None:
+            max_results = self.max_results
+        return await self._search_query(session, self.build_search_query(album_name, artist_name), max_results)
+    
+    async def _search_query(self, session: aiohttp.ClientSession, query: str,
+                            max_results: int) -> Union[List[Dict], FetchError]:
+        """Album dicts for a raw query (recorded in the index), or the FetchError.
+        
+        Queries that found nothing are remembered in the negative cache.
+        """
+        negative_key = f"NOSEARCH {query}"
+        if self._negative_hit(negative_key):
+            return []
+        try:
+            docs = [doc async for doc in self.iter_search(query=query, limit=max_results, session=session)]
+        except FetchFailed as e:
+            return e.error
+        albums = [album for album in map(self.album_from_doc, docs) if album]
+        if self.index and albums:
+            self.index.add_albums(albums)
+        if not albums:
+            self._store_negative(negative_key)
+        return albums
+    
+    def _negative_hit(self, key: str) -> bool:
+        """Whether key is in the negative cache (a recent "nothing found" outcome)."""
+        if not self.cache or self.cache.get(key) is None:
+            return False
+        self.negative_stats['hits'] += 1
+        return True
+    
+    def _store_negative(self, key: str) -> None:
+        if self.cache:
+            self.cache.set(key, '1', 'negative')
+            self.negative_stats['stored'] += 1
+    
+    def pack_search_batches(self, pairs: List[Tuple[str, Optional[str]]],
+                            max_results: int) -> List[List[Tuple[str, Optional[str]]]]:
+        """Group pairs into batches of at most ARCHIVE_BATCH_SIZE whose URL fits ARCHIVE_BATCH_MAX_URL."""
+        batches: List[List[Tuple[str, Optional[str]]]] = []
+        current: List[Tuple[str, Optional[str]]] = []
+        for pair in pairs:
+            candidate = current + [pair]
+            rows = min(self.batch_max_rows, len(candidate) * max_results)
+            if current and (len(candidate) > self.batch_size
+                            or len(self.build_batch_search_url(candidate, rows)) > self.batch_max_url):
+                batches.append(current)
+                current = [pair]
+            else:
+                current = candidate
+        if current:
+            batches.append(current)
+        return batches
+    
+    @staticmethod
+    def attribute_results(pairs: List[Tuple[str, Optional[str]]],
+                          albums: List[Dict]) -> Tuple[Dict[Tuple[str, Optional[str]], List[Dict]], int]:
+        """Split a batched search's albums back to the pairs they match.
+        
+        An album is attributed to every pair whose album (and artist) tokens it
+        mostly contains, keeping the response's downloads order. Returns the
+        per-pair lists and the number of albums that matched no pair.
+        """
+        matchers = [(pair, tokens(pair[0]), tokens(pair[1]) if pair[1] else None) for pair in pairs]
+        attributed: Dict[Tuple[str, Optional[str]], List[Dict]] = {pair: [] for pair in pairs}
+        unattributed = 0
+        for album in albums:
+            title_tokens = tokens(field_text(album.get('title')))
+            creator_tokens = tokens(field_text(album.get('artist')))
+            matched = False
+            for pair, album_tokens, artist_tokens in matchers:
+                if coverage(album_tokens, title_tokens) < BATCH_ATTRIBUTION_COVERAGE:
+                    continue
+                if artist_tokens is not None and coverage(artist_tokens, creator_tokens) < BATCH_ATTRIBUTION_COVERAGE:
+                    continue
+                attributed[pair].append(album)
+                matched = True
+            unattributed += not matched
+        return attributed, unattributed
+    
+    async def _search_batch(self, session: aiohttp.ClientSession, pairs: List[Tuple[str, Optional[str]]],
+                            max_results: int) -> Tuple[Dict, List[Tuple[str, Optional[str]]]]:
+        """Run one batched search; returns (results per pair, pairs needing an individual query).
+        
+        When the response was cut off at the row limit, a pair with fewer than
+        max_results albums may have lost some, so it is queried on its own; so is
+        a pair with no albums if some albums could not be attributed to any pair.
+        """
+        data = await self.fetch(session, self.build_batch_search_url(
+            pairs, min(self.batch_max_rows, len(pairs) * max_results)))
+        self.batch_stats['batches'] += 1
+        if isinstance(data, FetchError):
+            return {pair: data for pair in pairs}, []
+        
+        albums = self.parse_search_results(data)
+        attributed, unattributed = self.attribute_results(pairs, albums)
+        self.batch_stats['unattributed'] += unattributed
+        truncated = data.get('response', {}).get('numFound', 0) > len(albums)
+        
+        results, follow_ups = {}, []
+        for pair, pair_albums in attributed.items():
+            if (truncated and len(pair_albums) < max_results) or (unattributed and not pair_albums):
+                follow_ups.append(pair)
+            else:
+                results[pair] = pair_albums[:max_results]
+        if self.index and albums:
+            self.index.add_albums(albums)
+        return results, follow_ups
+    
+    @traced
+    async def search_many(self, pairs: List[Tuple[str, Optional[str]]],
+                          max_results: Optional[int] = None) -> Dict[Tuple[str, Optional[str]], Union[List[Dict], FetchError]]:
+        """Search for many (album, artist) pairs with few requests.
+        
+        Pairs are packed into OR-combined advancedsearch queries (see
+        pack_search_batches), and each result is attributed back to the pair it
+        matched. Pairs whose share may have been cut off by the row limit get a
+        follow-up individual query. Returns the albums (as from
+        search_album_return_links) or the FetchError for every pair.
+        """
+        if max_results is None:
+            max_results = self.max_results
+        pairs = list(dict.fromkeys((album, artist or None) for album, artist in pairs))
+        self.batch_stats['pairs'] += len(pairs)
+        results: Dict[Tuple[str, Optional[str]], Union[List[Dict], FetchError]] = {}
+        
+        remaining = pairs
+        if self.index and self.index_mode == 'prefer':
+            for pair in pairs:
+                albums = self.index.search(pair[0], pair[1], max_results)
+                if albums:
+                    results[pair] = albums
+            remaining = [pair for pair in pairs if pair not in results]
+        
+        async with self.session_context() as session:
+            batches = await asyncio.gather(*(self._search_batch(session, batch, max_results)
+                                             for batch in self.pack_search_batches(remaining, max_results)))
+            follow_ups = []
+            for batch_results, batch_follow_ups in batches:
+                results.update(batch_results)
+                follow_ups.extend(batch_follow_ups)
+            
+            self.batch_stats['follow_ups'] += len(follow_ups)
+            singles = await asyncio.gather(*(self._search(session, album, artist, max_results)
+                                             for album, artist in follow_ups))
+            results.update(zip(follow_ups, singles))
         return results
     
-    async def get_verified_flac_files(self, session: aiohttp.ClientSession, identifier: str) -> Tuple[Optional[str], List[str]]:
-        """Get verified FLAC files and torrent link for an archive."""
+    @traced
+    async def search_album_return_links(self, session: aiohttp.ClientSession, album_name: str, 
+                                      artist_name: Optional[str] = None, max_results: Optional[int] = None) -> List[Dict]:
+        """Search Archive.org for albums and return metadata."""
+        albums = await self._search(session, album_name, artist_name, max_results)
+        return [] if isinstance(albums, FetchError) else albums
+    
+    @staticmethod
+    def _file_size(file: Dict) -> int:
+        try:
+            return int(file.get('size', 0))
+        except (ValueError, TypeError):
+            return 0
+    
+    def is_wanted_file(self, file: Dict) -> bool:
+        """Whether a metadata file entry is the torrent or a large-enough FLAC."""
+        name = file.get("name", "")
+        if name.endswith(".torrent"):
+            return True
+        format_type = str(file.get("format", "")).lower()
+        if "flac" in format_type or name.lower().endswith('.flac'):
+            return self._file_size(file) > self.min_flac_size
+        return False
+    
+    async def fetch_file_entries(self, session: aiohttp.ClientSession, identifier: str) -> List[Dict]:
+        """Return the torrent and FLAC entries of an item's metadata ``files`` list.
+        
+        With ARCHIVE_STREAM_METADATA the response is parsed incrementally: only
+        wanted entries are kept and reading stops once the files list ends.
+        Otherwise the whole document is fetched and filtered. Failures return
+        the (falsy) FetchError.
+        """
         metadata_url = f"{self.base_metadata_url}{identifier}"
-        data = await self.fetch(session, metadata_url)
-        if not data or 'files' not in data:
+        if not self.stream_metadata:
+            data = await self.fetch(session, metadata_url)
+            if not data or 'files' not in data:
+                return data if isinstance(data, FetchError) else []
+            return [file for file in data['files'] if self.is_wanted_file(file)]
+        
+        cache_key = f"FILES {metadata_url}"
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
+        
+        async def read(response: aiohttp.ClientResponse) -> List[Dict]:
+            chunks = response.content.iter_chunked(64 * 1024)
+            return [file async for file in iter_json_array(chunks, 'files', self.is_wanted_file)]
+        
+        async def request() -> List[Dict]:
+            files = await self.request(session, 'GET', metadata_url, read)
+            if isinstance(files, FetchError):
+                print(f"⚠️ Failed to fetch {metadata_url}: {files.reason}")
+                return files
+            if self.cache and files:
+                self.cache.set(cache_key, json.dumps(files), 'metadata')
+            return files
+        
+        return await self._single_flight('metadata', (cache_key, self.min_flac_size), request)
+    
+    @traced
+    async def get_verified_flac_files(self, session: aiohttp.ClientSession, identifier: str,
+                                      strategy: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+        """Get verified FLAC files and torrent link for an archive.
+        
+        Results are recorded in the item index, except with strategy 'none' (nothing
+        was checked) or when every check failed (possibly transiently); in 'prefer'
+        mode a fresh recorded result is reused. Items without valid FLACs are
+        remembered in the negative cache unless a failure was transient.
+        """
+        strategy = strategy or self.verify_strategy
+        if self.index and self.index_mode == 'prefer':
+            recorded = self.index.get_verified(identifier)
+            if recorded is not None:
+                return recorded
+        negative_key = f"NOFLACS {identifier}"
+        if self._negative_hit(negative_key):
+            return None, []
+        
+        files = await self.fetch_file_entries(session, identifier)
+        if isinstance(files, FetchError):
+            if not files.transient:
+                self._store_negative(negative_key)
+            return None, []
+        if not files:
+            self._record_verified(identifier, strategy, None, [])
+            self._store_negative(negative_key)
             return None, []
 
         torrent_link = None
         potential_flacs = []
 
-        for file in data.get("files", []):
+        for file in files:
             name = file.get("name", "")
-            format_type = str(file.get("format", "")).lower()
-            
+            file_url = f"{self.base_download_url}{identifier}/{name}"
             if name.endswith(".torrent"):
-                torrent_link = f"{self.base_download_url}{identifier}/{name}"
-            elif "flac" in format_type or name.lower().endswith('.flac'):
-                file_url = f"{self.base_download_url}{identifier}/{name}"
-                try:
-                    size = int(file.get('size', 0))
-                except (ValueError, TypeError):
-                    size = 0
-                if size > self.min_flac_size:
-                    potential_flacs.append((file_url, size))
-
-        verified_flacs = []
-        if potential_flacs:
-            verification_tasks = [self.verify_flac_download(session, url) for url, _ in potential_flacs]
-            results = await asyncio.gather(*verification_tasks)
-
-            for (url, _), valid in zip(potential_flacs, results):
-                if valid:
-                    verified_flacs.append(url)
-        
+                torrent_link = file_url
+            else:
+                potential_flacs.append((file_url, self._file_size(file)))
+
+        failures: List[FetchError] = []
+        token = _transient_failures.set(failures)
+        try:
+            verified_flacs = await self.verify_flac_urls(session, [url for url, _ in potential_flacs], strategy)
+        finally:
+            _transient_failures.reset(token)
+        if verified_flacs or not potential_flacs:
+            self._record_verified(identifier, strategy, torrent_link, verified_flacs)
+        if not verified_flacs and not failures:
+            self._store_negative(negative_key)
         return torrent_link, verified_flacs
     
-    async def search_albums(self, album_name: str, artist_name: Optional[str] = None) -> List[Dict]:
-        """Basic album search - returns list of albums."""
-        async with aiohttp.ClientSession() as session:
-            albums = await self.search_album_return_links(session, album_name, artist_name)
-            return albums
+    def _record_verified(self, identifier: str, strategy: str, torrent: Optional[str], flacs: List[str]) -> None:
+        if self.index and strategy != 'none':
+            self.index.add_verified(identifier, torrent, flacs)
     
-    async def advanced_search(self, album_name: str, artist_name: Optional[str] = None) -> Dict:
-        """Advanced search with FLAC verification."""
-        async with aiohttp.ClientSession() as session:
-            albums = await self.search_album_return_links(session, album_name, artist_name)
-            
+    async def read_flac_tags(self, session: aiohttp.ClientSession, url: str) -> Union[Dict, FetchError]:
+        """STREAMINFO and Vorbis comments of a FLAC file, read with a few small range requests.
+        
+        Returns {"streaminfo", "tags", "bytes"} where bytes is what was transferred
+        (0 when the tags came from the response cache), or the FetchError.
+        """
+        cache_key = f"FLACTAGS {url}"
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {**json.loads(cached), 'bytes': 0}
+        
+        transferred = 0
+        
+        async def read(start: int, length: int) -> bytes:
+            nonlocal transferred
+            data = await self._read_range(session, url, start, length)
+            if isinstance(data, FetchError):
+                raise FetchFailed(data)
+            transferred += len(data)
+            return data
+        
+        try:
+            async with self.verify_semaphore:
+                metadata = await read_flac_metadata(read)
+        except FetchFailed as e:
+            return e.error
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            return FetchError(url, f"Unreadable FLAC metadata: {e}")
+        if self.cache:
+            self.cache.set(cache_key, json.dumps(metadata), 'metadata')
+        metadata['bytes'] = transferred
+        return metadata
+    
+    @traced
+    async def match_tracks(self, session: aiohttp.ClientSession, identifier: str,
+                           tracks: List[Dict]) -> Dict:
+        """Match Spotify tracks to an item's FLAC files without downloading them.
+        
+        The STREAMINFO and Vorbis comments of every FLAC file are read
+        concurrently with small range requests (see read_flac_tags), each file is
+        scored against each track by title, track number and duration (see
+        TrackMatcher), and files are assigned best-first. Returns the "matches"
+        ({"track", "url", "title", "score"}), the "unmatched" tracks, the metadata
+        "bytes" transferred, "bytes_per_match" and "album_bytes" (what
+        downloading every FLAC would cost), or {"error": {...}} if the item
+        metadata could not be fetched.
+        """
+        files = await self.fetch_file_entries(session, identifier)
+        if isinstance(files, FetchError):
+            return {"identifier": identifier, "error": files.to_dict()}
+        flacs = [file for file in files if not file.get("name", "").endswith(".torrent")]
+        urls = [f"{self.base_download_url}{identifier}/{file['name']}" for file in flacs]
+        results = await asyncio.gather(*(self.read_flac_tags(session, url) for url in urls))
+        
+        candidates = []
+        transferred = 0
+        for file, url, metadata in zip(flacs, urls, results):
+            if isinstance(metadata, FetchError):
+                continue
+            transferred += metadata['bytes']
+            title, number = file_track_info(file['name'], metadata['tags'])
+            duration = (metadata['streaminfo'] or {}).get('duration')
+            candidates.append((url, title, number, duration))
+        
+        scores = [[TrackMatcher(track.get('title', ''), track.get('track_number'), track.get('duration_ms'))
+                   .score(title, number, duration) for _, title, number, duration in candidates]
+                  for track in tracks]
+        matches, unmatched = [], []
+        for track, row, assigned in zip(tracks, scores, assign_tracks(scores, self.track_match_threshold)):
+            if assigned is None:
+                unmatched.append(track)
+                continue
+            url, title, _, _ = candidates[assigned]
+            matches.append({"track": track, "url": url, "title": title, "score": round(row[assigned], 3)})
+        
+        stats = self.track_match_stats
+        stats['tracks'] += len(tracks)
+        stats['matched'] += len(matches)
+        stats['files_read'] += len(candidates)
+        stats['bytes'] += transferred
+        return {
+            "identifier": identifier,
+            "matches": matches,
+            "unmatched": unmatched,
+            "files_read": len(candidates),
+            "bytes": transferred,
+            "bytes_per_match": transferred // len(matches) if matches else None,
+            "album_bytes": sum(self._file_size(file) for file in flacs),
+        }
+    
+    @traced
+    async def search_albums(self, album_name: str, artist_name: Optional[str] = None,
+                            raise_on_error: bool = False) -> List[Dict]:
+        """Basic album search - returns list of albums.
+        
+        A failed search returns [] like an empty one, unless raise_on_error is
+        set: then it raises FetchFailed carrying the FetchError.
+        """
+        async with self.session_context() as session:
+            albums = await self._search(session, album_name, artist_name)
+        if isinstance(albums, FetchError):
+            if raise_on_error:
+                raise FetchFailed(albums)
+            return []
+        return albums
+    
+    @traced
+    async def verify_candidates(self, session: aiohttp.ClientSession, albums: List[Dict],
+                                mode: Optional[str] = None, concurrency: Optional[int] = None,
+                                rank_by: Optional[str] = None) -> Optional[Dict]:
+        """Verify candidate albums and return the winning one, or None.
+        
+        'sequential' checks candidates in order, 'first' verifies them concurrently and
+        cancels the rest once one qualifies, 'best' waits for every candidate and picks
+        the verified one with the most downloads or largest size.
+        """
+        mode = mode or self.verify_mode
+        concurrency = concurrency or self.verify_concurrency
+        rank_by = rank_by or self.rank_by
+        if mode not in ('sequential', 'first', 'best'):
+            raise ValueError(f"Unknown verify mode: {mode}")
+        if rank_by not in ('downloads', 'size'):
+            raise ValueError(f"Unknown rank_by field: {rank_by}")
+
+        if mode == 'sequential':
             for album in albums:
                 torrent, flacs = await self.get_verified_flac_files(session, album["identifier"])
                 if flacs:
-                    return {
-                        "verified_album": album,
-                        "torrent": torrent,
-                        "flacs": flacs
-                    }
+                    return {"verified_album": album, "torrent": torrent, "flacs": flacs}
+            return None
+
+        tasks = self._verify_tasks(session, albums, concurrency)
+        try:
+            if mode == 'best':
+                results = await asyncio.gather(*tasks)
+                verified = [result for result in results if result["flacs"]]
+                if not verified:
+                    return None
+                # max() keeps the earliest candidate on ties, i.e. the search order
+                return max(verified, key=lambda result: result["verified_album"].get(rank_by, 0))
+
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result["flacs"]:
+                    return result
+            return None
+        finally:
+            # Cancel in-flight verifications for the candidates that lost
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _verify_tasks(self, session: aiohttp.ClientSession, albums: List[Dict],
+                      concurrency: int) -> List[asyncio.Task]:
+        """Start verifying every album, at most concurrency at a time."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def verify(album: Dict) -> Dict:
+            async with semaphore:
+                torrent, flacs = await self.get_verified_flac_files(session, album["identifier"])
+                return {"verified_album": album, "torrent": torrent, "flacs": flacs}
+
+        return [asyncio.create_task(verify(album)) for album in albums]
+    
+    async def iter_verified(self, session: aiohttp.ClientSession, albums: List[Dict],
+                            concurrency: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Yield each album's verification result as soon as it finishes.
+        
+        Results look like verify_candidates' ({"verified_album", "torrent", "flacs"});
+        flacs is empty for albums that did not verify. Closing or cancelling the
+        generator cancels the verifications still running.
+        """
+        tasks = self._verify_tasks(session, albums, concurrency or self.verify_concurrency)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def rank_candidates(self, albums: List[Dict], album_name: str, artist_name: Optional[str] = None,
+                        year: Optional[int] = None, top_n: Optional[int] = None) -> List[Dict]:
+        """Score candidates locally and return the top_n worth verifying, best first.
+        
+        Candidates below ARCHIVE_MATCH_THRESHOLD are dropped; each one that would
+        otherwise have been among the top_n verified counts as a saved verification
+        (at least one metadata request) in match_stats.
+        """
+        if top_n is None:
+            top_n = self.verify_top_n
+        if not self.match_enabled:
+            return albums[:top_n]
+        
+        accepted, rejected = MatchScorer(album_name, artist_name, year).rank(albums)
+        rejected_ids = {album['identifier'] for album in rejected}
+        self.match_stats['scored'] += len(albums)
+        self.match_stats['rejected'] += len(rejected)
+        self.match_stats['verifications_saved'] += sum(
+            1 for album in albums[:top_n] if album['identifier'] in rejected_ids
+        )
+        return accepted[:top_n]
+    
+    async def search_relaxed(self, session: aiohttp.ClientSession, album_name: str,
+                             artist_name: Optional[str] = None, year: Optional[int] = None,
+                             exclude: Iterable[str] = (), mode: Optional[str] = None,
+                             top_n: Optional[int] = None, concurrency: Optional[int] = None,
+                             rank_by: Optional[str] = None) -> Optional[Dict]:
+        """Race the relaxed queries and return the first verified result, or None.
+        
+        Every level searches, ranks its candidates against the original album
+        and artist, and verifies them concurrently; the first level to verify an
+        album wins and the others are cancelled. Identifiers in exclude (e.g. the
+        strict query's candidates) and those another level already picked up are
+        not verified again. The result's "query_level" names the winning level.
+        """
+        tried = set(exclude)
+        
+        async def search_level(level: str, query: str) -> Optional[Dict]:
+            limit = max(self.max_results, self.scrape_page_size) if level == 'artist' else self.max_results
+            albums = await self._search_query(session, query, limit)
+            if isinstance(albums, FetchError):
+                return None
+            candidates = [album for album in self.rank_candidates(albums, album_name, artist_name, year, top_n)
+                          if album['identifier'] not in tried]
+            tried.update(album['identifier'] for album in candidates)
+            result = await self.verify_candidates(session, candidates, mode, concurrency, rank_by)
+            if result:
+                result["query_level"] = level
+            return result
         
-        # Fallback to Google search
+        tasks = [asyncio.create_task(search_level(level, query))
+                 for level, query in self.build_relaxed_queries(album_name, artist_name, year)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result:
+                    self.query_level_stats[result["query_level"]] += 1
+                    return result
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _google_fallback(self, album_name: str, artist_name: Optional[str] = None) -> Dict:
+        self.query_level_stats['google_fallback'] += 1
+        return {"google_fallback": self.google_fallback_url(album_name, artist_name)}
+    
+    @traced
+    async def advanced_search(self, album_name: str, artist_name: Optional[str] = None,
+                              mode: Optional[str] = None, top_n: Optional[int] = None,
+                              concurrency: Optional[int] = None, rank_by: Optional[str] = None,
+                              year: Optional[int] = None,
+                              albums: Optional[Union[List[Dict], FetchError]] = None) -> Dict:
+        """Advanced search with FLAC verification.
+        
+        Candidates are scored locally first (see rank_candidates); the optional
+        release year improves that ranking. Pass albums (e.g. from search_many)
+        to skip the search request. If no candidate verifies, the relaxed queries
+        are raced (see search_relaxed, ARCHIVE_RELAXED_SEARCH). Returns the verified
+        album with the "query_level" that found it, a Google fallback link as the
+        last resort, or {"error": {...}} if the search request itself failed (see
+        FetchError).
+        """
+        if top_n is None:
+            top_n = self.verify_top_n
+            
+        async with self.session_context() as session:
+            if albums is None:
+                albums = await self._search(session, album_name, artist_name)
+            if isinstance(albums, FetchError):
+                return {"error": albums.to_dict()}
+            candidates = self.rank_candidates(albums, album_name, artist_name, year, top_n)
+            
+            result = await self.verify_candidates(session, candidates, mode, concurrency, rank_by)
+            if result:
+                self.query_level_stats['strict'] += 1
+                result["query_level"] = "strict"
+                return result
+            
+            if self.relaxed_search:
+                result = await self.search_relaxed(session, album_name, artist_name, year,
+                                                   [album['identifier'] for album in candidates],
+                                                   mode, top_n, concurrency, rank_by)
+                if result:
+                    return result
+        
+        return self._google_fallback(album_name, artist_name)
+    
+    async def iter_advanced_search(self, album_name: str, artist_name: Optional[str] = None,
+                                   top_n: Optional[int] = None, concurrency: Optional[int] = None,
+                                   year: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Advanced search that yields results as they become available.
+        
+        Yields {"candidates": [...]} once the search returns (or {"error": {...}}
+        if it failed), then every candidate's verification result as it finishes
+        (see iter_verified). If none verified, it yields {"relaxing": [levels]}
+        and the relaxed cascade's result (with its "query_level"), and finally
+        {"google_fallback": url} if that found nothing either.
+        """
+        if top_n is None:
+            top_n = self.verify_top_n
+        
+        found = False
+        async with self.session_context() as session:
+            albums = await self._search(session, album_name, artist_name)
+            if isinstance(albums, FetchError):
+                yield {"error": albums.to_dict()}
+                return
+            candidates = self.rank_candidates(albums, album_name, artist_name, year, top_n)
+            yield {"candidates": candidates}
+            
+            async for result in self.iter_verified(session, candidates, concurrency):
+                if result["flacs"]:
+                    if not found:
+                        self.query_level_stats['strict'] += 1
+                    found = True
+                    result["query_level"] = "strict"
+                yield result
+            
+            if not found and self.relaxed_search:
+                yield {"relaxing": [level for level, _ in self.build_relaxed_queries(album_name, artist_name, year)]}
+                result = await self.search_relaxed(session, album_name, artist_name, year,
+                                                   [album['identifier'] for album in candidates],
+                                                   'first', top_n, concurrency)
+                if result:
+                    found = True
+                    yield result
+        
+        if not found:
+            yield self._google_fallback(album_name, artist_name)
+    
+    def google_fallback_url(self, album_name: str, artist_name: Optional[str] = None) -> str:
+        """Google search URL for an album that could not be verified on Archive.org."""
         google_query = f'"{album_name}" internet archive flac'
         if artist_name:
             google_query = f'"{album_name}" "{artist_name}" internet archive flac'
-        google_url = self.google_search_url + urllib.parse.quote(google_query)
-        return {"google_fallback": google_url}
+        return self.google_search_url + urllib.parse.quote(google_query)
     
-    def session_context(self):
-        """Create an aiohttp session context manager."""
-        return aiohttp.ClientSession()
+    @contextlib.asynccontextmanager
+    async def session_context(self):
+        """Yield the shared session if open, otherwise a temporary pooled session."""
+        if self.is_open:
+            yield self._session
+        else:
+            async with self._create_session() as session:
+                yield session
 
 
 async def main_scraper(album_name: str, artist_name: Optional[str] = None):
     """Main scraper function for backward compatibility."""
-    scraper = ArchiveScraper()
-    return await scraper.search_albums(album_name, artist_name)
+    async with ArchiveScraper() as scraper:
+        return await scraper.search_albums(album_name, artist_name)
 
 
-async def advanced_search(album_name: str, artist_name: Optional[str] = None):
+async def advanced_search(album_name: str, artist_name: Optional[str] = None, **kwargs):
     """Advanced search function for backward compatibility."""
-    scraper = ArchiveScraper()
-    return await scraper.advanced_search(album_name, artist_name)
+    async with ArchiveScraper() as scraper:
+        return await scraper.advanced_search(album_name, artist_name, **kwargs)
+
+
+def print_albums(results: List[Dict]) -> None:
+    """Print album search results."""
+    if not results:
+        print("❌ No results found.")
+        return
+    
+    for i, album_info in enumerate(results, 1):
+        print(f"\n#{i} 🗂️ {album_info['title']} by {album_info['artist']} ({album_info['year']})")
+        print(f"   📊 Downloads: {album_info['downloads']}")
+        print(f"   💾 Size: {album_info['size'] // (1024*1024)} MB")
+        print(f"   🔗 Archive Link: {album_info['url']}")
 
 
 def main():
-    """Main function for command-line usage."""
-    scraper = ArchiveScraper()
+    """Main function for command-line usage.
+    
+    With --ndjson (and --advanced to verify), queries are read from stdin - one
+    "album<TAB>artist" or JSON object per line - and results are written to
+    stdout as JSON records as soon as each one resolves.
+    """
+    if '--ndjson' in sys.argv[1:]:
+        from src.pipeline.stream import print_counts, read_lines, records_to, stream_albums
+        
+        with records_to() as out:
+            counts = asyncio.run(stream_albums(ArchiveScraper(), read_lines(sys.stdin), out,
+                                               advanced='--advanced' in sys.argv[1:]))
+        print_counts(counts)
+        return
     
     artist = input("Enter artist name (or leave blank): ").strip() or None
     album = input("Enter album name: ").strip()
@@ -190,17 +1224,10 @@ def main():
     print(f"\n🔍 Searching for album: {album} by {artist or 'any artist'}")
     
     async def run_search():
-        results = await scraper.search_albums(album, artist)
-        
-        if not results:
-            print("❌ No results found.")
-            return
+        async with ArchiveScraper() as scraper:
+            results = await scraper.search_albums(album, artist)
         
-        for i, album_info in enumerate(results, 1):
-            print(f"\n#{i} 🗂️ {album_info['title']} by {album_info['artist']} ({album_info['year']})")
-            print(f"   📊 Downloads: {album_info['downloads']}")
-            print(f"   💾 Size: {album_info['size'] // (1024*1024)} MB")
-            print(f"   🔗 Archive Link: {album_info['url']}")
+        print_albums(results)
     
     asyncio.run(run_search())
 
@@ -0,0 +1,75 @@
+"""
+Single-flight coalescing of identical in-flight Archive.org requests.
+"""
+import asyncio
+import weakref
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import sys
+import os
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key.
+
+    The first caller (the leader) starts the call as a task; callers arriving
+    before it finishes await the same task instead of issuing their own request.
+    Results are shared as-is, so callers must not mutate them. The call is only
+    cancelled once every caller waiting on it has been cancelled.
+
+    Futures are bound to an event loop, so in-flight calls are tracked per loop.
+    """
+
+    def __init__(self):
+        self._flights: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]' = weakref.WeakKeyDictionary()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {'requests': 0, 'coalesced': 0})
+
+    async def do(self, kind: str, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of call(), shared with concurrent callers of the same (kind, key)."""
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        flight_key = (kind, key)
+        flight: Optional[Tuple[asyncio.Task, list]] = flights.get(flight_key)
+        if flight is None:
+            task = asyncio.ensure_future(call())
+            flight = (task, [0])
+            flights[flight_key] = flight
+            task.add_done_callback(lambda _: flights.pop(flight_key, None))
+            self._stats[kind]['requests'] += 1
+        else:
+            self._stats[kind]['coalesced'] += 1
+
+        task, waiters = flight
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if waiters[0] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def in_flight(self) -> int:
+        """Number of calls currently in flight on the running loop."""
+        return len(self._flights.get(asyncio.get_running_loop(), {}))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-kind counts of calls issued and callers that joined one already in flight."""
+        return {kind: dict(stats) for kind, stats in self._stats.items()}
+
+
+_shared: Optional[SingleFlight] = None
+
+
+def create_single_flight(enabled: Optional[bool] = None) -> Optional[SingleFlight]:
+    """The process-wide SingleFlight, or None when coalescing is disabled."""
+    global _shared
+    if not (Config.ARCHIVE_SINGLE_FLIGHT if enabled is None else enabled):
+        return None
+    if _shared is None:
+        _shared = SingleFlight()
+    return _shared
@@ -0,0 +1,124 @@
+"""
+Incremental JSON parsing for large Archive.org metadata responses.
+"""
+import codecs
+import json
+import re
+from typing import AsyncIterator, Callable, Dict, Optional
+
+# Characters that change parser state outside of strings
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_WHITESPACE = ' \t\r\n'
+
+
+class _Buffer:
+    """Decoded text buffer fed from an async byte stream."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self.chunks = chunks.__aiter__()
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    async def fill(self) -> bool:
+        """Append the next chunk; returns False at end of stream."""
+        if self.eof:
+            return False
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            self.text = self.text[self.pos:] + self.decoder.decode(b'', final=True)
+            self.pos = 0
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer stays bounded
+        self.text = self.text[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    async def next_char(self) -> Optional[str]:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not await self.fill():
+                return None
+
+
+async def _find_top_level_key(buffer: _Buffer, key: str) -> bool:
+    """Advance the buffer to just after ``"key":`` in the top-level object."""
+    depth = 0
+    while True:
+        match = _STRUCTURAL.search(buffer.text, buffer.pos)
+        if match is None:
+            buffer.pos = len(buffer.text)
+            if not await buffer.fill():
+                return False
+            continue
+        char = match.group()
+        buffer.pos = match.start()
+        if char == '"':
+            # Decode the whole string so escapes and brackets inside it are skipped
+            while True:
+                try:
+                    value, end = json.decoder.scanstring(buffer.text, buffer.pos + 1)
+                    break
+                except ValueError:
+                    if not await buffer.fill():
+                        return False
+            buffer.pos = end
+            if depth == 1 and value == key:
+                if await buffer.next_char() == ':':
+                    buffer.pos += 1
+                    return True
+            continue
+        buffer.pos += 1
+        depth += 1 if char in '{[' else -1
+        if depth <= 0 and char in '}]':
+            return False
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes], key: Optional[str],
+                          predicate: Optional[Callable[[Dict], bool]] = None) -> AsyncIterator[Dict]:
+    """Yield the items of the top-level array ``key`` from a streamed JSON object.
+
+    ``key`` may be a dotted path into nested objects (``response.docs``), or
+    None when the document itself is the array. Only one item is decoded at a
+    time, items failing predicate are dropped immediately, and reading stops
+    as soon as the array closes, so the rest of the document is never
+    downloaded or parsed. Items are expected to be objects (as in
+    Archive.org's ``files`` list). Raises ValueError on malformed input.
+    """
+    name = key or 'top-level'
+    buffer = _Buffer(chunks)
+    for part in (key.split('.') if key else []):
+        if not await _find_top_level_key(buffer, part):
+            return
+    if await buffer.next_char() != '[':
+        raise ValueError(f"'{name}' is not an array")
+    buffer.pos += 1
+
+    decoder = json.JSONDecoder()
+    while True:
+        char = await buffer.next_char()
+        if char is None:
+            raise ValueError(f"Unterminated '{name}' array")
+        if char == ']':
+            return
+        if char == ',':
+            buffer.pos += 1
+            continue
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer.text, buffer.pos)
+                break
+            except ValueError:
+                # Most likely the item is split across chunks; read more and retry
+                if not await buffer.fill():
+                    raise
+        buffer.pos = end
+        if predicate is None or predicate(item):
+            yield item
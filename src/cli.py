@@ -0,0 +1,289 @@
+"""
+Unified command line for Stremtify: python stremtify.py <command> [options]
+
+Only argparse is imported up front. Each command is a loader that imports what
+the command needs (and loads settings) when it runs, so a quick archive lookup
+never pays for spotipy or streamlit.
+"""
+import argparse
+import os
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Set to stop after a command's imports: benchmarks/bench_startup.py times this
+STARTUP_ONLY_ENV = 'STREMTIFY_STARTUP_ONLY'
+
+Handler = Callable[[argparse.Namespace], Optional[int]]
+
+
+def load_settings():
+    """Load .env (when python-dotenv is installed) and return the Config class.
+
+    Config reads the environment when it is first imported, so this runs
+    before any command imports a module that uses it.
+    """
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv(os.path.join(os.getcwd(), '.env'))
+    from config.settings import Config
+    return Config
+
+
+# Album, query or URL argument that reads one value per line from stdin instead
+STDIN_ARG = '-'
+
+
+def _print_verified(torrent: Optional[str], flacs: List[str]) -> None:
+    if torrent:
+        print(f"🧲 Torrent: {torrent}")
+    if not flacs:
+        print("❌ No valid FLAC files found.")
+        return
+    print(f"✅ {len(flacs)} valid FLAC files:")
+    for url in flacs:
+        print(f"   🎵 {url}")
+
+
+# Command loaders: import dependencies, return the function that runs the command
+
+
+def load_search() -> Handler:
+    load_settings()
+    import asyncio
+    from src.archive.scraper import ArchiveScraper, print_albums
+
+    def run(args: argparse.Namespace) -> Optional[int]:
+        if args.ndjson or args.album == STDIN_ARG:
+            return stream(args)
+        
+        async def search():
+            async with ArchiveScraper() as scraper:
+                if args.advanced:
+                    return await scraper.advanced_search(args.album, args.artist)
+                return await scraper.search_albums(args.album, args.artist)
+
+        print(f"🔍 Searching for album: {args.album} by {args.artist or 'any artist'}")
+        result = asyncio.run(search())
+        if not args.advanced:
+            print_albums(result)
+            return 0 if result else 1
+        if 'verified_album' in result:
+            album_info = result['verified_album']
+            print(f"\n🗂️ {album_info['title']} by {album_info['artist']} ({album_info['year']})")
+            print(f"   🔗 Archive Link: {album_info['url']}")
+            if result.get('query_level', 'strict') != 'strict':
+                print(f"   🪜 Found with a relaxed query ({result['query_level']})")
+            _print_verified(result['torrent'], result['flacs'])
+            return 0
+        if 'error' in result:
+            print(f"❌ Archive.org request failed: {result['error']['reason']}")
+        elif 'google_fallback' in result:
+            print(f"❌ No verified FLAC album found. Try: {result['google_fallback']}")
+        return 1
+    
+    def stream(args: argparse.Namespace) -> int:
+        import json
+        from src.pipeline.stream import print_counts, read_lines, records_to, stream_albums
+        
+        async def single_query():
+            yield json.dumps({'album': args.album, 'artist': args.artist})
+        
+        lines = read_lines(sys.stdin) if args.album == STDIN_ARG else single_query()
+        with records_to() as out:
+            counts = asyncio.run(stream_albums(ArchiveScraper(), lines, out, args.advanced, args.concurrency))
+        print_counts(counts)
+        return 0 if counts['records'] > counts['errors'] else 1
+    return run
+
+
+def load_verify() -> Handler:
+    load_settings()
+    import asyncio
+    from src.archive.scraper import ArchiveScraper
+
+    def run(args: argparse.Namespace) -> Optional[int]:
+        async def verify():
+            async with ArchiveScraper() as scraper:
+                async with scraper.session_context() as session:
+                    return await scraper.get_verified_flac_files(session, args.identifier, args.strategy)
+
+        async def match():
+            async with ArchiveScraper() as scraper:
+                async with scraper.session_context() as session:
+                    return await scraper.match_tracks(session, args.identifier,
+                                                      [{'title': title} for title in args.track])
+
+        if args.track:
+            matched = asyncio.run(match())
+            if 'error' in matched:
+                print(f"❌ Archive.org request failed: {matched['error']['reason']}")
+                return 1
+            for found in matched['matches']:
+                print(f"🎯 {found['track']['title']} -> {found['url']} ({found['score']})")
+            for track in matched['unmatched']:
+                print(f"❌ No file matches {track['title']}")
+            print(f"📦 Read {matched['bytes'] / 1024:.1f} KiB of tags from {matched['files_read']} files "
+                  f"(album: {matched['album_bytes'] / (1024 * 1024):.1f} MiB)")
+            return 0 if matched['matches'] else 1
+
+        torrent, flacs = asyncio.run(verify())
+        _print_verified(torrent, flacs)
+        return 0 if flacs else 1
+    return run
+
+
+def load_playlist() -> Handler:
+    load_settings()
+    from src.spotify.playlist_parser import SpotifyPlaylistParser
+
+    def run(args: argparse.Namespace) -> Optional[int]:
+        parser = SpotifyPlaylistParser()
+        if args.ndjson or args.url == STDIN_ARG:
+            from src.pipeline.stream import print_counts, records_to, stream_tracks
+            
+            urls = sys.stdin if args.url == STDIN_ARG else [args.url]
+            with records_to() as out:
+                counts = stream_tracks(parser, urls, out, args.sync)
+            print_counts(counts)
+            return 1 if counts['errors'] else 0
+        if not args.sync:
+            parser.print_tracklist(parser.get_playlist_tracks(args.url))
+            return 0
+        sync = parser.sync_playlist(args.url)
+        if not sync['changed']:
+            print(f"✅ Unchanged since last sync ({len(sync['tracks'])} tracks)")
+            return 0
+        print(f"🔄 {len(sync['added'])} added, {len(sync['removed'])} removed")
+        parser.print_tracklist(sync['added'])
+        return 0
+    return run
+
+
+def load_resolve() -> Handler:
+    load_settings()
+    import asyncio
+    from src.spotify.playlist_parser import SpotifyPlaylistParser
+    from src.pipeline.batch_resolver import BatchResolver, print_summary
+
+    def run(args: argparse.Namespace) -> Optional[int]:
+        if args.workers and args.tracks:
+            raise ValueError("--tracks is not supported with --workers")
+        if args.workers:
+            from src.pipeline.coordinator import Coordinator
+
+            coordinator = Coordinator(processes=args.workers)
+            added = coordinator.enqueue_playlists(args.urls)
+            print(f"📥 Queued {sum(added.values())} new albums from {len(added)} playlists")
+            summary = coordinator.run()
+            print_summary(summary)
+            print(f"📄 {coordinator.collect(args.output)} results written to {args.output}")
+            return 0
+
+        parser = SpotifyPlaylistParser()
+        tracks = [track for url in args.urls for track in parser.get_playlist_tracks(url)]
+        summary = asyncio.run(BatchResolver(track_mode=args.tracks or None).resolve_tracks(tracks, args.output))
+        print_summary(summary)
+        print(f"📄 Results written to {args.output}")
+        return 0
+    return run
+
+
+def load_proxy() -> Handler:
+    load_settings()
+    import asyncio
+    from src.archive.proxy import StreamProxy
+
+    def run(args: argparse.Namespace) -> Optional[int]:
+        try:
+            asyncio.run(StreamProxy(host=args.host, port=args.port).serve_forever(args.identifiers))
+        except KeyboardInterrupt:
+            print("\n👋 Streaming proxy stopped.")
+        return 0
+    return run
+
+
+def load_ui() -> Handler:
+    import subprocess
+
+    def run(args: argparse.Namespace) -> Optional[int]:
+        app_path = os.path.join(PROJECT_ROOT, 'src', 'ui', 'streamlit_app.py')
+        print(f"🚀 Starting Streamlit app: {app_path}")
+        try:
+            return subprocess.run([sys.executable, '-m', 'streamlit', 'run', app_path, *args.streamlit_args]).returncode
+        except KeyboardInterrupt:
+            print("\n👋 Streamlit app stopped.")
+            return 0
+    return run
+
+
+# name: (loader, help, argument definitions as (flags, kwargs))
+COMMANDS: Dict[str, Tuple[Callable[[], Handler], str, List[Tuple[Tuple[str, ...], Dict]]]] = {
+    'search': (load_search, "Search Archive.org for a FLAC album", [
+        (('album',), {'help': "Album name, or - to read \"album<TAB>artist\" or JSON queries from stdin"}),
+        (('--artist',), {'default': None}),
+        (('--advanced',), {'action': 'store_true', 'help': "Rank and verify candidates"}),
+        (('--ndjson',), {'action': 'store_true', 'help': "Stream one JSON record per line (implied by -)"}),
+        (('--concurrency',), {'type': int, 'default': None, 'help': "Queries in flight when streaming"}),
+    ]),
+    'verify': (load_verify, "Verify the FLAC files of an Archive.org item", [
+        (('identifier',), {}),
+        (('--strategy',), {'choices': ['none', 'sample', 'header', 'full'], 'default': None}),
+        (('--track',), {'action': 'append', 'default': [], 'metavar': 'TITLE',
+                        'help': "Only the files matching this track title (repeatable)"}),
+    ]),
+    'playlist': (load_playlist, "Print the tracks of a Spotify playlist", [
+        (('url',), {'help': "Playlist URL, or - to read URLs from stdin"}),
+        (('--sync',), {'action': 'store_true', 'help': "Only show changes since the last sync"}),
+        (('--ndjson',), {'action': 'store_true', 'help': "Stream one JSON record per track (implied by -)"}),
+    ]),
+    'resolve': (load_resolve, "Resolve every album of Spotify playlists to verified FLACs", [
+        (('urls',), {'nargs': '+', 'metavar': 'url'}),
+        (('--output',), {'default': 'resolved_albums.jsonl'}),
+        (('--workers',), {'type': int, 'default': 0, 'help': "Use the job queue with N worker processes"}),
+        (('--tracks',), {'action': 'store_true', 'help': "Keep only the files matching playlist tracks"}),
+    ]),
+    'proxy': (load_proxy, "Stream verified FLAC files locally with seeking and a chunk cache", [
+        (('identifiers',), {'nargs': '*', 'metavar': 'identifier', 'help': "Items to print playlist URLs for"}),
+        (('--host',), {'default': None}),
+        (('--port',), {'type': int, 'default': None}),
+    ]),
+    'ui': (load_ui, "Start the Streamlit web interface", [
+        (('streamlit_args',), {'nargs': argparse.REMAINDER, 'help': "Passed on to streamlit run"}),
+    ]),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='stremtify', description="Find FLAC albums on Archive.org")
+    subparsers = parser.add_subparsers(dest='command', metavar='command', required=True)
+    for name, (_, help_text, arguments) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        for flags, kwargs in arguments:
+            subparser.add_argument(*flags, **kwargs)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Parse arguments, import the chosen command and run it."""
+    args = build_parser().parse_args(argv)
+    handler = COMMANDS[args.command][0]()
+    if os.getenv(STARTUP_ONLY_ENV):
+        return 0
+    try:
+        return handler(args) or 0
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
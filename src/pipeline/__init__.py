@@ -0,0 +1,3 @@
+"""
+Batch resolution pipelines.
+"""
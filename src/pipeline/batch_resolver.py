@@ -0,0 +1,248 @@
+"""
+Playlist-to-FLAC batch resolver - resolves every album of a playlist on Archive.org.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+import sys
+
+from tqdm import tqdm
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+from src.archive.scheduler import FetchError
+from src.archive.scraper import ArchiveScraper
+
+
+def album_key(album: str, artist: str) -> str:
+    """Case-insensitive key identifying an (album, artist) pair."""
+    return f"{album.strip().lower()}\x1f{artist.strip().lower()}"
+
+
+def unique_albums(tracks: Iterable[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """Deduplicate a track list to unique (album, artist) pairs, keeping first-seen order.
+
+    The album artist is preferred over the track artist so features and
+    compilations collapse to a single lookup.
+    """
+    seen: Set[str] = set()
+    pairs = []
+    for track in tracks:
+        album = (track.get('album') or '').strip()
+        if not album:
+            continue
+        artist = (track.get('album_artist') or track.get('artist') or '').strip()
+        key = album_key(album, artist)
+        if key not in seen:
+            seen.add(key)
+            pairs.append((album, artist))
+    return pairs
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Return the keys of albums already resolved in a previous run's output file."""
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A partially written last line from an interrupted run
+                continue
+            done.add(album_key(record.get('album', ''), record.get('artist', '')))
+    return done
+
+
+class BatchResolver:
+    """Resolves (album, artist) pairs to verified FLACs with bounded concurrency.
+
+    Results are appended to a JSON Lines file as they finish. The same file is
+    the checkpoint: rerunning with the same output path skips albums it already
+    contains. With ARCHIVE_BATCH_SEARCH the searches for all pending albums
+    are sent up front as batched queries (see ArchiveScraper.search_many).
+    In track mode, resolve_tracks keeps each album's playlist tracks and a
+    verified album's FLACs are narrowed to the files matching them (see
+    ArchiveScraper.match_tracks).
+    """
+
+    def __init__(self, scraper: Optional[ArchiveScraper] = None, concurrency: Optional[int] = None,
+                 batch_search: Optional[bool] = None, track_mode: Optional[bool] = None):
+        """Initialize the resolver."""
+        self.scraper = scraper or ArchiveScraper()
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+        self.batch_search = Config.ARCHIVE_BATCH_SEARCH if batch_search is None else batch_search
+        self.track_mode = Config.BATCH_TRACK_MODE if track_mode is None else track_mode
+        # album_key -> the playlist tracks of that album, for track mode
+        self.album_tracks: Dict[str, List[Dict]] = {}
+
+    async def resolve_pair(self, album: str, artist: str,
+                           albums: Optional[Union[List[Dict], FetchError]] = None) -> Dict:
+        """Resolve one album and return its output record.
+
+        albums are its pre-fetched search results, if any.
+        """
+        result = await self.scraper.advanced_search(album, artist or None, albums=albums)
+        record = {'album': album, 'artist': artist}
+        if 'verified_album' in result:
+            record['status'] = 'verified'
+        elif 'error' in result:
+            record['status'] = 'retry' if result['error']['transient'] else 'failed'
+        else:
+            record['status'] = 'not_found'
+        record.update(result)
+        tracks = self.album_tracks.get(album_key(album, artist))
+        if self.track_mode and tracks and record['status'] == 'verified':
+            await self._match_tracks(record, tracks)
+        return record
+
+    async def _match_tracks(self, record: Dict, tracks: List[Dict]) -> None:
+        """Narrow a verified record's flacs to the files matching its playlist tracks."""
+        async with self.scraper.session_context() as session:
+            matched = await self.scraper.match_tracks(session, record['verified_album']['identifier'], tracks)
+        if 'error' in matched:
+            # Keep the whole album rather than nothing
+            record['track_error'] = matched['error']
+            return
+        record['flacs'] = [match['url'] for match in matched['matches']]
+        record['tracks'] = [{'title': match['track'].get('title'), 'url': match['url'], 'score': match['score']}
+                            for match in matched['matches']]
+        record['unmatched_tracks'] = [track.get('title') for track in matched['unmatched']]
+        record['track_bytes'] = matched['bytes']
+        record['album_bytes'] = matched['album_bytes']
+
+    async def resolve(self, pairs: List[Tuple[str, str]], output_path: str,
+                      show_progress: bool = True) -> Dict:
+        """Resolve all pairs not yet in output_path, streaming records to it.
+
+        Returns a summary with counts, elapsed time and albums per minute.
+        Albums that hit a transient failure (throttling, outages) or raise an
+        unexpected error are not written, so a rerun retries them.
+        """
+        done = load_checkpoint(output_path)
+        pending = [(album, artist) for album, artist in pairs if album_key(album, artist) not in done]
+        summary = {
+            'total': len(pairs),
+            'skipped': len(pairs) - len(pending),
+            'verified': 0,
+            'not_found': 0,
+            'failed': 0,
+            'errors': 0,
+        }
+
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        progress = tqdm(total=len(pending), unit='album', disable=not show_progress)
+        start = time.perf_counter()
+
+        searches: Dict = {}
+        coalesced_before = self._coalesced()
+        negative_before = self.scraper.negative_stats['hits']
+        tracks_before = dict(self.scraper.track_match_stats)
+
+        async def worker(album: str, artist: str) -> None:
+            async with semaphore:
+                try:
+                    record = await self.resolve_pair(album, artist, searches.get((album, artist or None)))
+                except Exception as e:
+                    summary['errors'] += 1
+                    progress.write(f"⚠️ Failed to resolve {album} by {artist or 'any artist'}: {e}")
+                    return
+                finally:
+                    progress.update(1)
+            if record['status'] == 'retry':
+                summary['errors'] += 1
+                progress.write(f"⚠️ Failed to resolve {album} by {artist or 'any artist'}: "
+                               f"{record['error']['reason']}")
+                return
+            summary[record['status']] += 1
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        with open(output_path, 'a', encoding='utf-8') as out:
+            async with contextlib.AsyncExitStack() as stack:
+                # Reuse the caller's pooled session if the scraper is already open
+                if not self.scraper.is_open:
+                    await stack.enter_async_context(self.scraper)
+                if self.batch_search and pending:
+                    batches_before = self.scraper.batch_stats['batches']
+                    searches.update(await self.scraper.search_many(pending))
+                    progress.write(f"🔎 Searched {len(pending)} albums with "
+                                   f"{self.scraper.batch_stats['batches'] - batches_before} batched requests")
+                await asyncio.gather(*(worker(album, artist) for album, artist in pending))
+        progress.close()
+
+        elapsed = time.perf_counter() - start
+        resolved = summary['verified'] + summary['not_found'] + summary['failed']
+        summary['coalesced'] = self._coalesced() - coalesced_before
+        summary['negative_hits'] = self.scraper.negative_stats['hits'] - negative_before
+        if self.track_mode:
+            summary['tracks'] = {key: value - tracks_before[key]
+                                 for key, value in self.scraper.track_match_stats.items()}
+        summary['elapsed_seconds'] = round(elapsed, 2)
+        summary['albums_per_minute'] = round(resolved / elapsed * 60, 2) if elapsed > 0 else 0.0
+        return summary
+
+    def _coalesced(self) -> int:
+        """Duplicate requests served by an identical one already in flight, so far."""
+        return sum(stats['coalesced'] for stats in self.scraper.coalescing_stats().values())
+
+    async def resolve_tracks(self, tracks: Iterable[Dict[str, str]], output_path: str,
+                             show_progress: bool = True) -> Dict:
+        """Deduplicate a track list and resolve its albums (matching the tracks in track mode)."""
+        tracks = list(tracks)
+        if self.track_mode:
+            for track in tracks:
+                artist = (track.get('album_artist') or track.get('artist') or '').strip()
+                key = album_key((track.get('album') or '').strip(), artist)
+                self.album_tracks.setdefault(key, []).append(track)
+        return await self.resolve(unique_albums(tracks), output_path, show_progress)
+
+
+def print_summary(summary: Dict) -> None:
+    """Print a batch run summary."""
+    print(f"\n📦 Albums: {summary['total']} ({summary['skipped']} already resolved)")
+    print(f"✅ Verified: {summary['verified']}")
+    print(f"❌ Not found: {summary['not_found']}")
+    if summary['failed']:
+        print(f"🚫 Failed: {summary['failed']}")
+    if summary['errors']:
+        print(f"⚠️ Errors: {summary['errors']} (rerun to retry)")
+    if summary.get('coalesced'):
+        print(f"🔗 Coalesced requests: {summary['coalesced']}")
+    if summary.get('negative_hits'):
+        print(f"🕳️ Known misses skipped: {summary['negative_hits']}")
+    tracks = summary.get('tracks')
+    if tracks and tracks['tracks']:
+        per_match = f", {tracks['bytes'] / tracks['matched'] / 1024:.1f} KiB read per match" if tracks['matched'] else ''
+        print(f"🎯 Matched tracks: {tracks['matched']}/{tracks['tracks']}{per_match}")
+    print(f"⏱️ {summary['elapsed_seconds']}s - {summary['albums_per_minute']} albums/min")
+
+
+def main():
+    """Main function for command-line usage."""
+    from src.spotify.playlist_parser import SpotifyPlaylistParser
+
+    playlist_url = input("🎧 Paste your Spotify playlist URL: ").strip()
+    output_path = input("💾 Output file [resolved_albums.jsonl]: ").strip() or 'resolved_albums.jsonl'
+
+    try:
+        tracks = SpotifyPlaylistParser().get_playlist_tracks(playlist_url)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    resolver = BatchResolver()
+    summary = asyncio.run(resolver.resolve_tracks(tracks, output_path))
+    print_summary(summary)
+    print(f"📄 Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Job-queue coordinator - enqueues playlist albums, runs worker processes and collects results.
+"""
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+import sys
+
+from tqdm import tqdm
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+from src.archive.scraper import ArchiveScraper
+from src.pipeline.batch_resolver import print_summary, unique_albums
+from src.pipeline.job_queue import JobQueue
+from src.pipeline.worker import default_processes, start_worker, start_workers
+
+
+class Coordinator:
+    """Feeds a JobQueue from Spotify playlists and supervises worker processes.
+
+    Workers that exit while jobs remain (e.g. after a crash) are replaced; the
+    jobs they held are leased again once their leases expire.
+    """
+
+    def __init__(self, queue_path: Optional[str] = None, processes: Optional[int] = None,
+                 scraper_factory: Optional[Callable[[int], ArchiveScraper]] = None):
+        """Open the queue; processes defaults to JOB_WORKERS (one per core when 0)."""
+        self.queue_path = queue_path or Config.JOB_QUEUE_PATH
+        self.queue = JobQueue(self.queue_path)
+        self.processes = processes or default_processes()
+        self.scraper_factory = scraper_factory
+        self.restarts = 0
+
+    def enqueue_tracks(self, tracks: Iterable[Dict[str, str]]) -> int:
+        """Queue the unique albums of a track list; return how many were new."""
+        return self.queue.enqueue(unique_albums(tracks))
+
+    def enqueue_playlists(self, playlist_urls: List[str]) -> Dict[str, int]:
+        """Queue the albums of each playlist and return the new job count per URL."""
+        from src.spotify.playlist_parser import SpotifyPlaylistParser
+
+        parser = SpotifyPlaylistParser()
+        return {url: self.enqueue_tracks(parser.get_playlist_tracks(url)) for url in playlist_urls}
+
+    def run(self, show_progress: bool = True) -> Dict:
+        """Run workers until the queue is drained and return a batch-style summary."""
+        counts = self.queue.counts()
+        total = sum(counts.values())
+        finished = counts['done'] + counts['failed']
+        start = time.perf_counter()
+        progress = tqdm(total=total, initial=finished, unit='album', disable=not show_progress)
+
+        workers = start_workers(self.processes, self.queue_path, scraper_factory=self.scraper_factory)
+        try:
+            while not self.queue.is_drained():
+                time.sleep(Config.JOB_POLL_INTERVAL)
+                counts = self.queue.counts()
+                progress.update(counts['done'] + counts['failed'] - progress.n)
+                for i, worker in enumerate(workers):
+                    if not worker.is_alive() and not self.queue.is_drained():
+                        progress.write(f"⚠️ Worker {worker.pid} exited with code {worker.exitcode}; restarting")
+                        workers[i] = start_worker(self.queue_path, self.processes,
+                                                  scraper_factory=self.scraper_factory)
+                        self.restarts += 1
+            for worker in workers:
+                worker.join()
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+            progress.close()
+
+        elapsed = time.perf_counter() - start
+        summary = {'total': total, 'skipped': finished, 'verified': 0, 'not_found': 0, 'failed': 0, 'errors': 0}
+        for record in self.queue.results():
+            summary[record['status']] += 1
+        resolved = summary['verified'] + summary['not_found'] + summary['failed'] - finished
+        summary['restarts'] = self.restarts
+        summary['elapsed_seconds'] = round(elapsed, 2)
+        summary['albums_per_minute'] = round(resolved / elapsed * 60, 2) if elapsed > 0 else 0.0
+        return summary
+
+    def collect(self, output_path: str) -> int:
+        """Write every finished job's record to a JSON Lines file; return the count."""
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        count = 0
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for record in self.queue.results():
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+        return count
+
+
+def main():
+    """Main function for command-line usage."""
+    print("🎧 Paste Spotify playlist URLs, one per line (empty line to finish):")
+    playlist_urls = []
+    while True:
+        url = input().strip()
+        if not url:
+            break
+        playlist_urls.append(url)
+    output_path = input("💾 Output file [resolved_albums.jsonl]: ").strip() or 'resolved_albums.jsonl'
+
+    coordinator = Coordinator()
+    try:
+        added = coordinator.enqueue_playlists(playlist_urls)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"📥 Queued {sum(added.values())} new albums from {len(added)} playlists")
+
+    print(f"👷 Resolving with {coordinator.processes} worker processes")
+    summary = coordinator.run()
+    print_summary(summary)
+    print(f"📄 {coordinator.collect(output_path)} results written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
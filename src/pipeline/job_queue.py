@@ -0,0 +1,174 @@
+"""
+Durable SQLite job queue of album-resolution jobs shared by worker processes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import sys
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+from src.pipeline.batch_resolver import album_key
+
+JOB_STATUSES = ('pending', 'leased', 'done', 'failed')
+
+# Seconds a transiently failed job waits before it can be leased again
+RETRY_DELAY = 30
+
+
+class JobQueue:
+    """Album-resolution jobs in a SQLite database, leased to workers for a limited time.
+
+    Every process opens its own JobQueue on the same path. A lease expires unless
+    renewed, so jobs held by a worker that crashed are leased again by another;
+    after max_attempts leases a job is marked failed. Completed jobs keep the
+    batch resolver's output record.
+    """
+
+    def __init__(self, path: Optional[str] = None, lease_seconds: Optional[int] = None,
+                 max_attempts: Optional[int] = None):
+        """Open (or create) the queue database at path."""
+        self.path = path or Config.JOB_QUEUE_PATH
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Autocommit mode; leases take the write lock explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id INTEGER PRIMARY KEY,'
+            ' key TEXT NOT NULL UNIQUE,'
+            ' album TEXT NOT NULL,'
+            ' artist TEXT NOT NULL,'
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' available_at REAL NOT NULL DEFAULT 0,'
+            ' lease_owner TEXT,'
+            ' lease_expires REAL,'
+            ' result TEXT,'
+            ' error TEXT,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)')
+
+    @staticmethod
+    def new_worker_id() -> str:
+        """A unique lease owner name for one worker process."""
+        return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def enqueue(self, pairs: Iterable[Tuple[str, str]]) -> int:
+        """Add (album, artist) jobs, skipping albums already queued; return the number added."""
+        now = time.time()
+        rows = [(album_key(album, artist), album, artist, now) for album, artist in pairs]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO jobs (key, album, artist, updated_at) VALUES (?, ?, ?, ?)', rows
+            )
+            self._conn.execute('COMMIT')
+            return self._conn.total_changes - before
+
+    def lease(self, worker_id: str, limit: int) -> List[Dict]:
+        """Lease up to limit available jobs: pending ones and those whose lease expired."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Expired leases that used up their attempts: the worker kept crashing on them
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_owner = NULL, updated_at = ?, "
+                    " error = COALESCE(error, 'lease expired') "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                rows = self._conn.execute(
+                    "SELECT id, album, artist, attempts FROM jobs "
+                    "WHERE (status = 'pending' AND available_at <= ?) "
+                    " OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY id LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                    " lease_expires = ?, updated_at = ? WHERE id = ?",
+                    [(worker_id, now + self.lease_seconds, now, job_id) for job_id, *_ in rows]
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [{'id': job_id, 'album': album, 'artist': artist, 'attempt': attempts + 1}
+                for job_id, album, artist, attempts in rows]
+
+    def renew(self, worker_id: str, job_ids: Iterable[int]) -> None:
+        """Extend the leases worker_id still holds on job_ids."""
+        expires = time.time() + self.lease_seconds
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                [(expires, job_id, worker_id) for job_id in job_ids]
+            )
+
+    def complete(self, worker_id: str, job_id: int, record: Dict) -> bool:
+        """Store a job's output record; False if the lease was lost to another worker."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(record, ensure_ascii=False), time.time(), job_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, worker_id: str, job_id: int, error: str, retry_delay: float = RETRY_DELAY) -> None:
+        """Give a job back after a transient failure; it fails for good after max_attempts."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                " available_at = ?, error = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (self.max_attempts, now + retry_delay, error, now, job_id, worker_id)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def is_drained(self) -> bool:
+        """Whether every job is done or failed."""
+        counts = self.counts()
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+    def results(self) -> Iterator[Dict]:
+        """Output records of completed jobs, plus a 'failed' record for each failed one."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT album, artist, status, result, error FROM jobs "
+                "WHERE status IN ('done', 'failed') ORDER BY id"
+            ).fetchall()
+        for album, artist, status, result, error in rows:
+            if status == 'done':
+                yield json.loads(result)
+            else:
+                yield {'album': album, 'artist': artist, 'status': 'failed',
+                       'error': {'reason': error, 'status': None, 'transient': False}}
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,293 @@
+"""
+NDJSON streaming - one JSON record per line, written as soon as it is resolved.
+
+Records carry a "type" ('album', 'file', 'track', 'miss' or 'error') and the
+query they answer, so consumers can join results that arrive out of order.
+Queries are read line by line, so one long-lived process can serve any number
+of them from a pipe.
+"""
+import asyncio
+import contextlib
+import json
+import os
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, TextIO, Tuple
+import sys
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+
+RecordHandler = Callable[[str], AsyncIterator[Dict]]
+
+
+def write_record(out: TextIO, record: Dict) -> None:
+    """Write one record and flush it, so a reader sees it immediately."""
+    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+    out.flush()
+
+
+def parse_query(line: str) -> Dict:
+    """An album query from an input line.
+
+    A line is either a JSON object with "album" and optional "artist"/"year",
+    or plain text: the album, optionally followed by a tab and the artist.
+    Raises ValueError for lines that are neither.
+    """
+    line = line.rstrip('\r\n')
+    if line.lstrip().startswith('{'):
+        query = json.loads(line)
+        if not isinstance(query, dict) or not query.get('album'):
+            raise ValueError("Query object needs an \"album\"")
+        return {'album': query['album'], 'artist': query.get('artist') or None, 'year': query.get('year')}
+    album, _, artist = line.partition('\t')
+    if not album.strip():
+        raise ValueError("Query line has no album")
+    return {'album': album.strip(), 'artist': artist.strip() or None, 'year': None}
+
+
+async def read_lines(stream: TextIO) -> AsyncIterator[str]:
+    """Non-blank lines of a blocking text stream such as stdin.
+
+    Each line is read in a thread, so queries already in flight keep running
+    while the next one is awaited.
+    """
+    while True:
+        line = await asyncio.to_thread(stream.readline)
+        if not line:
+            return
+        if line.strip():
+            yield line
+
+
+async def stream_records(lines: AsyncIterator[str], handle: RecordHandler, out: TextIO,
+                         concurrency: Optional[int] = None) -> Dict[str, int]:
+    """Run handle on every line, at most concurrency at a time, writing each record it yields.
+
+    Lines are consumed only as slots free up, so input of any length is
+    streamed in bounded memory. A line the handler fails on (e.g. an
+    unparseable query) becomes an 'error' record instead of ending the stream.
+    Returns input, record and error counts.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or Config.BATCH_CONCURRENCY))
+    counts = {'inputs': 0, 'records': 0, 'errors': 0}
+    tasks = set()
+
+    async def run(line: str) -> None:
+        try:
+            async for record in handle(line):
+                counts['records'] += 1
+                if record['type'] == 'error':
+                    counts['errors'] += 1
+                write_record(out, record)
+        except Exception as e:
+            counts['records'] += 1
+            counts['errors'] += 1
+            write_record(out, {'type': 'error', 'input': line.strip(), 'error': {'reason': str(e)}})
+        finally:
+            semaphore.release()
+
+    try:
+        async for line in lines:
+            await semaphore.acquire()
+            counts['inputs'] += 1
+            task = asyncio.create_task(run(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return counts
+
+
+class SearchBatcher:
+    """Collects the plain searches of concurrent query lines into search_many batches.
+
+    A batch is sent once it holds the scraper's batch_size queries, or
+    FLUSH_DELAY seconds after its first query if the input runs dry before.
+    Results are the albums or the FetchError, as from search_many.
+    """
+
+    # Seconds a partial batch waits for more queries
+    FLUSH_DELAY = 0.05
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.pending: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def search(self, album: str, artist: Optional[str]):
+        """Albums for one query, sent along with the other queries pending at the time."""
+        pair = (album, artist or None)
+        future = self.pending.get(pair)
+        if future is None:
+            future = self.pending[pair] = asyncio.get_running_loop().create_future()
+            if len(self.pending) >= self.scraper.batch_size:
+                self.flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.FLUSH_DELAY, self.flush)
+        # Shielded: a cancelled line must not cancel the same query of another line
+        return await asyncio.shield(future)
+
+    def flush(self) -> None:
+        """Send the pending queries as one search_many call."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: Dict[Tuple[str, Optional[str]], asyncio.Future]) -> None:
+        try:
+            results = await self.scraper.search_many(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            # Each line waiting on the batch turns this into its 'error' record
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for pair, future in batch.items():
+            if not future.done():
+                future.set_result(results[pair])
+
+    async def close(self) -> None:
+        """Cancel the batches still in flight."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def album_records(scraper, advanced: bool = False, batcher: Optional[SearchBatcher] = None) -> RecordHandler:
+    """Handler turning a query line into album records (and file records when advanced).
+
+    A plain search yields every matching album; an advanced search yields the
+    verified album followed by one record per verified FLAC file. Queries
+    without a result yield a 'miss', failed searches an 'error'. With a
+    batcher, plain searches of concurrent lines share batched requests;
+    without one each is sent on its own and finds exactly what search_albums
+    would.
+    """
+    # Imported here so streaming playlist tracks does not load aiohttp
+    from src.archive.scheduler import FetchError, FetchFailed
+
+    async def search(album: str, artist: Optional[str]):
+        if batcher is not None:
+            return await batcher.search(album, artist)
+        try:
+            return await scraper.search_albums(album, artist, raise_on_error=True)
+        except FetchFailed as e:
+            return e.error
+
+    async def handle(line: str) -> AsyncIterator[Dict]:
+        query = parse_query(line)
+        if not advanced:
+            albums = await search(query['album'], query['artist'])
+            if isinstance(albums, FetchError):
+                yield {'type': 'error', 'query': query, 'error': albums.to_dict()}
+                return
+            for album in albums:
+                yield {'type': 'album', 'query': query, **album}
+            if not albums:
+                yield {'type': 'miss', 'query': query}
+            return
+
+        result = await scraper.advanced_search(query['album'], query['artist'], year=query['year'])
+        if 'error' in result:
+            yield {'type': 'error', 'query': query, 'error': result['error']}
+        elif 'verified_album' in result:
+            album = result['verified_album']
+            yield {'type': 'album', 'query': query, **album, 'torrent': result['torrent'],
+                   'query_level': result['query_level']}
+            for url in result['flacs']:
+                yield {'type': 'file', 'query': query, 'identifier': album['identifier'], 'url': url}
+        else:
+            yield {'type': 'miss', 'query': query, 'google_fallback': result.get('google_fallback')}
+    return handle
+
+
+async def stream_albums(scraper, lines: AsyncIterator[str], out: TextIO, advanced: bool = False,
+                        concurrency: Optional[int] = None, batch_search: Optional[bool] = None) -> Dict[str, int]:
+    """Stream album (and file) records for every query line through one open scraper.
+
+    With batch_search (ARCHIVE_BATCH_SEARCH by default), plain searches are
+    batched across lines, and unless concurrency is given enough lines are
+    read ahead to fill a batch.
+    """
+    batch_search = Config.ARCHIVE_BATCH_SEARCH if batch_search is None else batch_search
+    batcher = SearchBatcher(scraper) if batch_search and not advanced else None
+    if batcher is not None and concurrency is None:
+        concurrency = max(Config.BATCH_CONCURRENCY, scraper.batch_size)
+    async with contextlib.AsyncExitStack() as stack:
+        if not scraper.is_open:
+            await stack.enter_async_context(scraper)
+        try:
+            return await stream_records(lines, album_records(scraper, advanced, batcher), out, concurrency)
+        finally:
+            if batcher is not None:
+                await batcher.close()
+
+
+def track_records(parser, playlist_url: str, sync: bool = False) -> Iterator[Dict]:
+    """Track records of a playlist, page by page as they are fetched.
+
+    With sync, only the changes since the last sync are yielded, each with a
+    "change" of 'added' or 'removed'. Failures yield a single 'error' record.
+    """
+    try:
+        if not sync:
+            for track in parser.iter_playlist_tracks(playlist_url):
+                yield {'type': 'track', 'playlist': playlist_url, **track}
+            return
+        result = parser.sync_playlist(playlist_url)
+        for change in ('added', 'removed'):
+            for track in result[change]:
+                yield {'type': 'track', 'playlist': playlist_url, 'change': change, **track}
+    except Exception as e:
+        yield {'type': 'error', 'playlist': playlist_url, 'error': {'reason': str(e)}}
+
+
+def stream_tracks(parser, playlist_urls: Iterator[str], out: TextIO, sync: bool = False) -> Dict[str, int]:
+    """Write the track records of every playlist URL, returning input, record and error counts."""
+    counts = {'inputs': 0, 'records': 0, 'errors': 0}
+    for url in playlist_urls:
+        url = url.strip()
+        if not url:
+            continue
+        counts['inputs'] += 1
+        for record in track_records(parser, url, sync):
+            counts['records'] += 1
+            if record['type'] == 'error':
+                counts['errors'] += 1
+            write_record(out, record)
+    return counts
+
+
+@contextlib.contextmanager
+def records_to(out: Optional[TextIO] = None) -> Iterator[TextIO]:
+    """Yield the stream records go to (stdout by default) while print() goes to stderr.
+
+    Progress and warning messages printed along the way would otherwise be
+    interleaved with the records.
+    """
+    out = out or sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        yield out
+
+
+def print_counts(counts: Dict[str, int]) -> None:
+    """Print a stream's counts to stderr, alongside the records."""
+    errors = f" ({counts['errors']} errors)" if counts['errors'] else ''
+    print(f"📤 {counts['records']} records for {counts['inputs']} inputs{errors}", file=sys.stderr)
@@ -0,0 +1,167 @@
+"""
+Job-queue worker processes - each resolves leased albums on its own pooled scraper loop.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+from typing import Callable, Dict, List, Optional, Set
+import sys
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+from src.archive.scheduler import RequestScheduler
+from src.archive.scraper import ArchiveScraper
+from src.pipeline.batch_resolver import BatchResolver
+from src.pipeline.job_queue import JobQueue
+
+
+def default_processes() -> int:
+    """JOB_WORKERS, or one worker process per core when it is 0."""
+    return Config.JOB_WORKERS or os.cpu_count() or 1
+
+
+def create_worker_scraper(processes: int = 1) -> ArchiveScraper:
+    """A scraper whose rate limit is this process's share of the configured one."""
+    scheduler = RequestScheduler(rate=Config.ARCHIVE_RATE_LIMIT / processes,
+                                 max_rate=Config.ARCHIVE_RATE_LIMIT_MAX / processes)
+    return ArchiveScraper(scheduler=scheduler)
+
+
+async def run_worker(queue_path: Optional[str] = None, processes: int = 1, concurrency: Optional[int] = None,
+                     follow: bool = False, scraper_factory: Optional[Callable[[int], ArchiveScraper]] = None) -> Dict:
+    """Lease and resolve jobs until the queue is drained (or forever with follow).
+
+    Up to concurrency albums are resolved at once; jobs are leased JOB_LEASE_BATCH
+    at a time so their searches can be batched, and held leases are renewed
+    until each job is completed or released. Returns counts of jobs handled.
+    """
+    queue = JobQueue(queue_path)
+    worker_id = JobQueue.new_worker_id()
+    scraper = (scraper_factory or create_worker_scraper)(processes)
+    resolver = BatchResolver(scraper, concurrency)
+    semaphore = asyncio.Semaphore(max(1, resolver.concurrency))
+    held: Set[int] = set()
+    stats = {'resolved': 0, 'released': 0, 'lost': 0}
+
+    async def heartbeat() -> None:
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            if held:
+                queue.renew(worker_id, list(held))
+
+    async def run_job(job: Dict, albums) -> None:
+        try:
+            async with semaphore:
+                record = await resolver.resolve_pair(job['album'], job['artist'], albums)
+        except Exception as e:
+            queue.release(worker_id, job['id'], f"{type(e).__name__}: {e}")
+            stats['released'] += 1
+            return
+        finally:
+            held.discard(job['id'])
+        if record['status'] == 'retry':
+            queue.release(worker_id, job['id'], record['error']['reason'])
+            stats['released'] += 1
+        elif queue.complete(worker_id, job['id'], record):
+            stats['resolved'] += 1
+        else:
+            stats['lost'] += 1
+
+    async def run_batch(jobs: List[Dict]) -> None:
+        searches: Dict = {}
+        if resolver.batch_search and len(jobs) > 1:
+            try:
+                searches = await scraper.search_many([(job['album'], job['artist']) for job in jobs])
+            except Exception as e:
+                print(f"⚠️ Batched search failed, searching individually: {e}")
+        await asyncio.gather(*(
+            run_job(job, searches.get((job['album'], job['artist'] or None))) for job in jobs
+        ))
+
+    tasks: Set[asyncio.Task] = set()
+    renewals = asyncio.ensure_future(heartbeat())
+    try:
+        async with scraper:
+            while True:
+                # Keep the next batch leased while the current one finishes
+                if len(held) < resolver.concurrency:
+                    jobs = queue.lease(worker_id, Config.JOB_LEASE_BATCH)
+                    if jobs:
+                        held.update(job['id'] for job in jobs)
+                        tasks.add(asyncio.ensure_future(run_batch(jobs)))
+                        continue
+                if not tasks and not follow and queue.is_drained():
+                    break
+                if tasks:
+                    done, tasks = await asyncio.wait(tasks, timeout=Config.JOB_POLL_INTERVAL,
+                                                     return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                else:
+                    # Other workers still hold leases; pick up any that expire
+                    await asyncio.sleep(Config.JOB_POLL_INTERVAL)
+    finally:
+        renewals.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(renewals, *tasks, return_exceptions=True)
+        queue.close()
+    return stats
+
+
+def worker_process(queue_path: Optional[str], processes: int, concurrency: Optional[int], follow: bool,
+                   scraper_factory: Optional[Callable[[int], ArchiveScraper]] = None) -> None:
+    """Entry point of one worker process."""
+    try:
+        stats = asyncio.run(run_worker(queue_path, processes, concurrency, follow, scraper_factory))
+    except KeyboardInterrupt:
+        return
+    print(f"👷 Worker {os.getpid()}: {stats['resolved']} resolved, {stats['released']} released for retry")
+
+
+def start_worker(queue_path: Optional[str] = None, processes: int = 1, concurrency: Optional[int] = None,
+                 follow: bool = False,
+                 scraper_factory: Optional[Callable[[int], ArchiveScraper]] = None) -> multiprocessing.Process:
+    """Start one worker process; processes is the number sharing the rate limit.
+
+    scraper_factory(processes) must be a module-level function so it can be
+    passed to processes started with the 'spawn' method.
+    """
+    worker = multiprocessing.Process(
+        target=worker_process, args=(queue_path, processes, concurrency, follow, scraper_factory), daemon=True
+    )
+    worker.start()
+    return worker
+
+
+def start_workers(processes: int, queue_path: Optional[str] = None, concurrency: Optional[int] = None,
+                  follow: bool = False,
+                  scraper_factory: Optional[Callable[[int], ArchiveScraper]] = None) -> List[multiprocessing.Process]:
+    """Start processes worker processes on the queue and return them."""
+    return [start_worker(queue_path, processes, concurrency, follow, scraper_factory) for _ in range(processes)]
+
+
+def main():
+    """Run worker processes until the queue is drained."""
+    parser = argparse.ArgumentParser(description="Resolve queued albums with worker processes")
+    parser.add_argument('--processes', type=int, default=default_processes())
+    parser.add_argument('--queue', default=None, help="Queue database (default JOB_QUEUE_PATH)")
+    parser.add_argument('--concurrency', type=int, default=None, help="Albums in flight per process")
+    parser.add_argument('--follow', action='store_true', help="Keep waiting for new jobs")
+    args = parser.parse_args()
+
+    print(f"👷 Starting {args.processes} worker processes")
+    workers = start_workers(args.processes, args.queue, args.concurrency, args.follow)
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        print("⏹️ Stopping workers; their leased jobs will be picked up again")
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,24 @@
 Spotify playlist parser - moved from get_token_and_tracks.py
 """
 import spotipy
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyOAuth
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional
 import sys
 import os
+import time
 
 # Add the config directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from config.settings import Config
+from src.spotify.playlist_store import PlaylistStore, diff_tracks
+
+# Spotify's maximum page size for playlist items
+PAGE_SIZE = 100
+
+# Only the fields get_playlist_tracks reads, to keep page payloads small
+PLAYLIST_ITEM_FIELDS = 'total,items(track(type,name,track_number,duration_ms,artists(name),album(name,artists(name))))'
 
 
 class SpotifyPlaylistParser:
@@ -28,6 +38,8 @@ class SpotifyPlaylistParser:
         
         self.redirect_uri = Config.SPOTIFY_REDIRECT_URI
         self.scope = Config.SPOTIFY_SCOPE
+        self.page_workers = Config.SPOTIFY_PAGE_WORKERS
+        self.rate_limit_retries = Config.SPOTIFY_RATE_LIMIT_RETRIES
         
         # Initialize Spotify client
         self.sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
@@ -47,34 +59,125 @@ class SpotifyPlaylistParser:
             return url.split(":")[-1]
         return None
     
+    def _fetch_page(self, playlist_id: str, offset: int) -> Dict:
+        """Fetch one page of playlist items, waiting out rate limits."""
+        for attempt in range(self.rate_limit_retries + 1):
+            try:
+                return self.sp.playlist_items(
+                    playlist_id,
+                    fields=PLAYLIST_ITEM_FIELDS,
+                    limit=PAGE_SIZE,
+                    offset=offset,
+                    additional_types=('track',)
+                )
+            except SpotifyException as e:
+                if e.http_status != 429 or attempt == self.rate_limit_retries:
+                    raise
+                headers = e.headers or {}
+                try:
+                    retry_after = float(headers.get('Retry-After', 1))
+                except (TypeError, ValueError):
+                    retry_after = 1.0
+                time.sleep(max(retry_after, 1.0) * (attempt + 1))
+        return {}
+    
+    def _parse_items(self, items: List[Dict]) -> List[Dict[str, str]]:
+        """Convert playlist items to track dicts, skipping removed tracks and episodes."""
+        tracks = []
+        for item in items:
+            track = item.get('track')
+            if not track or track.get('type', 'track') != 'track':
+                continue
+            album = track.get('album') or {}
+            tracks.append({
+                'title': track['name'],
+                'artist': ", ".join([a['name'] for a in track['artists']]),
+                'album': album.get('name', ''),
+                'album_artist': (album.get('artists') or [{'name': ''}])[0]['name'],
+                # Used for track-level matching (stored, but not part of the store's diff key)
+                'track_number': track.get('track_number'),
+                'duration_ms': track.get('duration_ms'),
+            })
+        return tracks
+    
     def get_playlist_tracks(self, playlist_url: str) -> List[Dict[str, str]]:
-        """Get all tracks from a Spotify playlist."""
+        """Get all tracks from a Spotify playlist.
+        
+        The first page reports the playlist total; the remaining pages are then
+        fetched in parallel by offset and reassembled in playlist order.
+        """
         playlist_id = self.extract_playlist_id(playlist_url)
         
         if not playlist_id:
             raise ValueError("Invalid playlist URL")
         
-        tracks = []
-        results = self.sp.playlist_items(playlist_id)
+        return self._get_tracks_by_id(playlist_id)
+    
+    def iter_playlist_tracks(self, playlist_url: str) -> Iterator[Dict[str, str]]:
+        """Yield the tracks of a playlist in order, each page as soon as it arrives."""
+        playlist_id = self.extract_playlist_id(playlist_url)
         
-        # Get all tracks (handle pagination)
-        while results:
-            for item in results['items']:
-                track = item['track']
-                if track:
-                    tracks.append({
-                        'title': track['name'],
-                        'artist': ", ".join([a['name'] for a in track['artists']]),
-                        'album': track['album']['name']
-                    })
-            
-            # Check for more tracks (pagination)
-            if results['next']:
-                results = self.sp.next(results)
-            else:
-                break
+        if not playlist_id:
+            raise ValueError("Invalid playlist URL")
         
-        return tracks
+        return self._iter_tracks_by_id(playlist_id)
+    
+    def _get_tracks_by_id(self, playlist_id: str) -> List[Dict[str, str]]:
+        """Enumerate every track of a playlist by ID."""
+        return list(self._iter_tracks_by_id(playlist_id))
+    
+    def _iter_tracks_by_id(self, playlist_id: str) -> Iterator[Dict[str, str]]:
+        first_page = self._fetch_page(playlist_id, 0)
+        yield from self._parse_items(first_page.get('items', []))
+        
+        offsets = range(PAGE_SIZE, first_page.get('total', 0), PAGE_SIZE)
+        if offsets:
+            with ThreadPoolExecutor(max_workers=max(1, self.page_workers)) as pool:
+                # map() yields pages in offset order regardless of completion order
+                for page in pool.map(lambda offset: self._fetch_page(playlist_id, offset), offsets):
+                    yield from self._parse_items(page.get('items', []))
+    
+    def get_snapshot_id(self, playlist_id: str) -> str:
+        """Fetch only the current snapshot ID of a playlist."""
+        return self.sp.playlist(playlist_id, fields='snapshot_id')['snapshot_id']
+    
+    def sync_playlist(self, playlist_url: str, store: Optional[PlaylistStore] = None) -> Dict:
+        """Sync a playlist against the local store and return what changed.
+        
+        If the snapshot ID matches the stored one, enumeration is skipped entirely.
+        Otherwise the playlist is re-enumerated, diffed against the stored tracks and
+        saved. The result holds 'playlist_id', 'snapshot_id', 'changed', 'added',
+        'removed' and the full 'tracks' list; on a first sync every track is 'added'.
+        """
+        playlist_id = self.extract_playlist_id(playlist_url)
+        
+        if not playlist_id:
+            raise ValueError("Invalid playlist URL")
+        
+        store = store or PlaylistStore()
+        snapshot_id = self.get_snapshot_id(playlist_id)
+        
+        if store.get_snapshot_id(playlist_id) == snapshot_id:
+            return {
+                'playlist_id': playlist_id,
+                'snapshot_id': snapshot_id,
+                'changed': False,
+                'added': [],
+                'removed': [],
+                'tracks': store.get_tracks(playlist_id)
+            }
+        
+        tracks = self._get_tracks_by_id(playlist_id)
+        diff = diff_tracks(store.get_tracks(playlist_id), tracks)
+        store.save(playlist_id, snapshot_id, tracks)
+        return {
+            'playlist_id': playlist_id,
+            'snapshot_id': snapshot_id,
+            'changed': True,
+            'added': diff['added'],
+            'removed': diff['removed'],
+            'tracks': tracks
+        }
     
     def print_tracklist(self, tracks: List[Dict[str, str]]) -> None:
         """Print formatted tracklist."""
@@ -84,9 +187,20 @@ class SpotifyPlaylistParser:
 
 
 def main():
-    """Main function for backward compatibility."""
+    """Main function for backward compatibility.
+    
+    With --ndjson, playlist URLs are read from stdin (one per line) and every
+    track is written to stdout as a JSON record as soon as its page arrives.
+    """
     parser = SpotifyPlaylistParser()
     
+    if '--ndjson' in sys.argv[1:]:
+        from src.pipeline.stream import print_counts, records_to, stream_tracks
+        
+        with records_to() as out:
+            print_counts(stream_tracks(parser, sys.stdin, out))
+        return
+    
     playlist_url = input("🎧 Paste your Spotify playlist URL: ").strip()
     
     try:
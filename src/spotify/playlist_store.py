@@ -0,0 +1,118 @@
+"""
+Local snapshot store for incremental Spotify playlist syncs.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import sys
+
+# Add the config directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.settings import Config
+
+# Fields identifying a track; diffs compare tracks by these alone
+KEY_FIELDS = ('title', 'artist', 'album', 'album_artist')
+# Track dict keys, in the order they are packed into the compact row form. Track number and
+# duration feed track-level matching; rows stored before they were added are padded with None
+TRACK_FIELDS = KEY_FIELDS + ('track_number', 'duration_ms')
+
+
+def pack_tracks(tracks: List[Dict]) -> bytes:
+    """Pack track dicts into zlib-compressed JSON rows (no repeated keys)."""
+    rows = [[track.get(field, '' if field in KEY_FIELDS else None) for field in TRACK_FIELDS]
+            for track in tracks]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack_tracks(blob: bytes) -> List[Dict]:
+    """Inverse of pack_tracks."""
+    rows = json.loads(zlib.decompress(blob).decode('utf-8'))
+    return [dict(zip(TRACK_FIELDS, row + [None] * (len(TRACK_FIELDS) - len(row)))) for row in rows]
+
+
+def _track_key(track: Dict) -> Tuple[str, ...]:
+    return tuple(track.get(field, '') for field in KEY_FIELDS)
+
+
+def diff_tracks(old: List[Dict], new: List[Dict]) -> Dict[str, List[Dict]]:
+    """Return the tracks added to and removed from a playlist.
+
+    Tracks are compared by KEY_FIELDS, so a track whose duration or number
+    changed is not reported as removed and re-added; the returned tracks keep
+    all their fields. Duplicates are counted, so adding a second copy of a
+    track shows up as one addition.
+    """
+    old_counts = Counter(_track_key(track) for track in old)
+    new_counts = Counter(_track_key(track) for track in new)
+    return {
+        'added': _pick(new, new_counts - old_counts),
+        'removed': _pick(old, old_counts - new_counts),
+    }
+
+
+def _pick(tracks: List[Dict], counts: Counter) -> List[Dict]:
+    """The last counts[key] tracks of each key, in playlist order."""
+    counts = Counter(counts)
+    picked = []
+    for track in reversed(tracks):
+        key = _track_key(track)
+        if counts[key] > 0:
+            counts[key] -= 1
+            picked.append(track)
+    return picked[::-1]
+
+
+class PlaylistStore:
+    """SQLite store of the last synced snapshot and tracks for each playlist."""
+
+    def __init__(self, path: Optional[str] = None):
+        """Open (or create) the store database at path."""
+        self.path = path or Config.SPOTIFY_PLAYLIST_STORE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS playlists ('
+            ' playlist_id TEXT PRIMARY KEY,'
+            ' snapshot_id TEXT NOT NULL,'
+            ' tracks BLOB NOT NULL,'
+            ' synced_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get_snapshot_id(self, playlist_id: str) -> Optional[str]:
+        """Return the stored snapshot id for a playlist, or None if never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT snapshot_id FROM playlists WHERE playlist_id = ?', (playlist_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_tracks(self, playlist_id: str) -> List[Dict[str, str]]:
+        """Return the stored tracks for a playlist (empty if never synced)."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT tracks FROM playlists WHERE playlist_id = ?', (playlist_id,)
+            ).fetchone()
+        return unpack_tracks(row[0]) if row else []
+
+    def save(self, playlist_id: str, snapshot_id: str, tracks: List[Dict[str, str]]) -> None:
+        """Replace the stored snapshot and tracks for a playlist."""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO playlists (playlist_id, snapshot_id, tracks, synced_at) '
+                'VALUES (?, ?, ?, ?)',
+                (playlist_id, snapshot_id, pack_tracks(tracks), time.time())
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -2,10 +2,11 @@
 Streamlit UI for Stremtify - moved from archive_scrapertrack.py
 """
 import streamlit as st
-import asyncio
 import sys
 import os
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 # Setup path for imports
 def setup_imports():
@@ -24,19 +25,300 @@ setup_imports()
 
 try:
     from archive.scraper import ArchiveScraper
+    from archive.scheduler import FetchFailed
+    from archive.loop import BackgroundLoop
+    from config.settings import Config
 except ImportError as e:
     st.error(f"Import Error: {e}")
     st.error("Please make sure the project structure is correct and dependencies are installed.")
     st.stop()
 
 
+@st.cache_resource
+def get_scraper_runtime():
+    """Create one event loop and pooled scraper shared across reruns and sessions."""
+    loop = BackgroundLoop()
+    scraper = ArchiveScraper()
+    loop.run(scraper.open())
+    return loop, scraper
+
+
+SearchKey = Tuple[str, str, Optional[str]]
+
+
+@st.cache_resource
+def search_cache() -> Dict[SearchKey, Tuple[float, List[Dict]]]:
+    """Finished searches shared across sessions: (mode, album, artist) -> (expires_at, events)."""
+    return {}
+
+
+def cached_search_events(key: SearchKey) -> Optional[List[Dict]]:
+    """Events of a finished search of key, or None if it is not cached or expired."""
+    entry = search_cache().get(key)
+    if entry is None or entry[0] <= time.time():
+        return None
+    return entry[1]
+
+
+def store_search_events(key: SearchKey, events: List[Dict]) -> None:
+    """Cache a finished search for UI_SEARCH_CACHE_TTL seconds, dropping expired ones."""
+    cache = search_cache()
+    now = time.time()
+    for stale in [stale for stale, (expires_at, _) in list(cache.items()) if expires_at <= now]:
+        cache.pop(stale, None)
+    if Config.UI_SEARCH_CACHE_TTL > 0:
+        cache[key] = (now + Config.UI_SEARCH_CACHE_TTL, list(events))
+
+
+class SearchJob:
+    """A search running on the background loop; its events are appended as they arrive.
+
+    Events are those of ArchiveScraper.iter_advanced_search, or a single
+    {"albums": [...]} (or {"error": {...}}) for a basic search. The job keeps
+    the span of its own search for the debug panel, since the scraper's
+    last span may belong to another session.
+    """
+
+    def __init__(self, mode: str, album: str, artist: Optional[str], events: Optional[List[Dict]] = None):
+        """Create a job; pass events to wrap an already finished (cached) search."""
+        self.key: SearchKey = (mode, album, artist)
+        self.events: List[Dict] = list(events or [])
+        self.cached = events is not None
+        self.future = None
+        self.span = None
+
+    def start(self, loop: BackgroundLoop, scraper: ArchiveScraper) -> "SearchJob":
+        self.future = loop.submit(self._run(scraper))
+        return self
+
+    async def _run(self, scraper: ArchiveScraper) -> None:
+        mode, album, artist = self.key
+        with scraper.metrics.span("ui_search", mode=mode) as span:
+            self.span = span
+            if mode == "Search":
+                try:
+                    self.events.append({"albums": await scraper.search_albums(album, artist, raise_on_error=True)})
+                except FetchFailed as e:
+                    self.events.append({"error": e.error.to_dict()})
+                return
+            async for event in scraper.iter_advanced_search(album, artist):
+                self.events.append(event)
+
+    @property
+    def done(self) -> bool:
+        return self.future is None or self.future.done()
+
+    @property
+    def error(self) -> Optional[str]:
+        """Message of an unexpected exception raised by the search, if any."""
+        if self.future is None or not self.future.done() or self.future.cancelled():
+            return None
+        exception = self.future.exception()
+        return f"{type(exception).__name__}: {exception}" if exception else None
+
+    def cancel(self) -> None:
+        if self.future is not None:
+            self.future.cancel()
+
+    def store(self) -> None:
+        """Share a successfully finished search through the search cache (once)."""
+        if self.cached or not self.done or self.error or any("error" in event for event in self.events):
+            return
+        store_search_events(self.key, self.events)
+        self.cached = True
+
+
+def start_search(mode: str, album: str, artist: Optional[str]) -> None:
+    """Cancel the search still in flight and start (or load from cache) a new one."""
+    previous = st.session_state.get("search_job")
+    if previous is not None and not previous.done:
+        previous.cancel()
+    st.session_state.verified_search = {}
+
+    events = cached_search_events((mode, album, artist))
+    if events is not None:
+        st.session_state.search_job = SearchJob(mode, album, artist, events)
+    else:
+        loop, scraper = get_scraper_runtime()
+        st.session_state.search_job = SearchJob(mode, album, artist).start(loop, scraper)
+
+
+def render_flacs(flacs: List[str]) -> None:
+    for flac_url in flacs[:5]:
+        st.write(f"[{flac_url.split('/')[-1]}]({flac_url})")
+    if len(flacs) > 5:
+        st.write(f"...and {len(flacs) - 5} more.")
+
+
+def render_verified(result: Dict) -> None:
+    """Show a verified album with its torrent and FLAC links."""
+    album_info = result["verified_album"]
+    if result.get("query_level", "strict") != "strict":
+        st.caption(f"Found with a relaxed query ({result['query_level']})")
+    st.write(f"**Downloads:** {album_info['downloads']}")
+    st.write(f"**Size:** {album_info['size']//(1024*1024)} MB")
+    st.write(f"[Archive Link]({album_info['url']})")
+
+    if result["torrent"]:
+        st.info(f"[🧲 Torrent Link]({result['torrent']})")
+
+    st.write(f"**FLAC Files:**")
+    render_flacs(result["flacs"])
+
+
+def render_advanced_events(job: SearchJob) -> None:
+    """Render advanced search progress: verified albums appear as each candidate finishes."""
+    events = list(job.events)
+    candidates = next((event["candidates"] for event in events if "candidates" in event), None)
+    results = [event for event in events if "verified_album" in event]
+    verified = [result for result in results if result["flacs"]]
+
+    relaxing = any("relaxing" in event for event in events)
+
+    if not job.done:
+        if candidates is None:
+            st.progress(0.0, text="Searching Archive.org...")
+        elif relaxing:
+            st.progress(1.0, text="No exact match verified, trying looser queries...")
+        else:
+            st.progress(min(1.0, len(results) / max(1, len(candidates))),
+                        text=f"Verified {len(results)} of {len(candidates)} candidates...")
+
+    for idx, result in enumerate(verified):
+        album_info = result["verified_album"]
+        title = f"{album_info['title']} by {album_info['artist']} ({album_info['year']})"
+        if idx == 0:
+            st.success(f"✅ Verified FLAC Album Found: {title}")
+            render_verified(result)
+        else:
+            with st.expander(f"✅ Also verified: {title}"):
+                render_verified(result)
+
+    for event in events:
+        if "error" in event:
+            st.error(f"Archive.org request failed: {event['error']['reason']}")
+        elif "google_fallback" in event:
+            st.warning("No verified FLAC albums found. Try this Google search (results not verified):")
+            st.write(f"[🔎 Google Search]({event['google_fallback']})")
+
+
+def render_search_results(albums: List[Dict]) -> None:
+    """Render basic search results, each with an on-demand FLAC verification button."""
+    if not albums:
+        st.warning("No albums found.")
+        return
+    st.success(f"Found {len(albums)} album(s):")
+    for idx, album_info in enumerate(albums, 1):
+        with st.expander(f"{idx}. {album_info['title']} by {album_info['artist']} ({album_info['year']})"):
+            st.write(f"**Downloads:** {album_info['downloads']}")
+            st.write(f"**Size:** {album_info['size']//(1024*1024)} MB")
+            st.write(f"[Archive Link]({album_info['url']})")
+
+            verify_key = f"verify_{album_info['identifier']}"
+            if st.button(f"🔎 Verify FLACs", key=verify_key):
+                with st.spinner("Verifying FLAC files..."):
+                    loop, scraper = get_scraper_runtime()
+
+                    async def verify_and_store():
+                        async with scraper.session_context() as session:
+                            torrent, flacs = await scraper.get_verified_flac_files(session, album_info['identifier'])
+                            return {"torrent": torrent, "flacs": flacs}
+
+                    result = loop.run(verify_and_store())
+                    st.session_state.verified_search[album_info['identifier']] = result
+
+            if album_info['identifier'] in st.session_state.verified_search:
+                result = st.session_state.verified_search[album_info['identifier']]
+                if result["torrent"]:
+                    st.info(f"[🧲 Torrent Link]({result['torrent']})")
+
+                if result["flacs"]:
+                    st.success(f"Found {len(result['flacs'])} valid FLAC files:")
+                    render_flacs(result["flacs"])
+                else:
+                    st.error("No valid FLAC files found.")
+
+
+def render_job(job: SearchJob) -> None:
+    if job.error:
+        st.error(f"Search failed: {job.error}")
+    if job.key[0] == "Search":
+        if job.done and not job.error:
+            event = job.events[0] if job.events else {"albums": []}
+            if "error" in event:
+                st.error(f"Archive.org request failed: {event['error']['reason']}")
+            else:
+                render_search_results(event["albums"])
+        elif not job.done:
+            st.progress(0.0, text="Searching Archive.org...")
+    else:
+        render_advanced_events(job)
+
+
+@st.fragment(run_every=0.5)
+def render_live_job() -> None:
+    """Poll the running search; only this fragment reruns while results stream in."""
+    job = st.session_state.search_job
+    if job.done:
+        # A full rerun renders the final state (with widgets) and stops polling
+        st.rerun()
+    render_job(job)
+
+
+def render_debug_panel(scraper: ArchiveScraper, job: Optional[SearchJob]) -> None:
+    """Show where the time of this session's last search went.
+
+    The connection timings, coalescing counts and exports below it cover the
+    shared scraper, i.e. every session.
+    """
+    span = job.span if job is not None and job.done else None
+    if span is None:
+        return
+    with st.expander("🛠️ Debug: request breakdown for last query"):
+        st.write(f"**{span.name}** took {span.duration * 1000:.0f} ms")
+        st.table([
+            {
+                "Endpoint": endpoint,
+                "Requests": int(stats["count"]),
+                "Time (ms, summed)": round(stats["seconds"] * 1000, 1),
+                "Bytes": int(stats["bytes"]),
+            }
+            for endpoint, stats in sorted(span.totals().items())
+        ])
+        metrics = scraper.metrics.to_dict()
+        connection = {
+            "DNS": metrics["dns_seconds"],
+            "Connect": metrics["connect_seconds"],
+        }
+        for endpoint, stats in metrics["endpoints"].items():
+            connection[f"TTFB ({endpoint})"] = stats["ttfb_seconds"]
+        st.table([
+            {
+                "Phase": phase,
+                "Count": histogram["count"],
+                "Avg (ms)": round(histogram["sum"] / histogram["count"] * 1000, 1) if histogram["count"] else 0,
+            }
+            for phase, histogram in connection.items()
+        ])
+        coalescing = scraper.coalescing_stats()
+        if coalescing:
+            st.table([
+                {"Request": kind, "Sent": stats["requests"], "Coalesced": stats["coalesced"]}
+                for kind, stats in sorted(coalescing.items())
+            ])
+        st.download_button("Export metrics (Prometheus)", scraper.metrics.to_prometheus(),
+                           file_name="stremtify_metrics.prom")
+        st.download_button("Export metrics (JSON)", scraper.metrics.to_json(),
+                           file_name="stremtify_metrics.json")
+
+
 def main():
     """Main Streamlit application."""
     st.title("🎶 Stremtify FLAC Album Scraper")
 
     # Initialize session state
-    if "search_results" not in st.session_state:
-        st.session_state.search_results = []
+    if "search_job" not in st.session_state:
+        st.session_state.search_job = None
     if "verified_search" not in st.session_state:
         st.session_state.verified_search = {}
 
@@ -45,82 +327,22 @@ def main():
     artist = st.text_input("Artist Name (optional):")
     album = st.text_input("Album Name:")
 
-    # Search button
+    # Search button: runs on the background loop, a new query cancels the previous one
     if st.button("Go"):
         if not album:
             st.warning("Please enter at least the album name.")
         else:
-            st.session_state.search_results = []
-            st.session_state.verified_search = {}
-            
-            scraper = ArchiveScraper()
-            
-            if mode == "Search":
-                with st.spinner("Searching Archive.org..."):
-                    st.session_state.search_results = asyncio.run(
-                        scraper.search_albums(album, artist or None)
-                    )
-            else:
-                with st.spinner("Searching and verifying..."):
-                    result = asyncio.run(
-                        scraper.advanced_search(album, artist or None)
-                    )
-                
-                if "verified_album" in result:
-                    album_info = result["verified_album"]
-                    st.success(f"✅ Verified FLAC Album Found: {album_info['title']} by {album_info['artist']} ({album_info['year']})")
-                    st.write(f"**Downloads:** {album_info['downloads']}")
-                    st.write(f"**Size:** {album_info['size']//(1024*1024)} MB")
-                    st.write(f"[Archive Link]({album_info['url']})")
-
-                    if result["torrent"]:
-                        st.info(f"[🧲 Torrent Link]({result['torrent']})")
-
-                    st.write(f"**FLAC Files:**")
-                    for flac_url in result["flacs"][:5]:
-                        st.write(f"[{flac_url.split('/')[-1]}]({flac_url})")
-                    if len(result["flacs"]) > 5:
-                        st.write(f"...and {len(result['flacs']) - 5} more.")
-
-                elif "google_fallback" in result:
-                    st.warning("No verified FLAC albums found. Try this Google search (results not verified):")
-                    st.write(f"[🔎 Google Search]({result['google_fallback']})")
-
-    # Show Search Results if available
-    if mode == "Search" and st.session_state.search_results:
-        st.success(f"Found {len(st.session_state.search_results)} album(s):")
-        for idx, album_info in enumerate(st.session_state.search_results, 1):
-            with st.expander(f"{idx}. {album_info['title']} by {album_info['artist']} ({album_info['year']})"):
-                st.write(f"**Downloads:** {album_info['downloads']}")
-                st.write(f"**Size:** {album_info['size']//(1024*1024)} MB")
-                st.write(f"[Archive Link]({album_info['url']})")
-
-                verify_key = f"verify_{album_info['identifier']}"
-                if st.button(f"🔎 Verify FLACs", key=verify_key):
-                    with st.spinner("Verifying FLAC files..."):
-                        scraper = ArchiveScraper()
-                        
-                        async def verify_and_store():
-                            async with scraper.session_context() as session:
-                                torrent, flacs = await scraper.get_verified_flac_files(session, album_info['identifier'])
-                                return {"torrent": torrent, "flacs": flacs}
-                        
-                        result = asyncio.run(verify_and_store())
-                        st.session_state.verified_search[album_info['identifier']] = result
-
-                if album_info['identifier'] in st.session_state.verified_search:
-                    result = st.session_state.verified_search[album_info['identifier']]
-                    if result["torrent"]:
-                        st.info(f"[🧲 Torrent Link]({result['torrent']})")
-                    
-                    if result["flacs"]:
-                        st.success(f"Found {len(result['flacs'])} valid FLAC files:")
-                        for flac_url in result["flacs"][:5]:
-                            st.write(f"[{flac_url.split('/')[-1]}]({flac_url})")
-                        if len(result["flacs"]) > 5:
-                            st.write(f"...and {len(result['flacs']) - 5} more.")
-                    else:
-                        st.error("No valid FLAC files found.")
+            start_search(mode, album, artist or None)
+
+    job = st.session_state.search_job
+    if job is not None and job.key[0] == mode:
+        if job.done:
+            job.store()
+            render_job(job)
+        else:
+            render_live_job()
+
+    render_debug_panel(get_scraper_runtime()[1], job)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Stremtify command line: python stremtify.py <search|verify|playlist|resolve|ui> [options]
+"""
+import sys
+
+from src.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())